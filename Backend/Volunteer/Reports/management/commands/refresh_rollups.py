@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from Reports.rollups import refresh
+
+
+class Command(BaseCommand):
+    help = "Fold new visits, appointments and prescriptions into the daily report rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild every rollup from scratch")
+
+    def handle(self, *args, **options):
+        days = refresh(full=options["full"])
+        if days is None:
+            self.stdout.write(self.style.SUCCESS("Rollups rebuilt from scratch."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rollups refreshed for {days} day(s)."))
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('high_water_mark', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AppointmentStatusDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('doctor_id', models.BigIntegerField()),
+                ('status', models.CharField(max_length=20)),
+                ('appointments', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor_id', 'day'], name='appt_rollup_doctor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor_id', 'status'), name='uniq_appointment_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DiagnosisDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('diagnosis', models.CharField(max_length=100)),
+                ('visits', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'diagnosis'), name='uniq_diagnosis_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrescriptionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('doctor_id', models.BigIntegerField()),
+                ('prescriptions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor_id', 'day'], name='rx_rollup_doctor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor_id'), name='uniq_prescription_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('doctor_id', models.BigIntegerField()),
+                ('visits', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor_id', 'day'], name='visit_rollup_doctor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor_id'), name='uniq_visit_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 22:30
+
+from django.db import migrations, models
+
+
+def mark_built(apps, schema_editor):
+    """States that have refreshed before were built by that first run."""
+    apps.get_model("Reports", "RollupState").objects.filter(refreshed_at__isnull=False).update(initialized=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupstate',
+            name='initialized',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_built, migrations.RunPython.noop),
+    ]
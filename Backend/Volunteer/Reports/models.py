@@ -1,3 +1,71 @@
 from django.db import models
 
-# Create your models here.
+
+class VisitDailyRollup(models.Model):
+    day = models.DateField()
+    doctor_id = models.BigIntegerField()
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "doctor_id"], name="uniq_visit_rollup"),
+        ]
+        indexes = [models.Index(fields=["doctor_id", "day"], name="visit_rollup_doctor_idx")]
+
+
+class AppointmentStatusDailyRollup(models.Model):
+    # Day the appointment was booked
+    day = models.DateField()
+    doctor_id = models.BigIntegerField()
+    status = models.CharField(max_length=20)
+    appointments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "doctor_id", "status"], name="uniq_appointment_rollup"),
+        ]
+        indexes = [models.Index(fields=["doctor_id", "day"], name="appt_rollup_doctor_idx")]
+
+
+class DiagnosisDailyRollup(models.Model):
+    day = models.DateField()
+    # Lower-cased, whitespace-collapsed diagnosis text
+    diagnosis = models.CharField(max_length=100)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "diagnosis"], name="uniq_diagnosis_rollup"),
+        ]
+
+
+class PrescriptionDailyRollup(models.Model):
+    day = models.DateField()
+    doctor_id = models.BigIntegerField()
+    prescriptions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "doctor_id"], name="uniq_prescription_rollup"),
+        ]
+        indexes = [models.Index(fields=["doctor_id", "day"], name="rx_rollup_doctor_idx")]
+
+
+class RollupDirtyDay(models.Model):
+    """
+    Days whose rollups must be recomputed because a row was deleted.
+    The sync ChangeLog tombstone only carries the id, not the day.
+    """
+    day = models.DateField(unique=True)
+
+
+class RollupState(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    # Last sync.ChangeLog seq folded into the rollups
+    high_water_mark = models.BigIntegerField(default=0)
+    # Set by the first full build; until then refresh() rebuilds everything
+    initialized = models.BooleanField(default=False)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
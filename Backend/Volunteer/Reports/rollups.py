@@ -0,0 +1,192 @@
+"""
+Incremental daily rollups over visits, appointments and prescriptions.
+
+`refresh()` reads sync.ChangeLog past the stored high-water mark (a
+`seq`, so changes are seen in commit order), works out which days those
+changes touched (plus days flagged by deletes in RollupDirtyDay) and
+recomputes only those days' rollup rows, reading just the fact rows of
+those days. The first run, or `full=True`, rebuilds everything.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from appointments.models import Appointment
+from patient.models import Visit
+from prescription.models import Prescription
+from sync.changelog import sequence
+from sync.models import ChangeLog
+
+from .models import (
+    AppointmentStatusDailyRollup,
+    DiagnosisDailyRollup,
+    PrescriptionDailyRollup,
+    RollupDirtyDay,
+    RollupState,
+    VisitDailyRollup,
+)
+
+STATE_NAME = "daily"
+ID_BATCH = 1000
+DAY_BATCH = 31
+
+# ChangeLog model name -> (fact model, datetime field that decides the day)
+FACTS = {
+    "visit": (Visit, "date"),
+    "appointment": (Appointment, "booked_at"),
+    "prescription": (Prescription, "created_at"),
+}
+
+ROLLUP_MODELS = (
+    VisitDailyRollup,
+    AppointmentStatusDailyRollup,
+    DiagnosisDailyRollup,
+    PrescriptionDailyRollup,
+)
+
+
+def fact_day(value):
+    """Calendar day of a fact timestamp, matching TruncDate in the current timezone."""
+    return timezone.localtime(value).date()
+
+
+def normalize_diagnosis(text):
+    return " ".join((text or "").lower().split())[:100]
+
+
+def refresh(full=False):
+    """Fold new changes into the rollups. Returns the number of days recomputed (None = all)."""
+    state, _ = RollupState.objects.get_or_create(name=STATE_NAME)
+    latest = sequence()
+    dirty = list(RollupDirtyDay.objects.values_list("id", "day"))
+
+    if full or not state.initialized:
+        days = None
+        _recompute(None)
+        state.initialized = True
+    else:
+        days = _changed_days(state.high_water_mark, latest) | {day for _, day in dirty}
+        days = sorted(days)
+        for i in range(0, len(days), DAY_BATCH):
+            _recompute(days[i:i + DAY_BATCH])
+
+    RollupDirtyDay.objects.filter(id__in=[pk for pk, _ in dirty]).delete()
+    state.high_water_mark = max(latest, state.high_water_mark)
+    state.refreshed_at = timezone.now()
+    state.save()
+    return None if days is None else len(days)
+
+
+def _changed_days(after_seq, upto_seq):
+    """Days of the fact rows upserted in ChangeLog seqs (after_seq, upto_seq]."""
+    entries = (
+        ChangeLog.objects.filter(
+            seq__gt=after_seq, seq__lte=upto_seq,
+            model__in=list(FACTS), action=ChangeLog.UPSERT,
+        )
+        .order_by("seq")
+        .values_list("seq", "model", "object_id")
+    )
+    days = set()
+    last_seq = after_seq
+    while True:
+        batch = list(entries.filter(seq__gt=last_seq)[:ID_BATCH])
+        if not batch:
+            return days
+        last_seq = batch[-1][0]
+        ids_by_model = {}
+        for _, name, object_id in batch:
+            ids_by_model.setdefault(name, set()).add(object_id)
+        for name, ids in ids_by_model.items():
+            model, field = FACTS[name]
+            days.update(
+                model.objects.filter(id__in=ids)
+                .annotate(day=TruncDate(field))
+                .values_list("day", flat=True)
+                .distinct()
+            )
+
+
+def _runs(days):
+    """Sorted dates as `(first, last)` runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def _window(queryset, field, days):
+    """Only the fact rows of `days`: one range per run of consecutive days."""
+    if days is None:
+        return queryset
+    window = Q()
+    for first, last in _runs(days):
+        start = timezone.make_aware(datetime.combine(first, time.min))
+        end = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min))
+        window |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return queryset.filter(window)
+
+
+def _grouped(model, field, days, *group_by):
+    wanted = None if days is None else set(days)
+    rows = (
+        _window(model.objects.all(), field, days)
+        .annotate(day=TruncDate(field))
+        .values("day", *group_by)
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    return [row for row in rows if wanted is None or row["day"] in wanted]
+
+
+def _recompute(days):
+    """Rebuild the rollup rows for `days` (sorted list of dates), or for everything."""
+    visits = [
+        VisitDailyRollup(day=r["day"], doctor_id=r["doctor_id"], visits=r["n"])
+        for r in _grouped(Visit, "date", days, "doctor_id")
+    ]
+    appointments = [
+        AppointmentStatusDailyRollup(
+            day=r["day"], doctor_id=r["doctor_id"], status=r["status"], appointments=r["n"]
+        )
+        for r in _grouped(Appointment, "booked_at", days, "doctor_id", "status")
+    ]
+    prescriptions = [
+        PrescriptionDailyRollup(day=r["day"], doctor_id=r["doctor_id"], prescriptions=r["n"])
+        for r in _grouped(Prescription, "created_at", days, "doctor_id")
+    ]
+
+    # Free-text diagnoses are normalized in Python; GROUP BY on TEXT is not portable
+    wanted = None if days is None else set(days)
+    counts = Counter()
+    rows = (
+        _window(Visit.objects.exclude(diagnosis__isnull=True).exclude(diagnosis=""), "date", days)
+        .values_list("date", "diagnosis")
+        .order_by()
+    )
+    for date, diagnosis in rows.iterator(chunk_size=2000):
+        day = fact_day(date)
+        if wanted is None or day in wanted:
+            key = normalize_diagnosis(diagnosis)
+            if key:
+                counts[(day, key)] += 1
+    diagnoses = [
+        DiagnosisDailyRollup(day=day, diagnosis=key, visits=n)
+        for (day, key), n in counts.items()
+    ]
+
+    with transaction.atomic():
+        for model in ROLLUP_MODELS:
+            stale = model.objects.all() if days is None else model.objects.filter(day__in=days)
+            stale.delete()
+        VisitDailyRollup.objects.bulk_create(visits, batch_size=1000)
+        AppointmentStatusDailyRollup.objects.bulk_create(appointments, batch_size=1000)
+        PrescriptionDailyRollup.objects.bulk_create(prescriptions, batch_size=1000)
+        DiagnosisDailyRollup.objects.bulk_create(diagnoses, batch_size=1000)
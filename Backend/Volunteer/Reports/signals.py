@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete
+
+from .models import RollupDirtyDay
+from .rollups import FACTS, fact_day
+
+
+def mark_day_dirty(sender, instance, field, **kwargs):
+    value = getattr(instance, field)
+    if value is not None:
+        RollupDirtyDay.objects.bulk_create([RollupDirtyDay(day=fact_day(value))], ignore_conflicts=True)
+
+
+for name, (model, field) in FACTS.items():
+    post_delete.connect(
+        lambda sender, instance, field=field, **kwargs: mark_day_dirty(sender, instance, field),
+        sender=model,
+        weak=False,
+        dispatch_uid=f"reports_dirty_{name}",
+    )
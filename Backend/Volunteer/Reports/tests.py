@@ -1,3 +1,129 @@
+from datetime import date, datetime, time
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from patient.models import Patient, Visit
+from sync.models import ChangeLog
+from .models import DiagnosisDailyRollup, RollupState, VisitDailyRollup
+from .rollups import _runs, _window, refresh
+
+
+def noon(day):
+    return timezone.make_aware(datetime.combine(day, time(12)))
+
+
+class RollupTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=False,
+        )
+        cls.other_doctor = User.objects.create_user(
+            email="other@example.com", password="pass", full_name="Dr. Sana",
+            phone_number="03000000001", role="doctor", is_staff=False,
+        )
+        cls.patient = Patient.objects.create(name="Ayesha", age=28, gender="female", contact="03110000000")
+
+    def visit(self, day, doctor=None, diagnosis="Anaemia"):
+        return Visit.objects.create(
+            doctor=doctor or self.doctor, patient=self.patient, date=noon(day), diagnosis=diagnosis,
+        )
+
+    def visits_on(self, day, doctor=None):
+        row = VisitDailyRollup.objects.filter(day=day, doctor_id=(doctor or self.doctor).pk).first()
+        return row.visits if row else 0
+
+
+class RefreshTests(RollupTestCase):
+    def test_first_run_builds_everything_once(self):
+        self.assertIsNone(refresh())
+        self.assertTrue(RollupState.objects.get().initialized)
+        # Nothing logged since: an incremental run, not another full rebuild
+        self.assertEqual(refresh(), 0)
+
+    def test_only_changed_and_deleted_days_are_recomputed(self):
+        old, today = date(2019, 3, 1), timezone.localdate()
+        edited = self.visit(old)
+        self.visit(today)
+        refresh()
+        self.assertEqual(self.visits_on(old), 1)
+
+        # A rollup row of an untouched day is left alone
+        middle = date(2021, 6, 1)
+        VisitDailyRollup.objects.create(day=middle, doctor_id=self.doctor.pk, visits=99)
+
+        edited.diagnosis = "Malaria"
+        edited.save()
+        gone = self.visit(today)
+        gone.delete()
+        self.assertEqual(refresh(), 2)
+        self.assertEqual(self.visits_on(middle), 99)
+        self.assertEqual(self.visits_on(today), 1)
+        self.assertEqual(DiagnosisDailyRollup.objects.get(day=old).diagnosis, "malaria")
+
+    def test_a_late_commit_below_the_high_water_mark_is_folded_in(self):
+        self.visit(date(2024, 1, 1))
+        refresh()
+
+        late = self.visit(date(2024, 1, 2))
+        ChangeLog.objects.filter(model="visit", object_id=late.pk).delete()
+        lowest = ChangeLog.objects.order_by("id").values_list("id", flat=True).first()
+        ChangeLog.objects.create(id=lowest - 1, model="visit", object_id=late.pk,
+                                 action=ChangeLog.UPSERT, doctor_id=self.doctor.pk)
+
+        self.assertEqual(refresh(), 1)
+        self.assertEqual(self.visits_on(date(2024, 1, 2)), 1)
+
+    def test_window_reads_only_the_given_days(self):
+        days = [date(2019, 1, 1), date(2019, 1, 2), timezone.localdate()]
+        self.assertEqual(_runs(days), [[days[0], days[1]], [days[2], days[2]]])
+        wanted = {self.visit(day).pk for day in days}
+        self.visit(date(2020, 6, 1))
+        rows = set(_window(Visit.objects.all(), "date", days).values_list("id", flat=True))
+        self.assertEqual(rows, wanted)
+
+
+class ReportViewTests(RollupTestCase):
+    def setUp(self):
+        self.visit(date(2024, 1, 1))
+        self.visit(date(2024, 1, 2), diagnosis="malaria ")
+        self.visit(date(2024, 1, 2), doctor=self.other_doctor, diagnosis="Malaria")
+        refresh()
+
+    def get(self, user, url, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(f"/api/reports/{url}/", params)
+
+    def test_doctors_only_see_their_own_rows(self):
+        response = self.get(self.doctor, "visits", date_from="2024-01-02")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(str(r["day"]), r["doctor_id"], r["visits"]) for r in response.data],
+            [("2024-01-02", self.doctor.pk, 1)],
+        )
+
+    def test_staff_can_filter_by_doctor(self):
+        staff = User.objects.create_user(
+            email="staff@example.com", password="pass", full_name="Admin",
+            phone_number="03000000002", role="doctor", is_staff=True,
+        )
+        response = self.get(staff, "visits", doctor_id=self.other_doctor.pk)
+        self.assertEqual([r["doctor_id"] for r in response.data], [self.other_doctor.pk])
+        self.assertEqual(len(self.get(staff, "visits").data), 3)
+
+    def test_top_diagnoses_merge_spellings(self):
+        response = self.get(self.doctor, "diagnoses", top=1)
+        self.assertEqual(list(response.data), [{"diagnosis": "malaria", "visits": 2}])
 
-# Create your tests here.
+    def test_bad_parameters_and_patients_are_refused(self):
+        self.assertEqual(self.get(self.doctor, "visits", date_from="01/02/2024").status_code, 400)
+        patient = User.objects.create_user(
+            email="patient@example.com", password="pass", full_name="Ayesha",
+            phone_number="03110000000", role="patient",
+        )
+        self.assertEqual(self.get(patient, "visits").status_code, 403)
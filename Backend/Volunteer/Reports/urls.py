@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import VisitRollupView, AppointmentRollupView, PrescriptionRollupView, TopDiagnosesView
+
+urlpatterns = [
+    path("visits/", VisitRollupView.as_view(), name="report-visits"),
+    path("appointments/", AppointmentRollupView.as_view(), name="report-appointments"),
+    path("prescriptions/", PrescriptionRollupView.as_view(), name="report-prescriptions"),
+    path("diagnoses/", TopDiagnosesView.as_view(), name="report-diagnoses"),
+]
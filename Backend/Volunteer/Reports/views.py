@@ -1,3 +1,99 @@
-from django.shortcuts import render
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
-# Create your views here.
+from .models import (
+    AppointmentStatusDailyRollup,
+    DiagnosisDailyRollup,
+    PrescriptionDailyRollup,
+    VisitDailyRollup,
+)
+
+MAX_TOP = 100
+
+
+class RollupView(APIView):
+    """
+    Read-only daily rollup rows, filtered by ?date_from=&date_to= (inclusive).
+    Staff see every doctor (optionally ?doctor_id=); doctors only themselves.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    model = None
+    fields = ()
+    per_doctor = True
+
+    def filtered(self, request):
+        user = request.user
+        if not (user.is_staff or user.role == "doctor"):
+            return None, Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+        queryset = self.model.objects.all()
+        try:
+            for param, lookup in (("date_from", "day__gte"), ("date_to", "day__lte")):
+                value = request.query_params.get(param)
+                if value:
+                    day = parse_date(value)
+                    if day is None:
+                        raise ValueError
+                    queryset = queryset.filter(**{lookup: day})
+        except ValueError:
+            return None, Response({"detail": "Dates must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if self.per_doctor:
+            doctor_id = request.query_params.get("doctor_id")
+            if not user.is_staff:
+                queryset = queryset.filter(doctor_id=user.id)
+            elif doctor_id:
+                if not doctor_id.isdigit():
+                    return None, Response({"detail": "doctor_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(doctor_id=doctor_id)
+        return queryset, None
+
+    def get(self, request):
+        queryset, error = self.filtered(request)
+        if error:
+            return error
+        rows = queryset.order_by("day").values(*self.fields)
+        return Response(list(rows), status=status.HTTP_200_OK)
+
+
+class VisitRollupView(RollupView):
+    model = VisitDailyRollup
+    fields = ("day", "doctor_id", "visits")
+
+
+class AppointmentRollupView(RollupView):
+    model = AppointmentStatusDailyRollup
+    fields = ("day", "doctor_id", "status", "appointments")
+
+
+class PrescriptionRollupView(RollupView):
+    model = PrescriptionDailyRollup
+    fields = ("day", "doctor_id", "prescriptions")
+
+
+class TopDiagnosesView(RollupView):
+    """Most frequent diagnoses over the date range (?top=, default 10)."""
+    model = DiagnosisDailyRollup
+    per_doctor = False
+
+    def get(self, request):
+        queryset, error = self.filtered(request)
+        if error:
+            return error
+        try:
+            top = min(int(request.query_params.get("top", 10)), MAX_TOP)
+        except ValueError:
+            return Response({"detail": "top must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        rows = (
+            queryset.values("diagnosis")
+            .annotate(visits=Sum("visits"))
+            .order_by("-visits", "diagnosis")[:max(top, 1)]
+        )
+        return Response(list(rows), status=status.HTTP_200_OK)
@@ -16,3 +16,6 @@ application = ProtocolTypeRouter({
         URLRouter(websocket_urlpatterns)
     ),
 })
+
+from prediction.registry import warm_up_if_configured
+warm_up_if_configured()
@@ -24,6 +24,8 @@ INSTALLED_APPS = [
     'prescription',
     'patient',
     'prediction',
+    'sync',
+    'Reports',
     'channels',
     'otp',
     'rest_framework',
@@ -108,6 +110,21 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('EMAIL_HOST_USER')
 
+# Prediction artifacts load lazily on first use; serving workers can set
+# PREDICTION_WARM_UP=True to load them at startup instead.
+PREDICTION_MODEL_DIR = BASE_DIR / 'prediction' / 'ml_model'
+PREDICTION_WARM_UP = config('PREDICTION_WARM_UP', default=False, cast=bool)
+# How often a worker checks whether `publish_model` switched the live version
+PREDICTION_RELOAD_CHECK_SECONDS = config('PREDICTION_RELOAD_CHECK_SECONDS', default=5, cast=float)
+# Use compiled_model.npz (see `manage.py compile_model`) when it exists
+PREDICTION_USE_COMPILED = config('PREDICTION_USE_COMPILED', default=True, cast=bool)
+# Distinct inputs (at clinical precision) whose risk label is kept in memory; 0 disables
+PREDICTION_CACHE_SIZE = config('PREDICTION_CACHE_SIZE', default=10000, cast=int)
+# Score saved visits on a background thread (False: inline after commit)
+PREDICTION_SCORE_ASYNC = config('PREDICTION_SCORE_ASYNC', default=True, cast=bool)
+# How often a worker checks whether import_drugs changed the drug catalog
+DRUG_CATALOG_CHECK_SECONDS = config('DRUG_CATALOG_CHECK_SECONDS', default=30, cast=float)
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -32,6 +32,8 @@ urlpatterns = [
     path('',include("appointments.urls")),
     path('api/drugs/', include('drugs.urls')),
     path('api/otp/', include('otp.urls')),
+    path('api/sync/', include('sync.urls')),
+    path('api/reports/', include('Reports.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('__debug__/',include('debug_toolbar.urls')),
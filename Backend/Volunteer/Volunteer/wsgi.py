@@ -14,3 +14,6 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Volunteer.settings')
 
 application = get_wsgi_application()
+
+from prediction.registry import warm_up_if_configured
+warm_up_if_configured()
@@ -2,10 +2,14 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 
 
+def room_group_name(room_name):
+    return f"video_{room_name}"
+
+
 class VideoCallConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope["url_route"]["kwargs"]["room_name"]
-        self.room_group_name = f"video_{self.room_name}"
+        self.room_group_name = room_group_name(self.room_name)
         self.user = self.scope["user"]
 
         # Reject if not authenticated
@@ -103,3 +107,10 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
     async def signal_message(self, event):
         if event["sender_channel"] != self.channel_name:
             await self.send(text_data=json.dumps(event["message"]))
+
+    # Sent by PrescriptionListCreateView (prescription/realtime.py)
+    async def prescription_created(self, event):
+        prescription = event["prescription"]
+        # Only the two people on the prescription, not anyone else in the room
+        if self.user.id in (prescription["doctor"], prescription["patient"]):
+            await self.send(text_data=json.dumps({"type": "prescription", "prescription": prescription}))
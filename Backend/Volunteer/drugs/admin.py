@@ -1,5 +1,13 @@
 # drugs/admin.py
 from django.contrib import admin
-from .models import Drug
+from .models import CatalogState, Condition, Drug, DrugClass
 
-admin.site.register(Drug)
\ No newline at end of file
+admin.site.register(Drug)
+admin.site.register(Condition)
+admin.site.register(DrugClass)
+
+
+@admin.register(CatalogState)
+class CatalogStateAdmin(admin.ModelAdmin):
+    list_display = ("name", "version", "updated_at")
+    readonly_fields = ("name", "version", "updated_at")
@@ -0,0 +1,66 @@
+"""
+Catalog versioning for the in-memory drug indexes.
+
+`bump()` is called after anything changes the Drug table. Each worker
+keeps its indexes in a `CatalogCache`, which re-reads the version at most
+every DRUG_CATALOG_CHECK_SECONDS and rebuilds when it has moved, so a
+finished `import_drugs` reaches every worker without a restart.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import CatalogState
+
+logger = logging.getLogger(__name__)
+
+CATALOG = "drugs"
+
+
+def current_version():
+    return CatalogState.objects.filter(name=CATALOG).values_list("version", flat=True).first() or 0
+
+
+def bump():
+    """Mark the catalog as changed. Returns the new version."""
+    if not CatalogState.objects.filter(name=CATALOG).update(version=F("version") + 1):
+        CatalogState.objects.get_or_create(name=CATALOG, defaults={"version": 1})
+    return current_version()
+
+
+class CatalogCache:
+    """Holds `build()`'s result for the current catalog version."""
+
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self):
+        if self._value is not None and not self._stale():
+            return self._value
+        with self._lock:
+            version = current_version()
+            if self._value is None or version != self._version:
+                started = time.monotonic()
+                self._value = self._build()
+                self._version = version
+                logger.info("%s built for catalog v%s in %.2fs",
+                            getattr(self._build, "__qualname__", "index"), version, time.monotonic() - started)
+            return self._value
+
+    def _stale(self):
+        now = time.monotonic()
+        if now - self._checked_at < settings.DRUG_CATALOG_CHECK_SECONDS:
+            return False
+        self._checked_at = now
+        return current_version() != self._version
+
+    def reset(self):
+        with self._lock:
+            self._value = None
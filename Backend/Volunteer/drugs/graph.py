@@ -0,0 +1,134 @@
+"""
+Drug <-> condition, drug <-> class and drug <-> related drug links.
+
+The catalog CSV keeps these as delimited text ("Miscellaneous
+antimalarials, Tetracyclines", "amoxicillin: https://... | azithromycin:
+https://..."). `link_chunk()` parses a cleaned import chunk with pandas
+string operations and replaces the links of those drugs, so questions
+like "what else treats acne" become indexed joins instead of LIKE scans.
+`link_catalog()` does the same for drugs already in the table
+(`manage.py link_drugs`).
+"""
+import pandas as pd
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .models import Condition, Drug, DrugClass, DrugClassMembership, DrugCondition, DrugRelation
+
+LINK_CHUNK_SIZE = 2000
+
+# Drug columns the links are parsed from
+LINK_COLUMNS = ("drug_name", "medical_condition", "drug_classes", "related_drugs")
+
+
+def _tidy(series):
+    return series.str.replace(r"\s+", " ", regex=True).str.strip().str.slice(0, 255)
+
+
+def _explode(df, column, separator, part=None):
+    """(drug key, value) pairs from a delimited text column, one row per value."""
+    values = df[column].str.split(separator).explode()
+    if part is not None:
+        values = values.str.split(":").str[part]
+    pairs = pd.DataFrame({"key": values.index, "value": _tidy(values.fillna(""))})
+    pairs = pairs[pairs["value"] != ""]
+    return pairs[~pd.DataFrame({"key": pairs["key"], "folded": pairs["value"].str.lower()}).duplicated()]
+
+
+def parse_links(df):
+    """Condition, class and related-drug pairs of a cleaned import chunk, keyed by its index."""
+    conditions = pd.DataFrame({"key": df.index, "value": _tidy(df["medical_condition"])})
+    return {
+        "conditions": conditions[conditions["value"] != ""],
+        "classes": _explode(df, "drug_classes", ","),
+        # "name: link | name: link"
+        "related": _explode(df, "related_drugs", "|", part=0),
+    }
+
+
+def _ids_by_name(model, names):
+    """Create the missing `model` rows named `names`; returns lower-cased name -> id."""
+    wanted = {name.lower(): name for name in names}
+
+    def existing():
+        # Case-insensitively on every backend, not only under MySQL's collation
+        rows = model.objects.annotate(folded=Lower("name")).filter(folded__in=list(wanted))
+        return {name.lower(): pk for pk, name in rows.values_list("id", "name")}
+
+    found = existing()
+    missing = [name for folded, name in wanted.items() if folded not in found]
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        found = existing()
+    return found
+
+
+def link_chunk(df):
+    """Replace the graph links of the drugs in `df` (as upserted by drugs.importer)."""
+    if df.empty:
+        return
+    # Keys are compared case-insensitively, like MySQL's default collation does
+    drug_ids = {
+        (name.lower(), condition.lower()): pk
+        for pk, name, condition in Drug.objects.filter(drug_name__in=set(df["drug_name"]))
+        .values_list("id", "drug_name", "medical_condition")
+    }
+    keys = pd.Series(
+        [drug_ids.get((n.lower(), c.lower())) for n, c in zip(df["drug_name"], df["medical_condition"])],
+        index=df.index,
+    )
+    links = parse_links(df)
+
+    with transaction.atomic():
+        ids = [int(pk) for pk in keys.dropna()]
+        DrugCondition.objects.filter(drug_id__in=ids).delete()
+        DrugClassMembership.objects.filter(drug_id__in=ids).delete()
+        DrugRelation.objects.filter(drug_id__in=ids).delete()
+
+        condition_ids = _ids_by_name(Condition, links["conditions"]["value"])
+        class_ids = _ids_by_name(DrugClass, links["classes"]["value"])
+        DrugCondition.objects.bulk_create([
+            DrugCondition(drug_id=int(keys[key]), condition_id=condition_ids[value.lower()])
+            for key, value in links["conditions"].itertuples(index=False) if pd.notna(keys[key])
+        ], ignore_conflicts=True)
+        DrugClassMembership.objects.bulk_create([
+            DrugClassMembership(drug_id=int(keys[key]), drug_class_id=class_ids[value.lower()])
+            for key, value in links["classes"].itertuples(index=False) if pd.notna(keys[key])
+        ], ignore_conflicts=True)
+        DrugRelation.objects.bulk_create([
+            DrugRelation(drug_id=int(keys[key]), related_name=value)
+            for key, value in links["related"].itertuples(index=False) if pd.notna(keys[key])
+        ], ignore_conflicts=True)
+
+
+def link_catalog(chunk_size=LINK_CHUNK_SIZE, on_chunk=None):
+    """Rebuild the links of every drug in the table, in id-keyset chunks. Returns the number of drugs."""
+    rows = Drug.objects.order_by("id").values_list("id", *LINK_COLUMNS)
+    last_id, total = 0, 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not batch:
+            return total
+        last_id = batch[-1][0]
+        link_chunk(pd.DataFrame([row[1:] for row in batch], columns=LINK_COLUMNS).fillna(""))
+        total += len(batch)
+        if on_chunk:
+            on_chunk(total)
+
+
+# -- queries --------------------------------------------------------------
+
+def drugs_for_condition(name):
+    return Drug.objects.filter(condition_links__condition__name__iexact=name)
+
+
+def drugs_in_class(name):
+    return Drug.objects.filter(class_links__drug_class__name__iexact=name)
+
+
+def related_drugs(name):
+    """Catalog entries related to drug `name`, in either direction."""
+    listed = DrugRelation.objects.filter(drug__drug_name=name).values_list("related_name", flat=True)
+    listing = DrugRelation.objects.filter(related_name=name).values_list("drug__drug_name", flat=True)
+    names = set(listed) | set(listing)
+    return Drug.objects.filter(drug_name__in=names).exclude(drug_name=name)
@@ -0,0 +1,82 @@
+"""
+Streaming import of the drug catalog CSV.
+
+The file is read a chunk at a time. Each chunk is cleaned with whole-column
+pandas operations (no per-row loop), then upserted on the natural key
+(drug_name, medical_condition) in its own transaction, so re-running an
+import updates the catalog instead of duplicating it and a failure keeps
+the chunks already committed. The condition, class and related-drug
+links of each chunk are rebuilt in the same transaction (drugs.graph),
+and the client snapshot (drugs.snapshot) once the whole file is in.
+"""
+import pandas as pd
+from django.db import connection, transaction
+
+from .catalog import bump
+from .graph import link_chunk
+from . import snapshot
+from .models import Drug
+
+IMPORT_CHUNK_SIZE = 2000
+
+NATURAL_KEY = ("drug_name", "medical_condition")
+
+TEXT_COLUMNS = (
+    "drug_name", "medical_condition", "side_effects", "generic_name", "drug_classes", "brand_names",
+    "activity", "rx_otc", "pregnancy_category", "csa", "alcohol", "related_drugs",
+    "medical_condition_description", "drug_link",
+)
+COLUMNS = TEXT_COLUMNS + ("rating", "no_of_reviews")
+UPDATE_FIELDS = [name for name in COLUMNS if name not in NATURAL_KEY]
+
+
+def clean_chunk(df):
+    """Normalize one chunk column-wise; returns the rows worth importing."""
+    df = df.reindex(columns=COLUMNS)
+    for name in TEXT_COLUMNS:
+        column = df[name].fillna("").astype(str).str.strip()
+        max_length = Drug._meta.get_field(name).max_length
+        # CharField limits are enforced by MySQL in strict mode; clip instead of failing the chunk
+        df[name] = column.str.slice(0, max_length) if max_length else column
+    df["rating"] = pd.to_numeric(df["rating"], errors="coerce").fillna(0.0).astype(float)
+    df["no_of_reviews"] = pd.to_numeric(df["no_of_reviews"], errors="coerce").fillna(0).astype(int)
+    df = df[df["drug_name"] != ""]
+    # One row per key: the same key twice in one upsert statement is an error on some databases
+    return df.drop_duplicates(subset=list(NATURAL_KEY), keep="last")
+
+
+def upsert(df):
+    drugs = [Drug(**row) for row in df.to_dict("records")]
+    options = {"update_conflicts": True, "update_fields": UPDATE_FIELDS}
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    if connection.features.supports_update_conflicts_with_target:
+        options["unique_fields"] = list(NATURAL_KEY)
+    Drug.objects.bulk_create(drugs, **options)
+    return len(drugs)
+
+
+def import_catalog(path, chunk_size=IMPORT_CHUNK_SIZE, on_chunk=None):
+    """Upsert every row of the CSV at `path`. Returns a summary dict."""
+    before = Drug.objects.count()
+    rows = imported = 0
+    reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    for chunk in reader:
+        rows += len(chunk)
+        cleaned = clean_chunk(chunk)
+        with transaction.atomic():
+            imported += upsert(cleaned)
+            link_chunk(cleaned)
+        if on_chunk:
+            on_chunk(rows, imported)
+    created = Drug.objects.count() - before
+    # Workers rebuild their search indexes when they see the new version
+    version = bump()
+    snapshot.publish()
+    return {
+        "rows": rows,
+        "imported": imported,
+        "created": created,
+        "updated": imported - created,
+        "skipped": rows - imported,
+        "catalog_version": version,
+    }
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from drugs import snapshot
+from drugs.graph import LINK_CHUNK_SIZE, link_catalog
+from drugs.models import DrugClassMembership, DrugCondition, DrugRelation
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the condition, class and related-drug links from the drugs already in the table "
+        "(import_drugs keeps them current; run this once for a catalog imported before the links existed)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=LINK_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        def progress(total):
+            self.stderr.write(f"  {total} drugs linked")
+
+        total = link_catalog(chunk_size=options["chunk_size"], on_chunk=progress)
+        # The client snapshot lists each drug's classes
+        snapshot.publish()
+        self.stdout.write(self.style.SUCCESS(
+            f"Linked {total} drugs: {DrugCondition.objects.count()} condition, "
+            f"{DrugClassMembership.objects.count()} class and {DrugRelation.objects.count()} related-drug links."
+        ))
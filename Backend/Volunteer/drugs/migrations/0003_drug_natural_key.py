@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:55
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Length
+
+
+def drop_duplicate_imports(apps, schema_editor):
+    """Earlier import_drugs runs inserted the whole catalog again each time; keep the first copy."""
+    Drug = apps.get_model("drugs", "Drug")
+    too_long = Drug.objects.annotate(length=Length("medical_condition")).filter(length__gt=255)
+    for drug in too_long.only("medical_condition"):
+        drug.medical_condition = drug.medical_condition[:255]
+        drug.save(update_fields=["medical_condition"])
+    duplicated = (
+        Drug.objects.values("drug_name", "medical_condition")
+        .annotate(first=Min("id"), copies=Count("id"))
+        .filter(copies__gt=1)
+    )
+    for group in duplicated.iterator():
+        Drug.objects.filter(
+            drug_name=group["drug_name"], medical_condition=group["medical_condition"],
+        ).exclude(id=group["first"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0002_catalog_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_imports, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='drug',
+            name='medical_condition',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='drug',
+            constraint=models.UniqueConstraint(fields=('drug_name', 'medical_condition'), name='uniq_drug_condition'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0003_drug_natural_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Condition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DrugClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DrugClassMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('drug', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_links', to='drugs.drug')),
+                ('drug_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drug_links', to='drugs.drugclass')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('drug', 'drug_class'), name='uniq_drug_class_link')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DrugCondition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('condition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drug_links', to='drugs.condition')),
+                ('drug', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='condition_links', to='drugs.drug')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('drug', 'condition'), name='uniq_drug_condition_link')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DrugRelation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('related_name', models.CharField(db_index=True, max_length=255)),
+                ('drug', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relations', to='drugs.drug')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('drug', 'related_name'), name='uniq_drug_relation')],
+            },
+        ),
+    ]
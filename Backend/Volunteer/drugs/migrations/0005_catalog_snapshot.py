@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0004_drug_graph'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSnapshot',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField()),
+                ('etag', models.CharField(max_length=64)),
+                ('content', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 
 class Drug(models.Model):
+    # (drug_name, medical_condition) is the natural key import_drugs upserts on:
+    # the source catalog lists a drug once per condition it treats
     drug_name = models.CharField(max_length=255)
-    medical_condition = models.TextField()
+    medical_condition = models.CharField(max_length=255)
     side_effects= models.CharField(max_length=255)
     generic_name = models.CharField(max_length=255)
     drug_classes = models.TextField()
@@ -18,5 +20,86 @@ class Drug(models.Model):
     no_of_reviews = models.IntegerField(null=True, blank=True)
     drug_link = models.URLField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["drug_name", "medical_condition"], name="uniq_drug_condition"),
+        ]
+
+    def __str__(self):
+        return self.drug_name
+
+class CatalogState(models.Model):
+    """
+    Version of the drug catalog, bumped whenever it changes (import_drugs,
+    admin edits). Workers rebuild their in-memory search structures when
+    it moves.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class CatalogSnapshot(models.Model):
+    """Gzipped columnar catalog served to devices for offline search (drugs/snapshot.py)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    # CatalogState version it was built from
+    version = models.PositiveIntegerField()
+    # Hash of the uncompressed content; unchanged when the listed columns are
+    etag = models.CharField(max_length=64)
+    content = models.BinaryField()
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version} ({len(self.content)} bytes)"
+
+
+class Condition(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class DrugClass(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
     def __str__(self):
-        return self.drug_name
\ No newline at end of file
+        return self.name
+
+
+# Join tables filled by import_drugs from the delimited text columns of Drug
+# (see drugs/graph.py), or by link_drugs for drugs already in the table;
+# the text columns are kept as imported.
+
+class DrugCondition(models.Model):
+    drug = models.ForeignKey(Drug, on_delete=models.CASCADE, related_name="condition_links")
+    condition = models.ForeignKey(Condition, on_delete=models.CASCADE, related_name="drug_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["drug", "condition"], name="uniq_drug_condition_link"),
+        ]
+
+
+class DrugClassMembership(models.Model):
+    drug = models.ForeignKey(Drug, on_delete=models.CASCADE, related_name="class_links")
+    drug_class = models.ForeignKey(DrugClass, on_delete=models.CASCADE, related_name="drug_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["drug", "drug_class"], name="uniq_drug_class_link"),
+        ]
+
+
+class DrugRelation(models.Model):
+    drug = models.ForeignKey(Drug, on_delete=models.CASCADE, related_name="relations")
+    # Drug name as listed in related_drugs; it may not be in the catalog
+    related_name = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["drug", "related_name"], name="uniq_drug_relation"),
+        ]
@@ -0,0 +1,233 @@
+"""
+In-memory autocomplete over drug, generic and brand names.
+
+Every name is normalized (lower-case, punctuation to spaces) and indexed
+twice: its words go into one sorted array, so a word prefix is a bisect
+range, and its character trigrams go into posting lists, so a fragment
+from the middle of a word ("cillin") is found without a table scan.
+
+Matches are ranked by quality (exact name, name prefix, word prefixes,
+fragment), then by which field matched (drug name before generic before
+brand), then by rating and number of reviews, and only the top K are
+returned.
+
+`fuzzy()` finds misspelled names ("amoxcillin", "paracetmol"). A name
+within edit distance k of the query shares all but at most 4k of its
+trigrams, so for longer queries the same postings give the candidates.
+That bound says nothing about short queries, so short names are also
+kept in a symmetric-delete table: every string left after removing up
+to two letters, stored as sorted hashes in NumPy arrays to stay compact.
+A short name is a candidate when one of its deletes equals one of the
+query's. Either way, candidates get an exact, early-exit distance check.
+"""
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from .catalog import CatalogCache
+from .models import Drug
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+EXACT, PREFIX, WORDS, FRAGMENT = range(4)
+MAX_DISTANCE = 2
+FUZZY_MIN_LENGTH = 3
+# Longest query the trigram filter cannot narrow down, plus MAX_DISTANCE
+SHORT_NAME = 4 * MAX_DISTANCE + MAX_DISTANCE
+FIELDS = ("drug_name", "generic_name", "brand_name")
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    return _NON_ALNUM.sub(" ", (text or "").lower()).strip()
+
+
+def split_brands(text):
+    return [brand.strip() for brand in (text or "").split(",") if brand.strip()]
+
+
+def trigrams(text, pad=True):
+    """Padding marks word edges in indexed names; fragments from a query may start mid-word."""
+    padded = f" {text} " if pad else text
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletes(text, k):
+    """Every string left after removing up to `k` characters of `text`."""
+    found = frontier = {text}
+    for _ in range(k):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found = found | frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (a swap of adjacent letters counts
+    as one edit), or `limit + 1` as soon as it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class DrugIndex:
+    def __init__(self, rows):
+        """`rows`: (id, drug_name, generic_name, brand_names, rating, no_of_reviews)."""
+        self.drugs = {}           # drug id -> (drug_name, generic_name, rating, no_of_reviews)
+        self.names = []           # name id -> (drug id, field, display, normalized)
+        words = []
+        self.grams = defaultdict(list)
+        short_keys, short_names = [], []
+        seen = set()
+        for pk, drug_name, generic_name, brand_names, rating, reviews in rows:
+            self.drugs[pk] = (drug_name, generic_name, rating or 0.0, reviews or 0)
+            candidates = [(0, drug_name), (1, generic_name)] + [(2, b) for b in split_brands(brand_names)]
+            for field, display in candidates:
+                normalized = normalize(display)
+                if not normalized or (pk, normalized) in seen:
+                    continue
+                seen.add((pk, normalized))
+                name_id = len(self.names)
+                self.names.append((pk, field, display.strip(), normalized))
+                words.extend((word, name_id) for word in set(normalized.split()))
+                for gram in trigrams(normalized):
+                    self.grams[gram].append(name_id)
+                if len(normalized) <= SHORT_NAME:
+                    for key in deletes(normalized, MAX_DISTANCE):
+                        short_keys.append(hash(key))
+                        short_names.append(name_id)
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_names = [name_id for _, name_id in words]
+        order = np.argsort(np.array(short_keys, dtype=np.int64), kind="stable")
+        self.short_keys = np.array(short_keys, dtype=np.int64)[order]
+        self.short_names = np.array(short_names, dtype=np.int64)[order]
+
+    @classmethod
+    def from_catalog(cls):
+        rows = Drug.objects.values_list(
+            "id", "drug_name", "generic_name", "brand_names", "rating", "no_of_reviews",
+        ).iterator(chunk_size=2000)
+        return cls(rows)
+
+    def _prefixed(self, prefix):
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + "\uffff", lo=start)
+        return set(self.word_names[start:end])
+
+    def _fragment(self, query):
+        postings = sorted((self.grams.get(gram, ()) for gram in trigrams(query, pad=False)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        found = set(postings[0])
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+            if not found:
+                break
+        return {name_id for name_id in found if query in self.names[name_id][3]}
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        query = normalize(query)
+        if not query:
+            return []
+        tokens = query.split()
+        matched = self._prefixed(tokens[0])
+        for token in tokens[1:]:
+            matched &= self._prefixed(token)
+
+        best = {}   # drug id -> (quality, field, name id)
+        for name_id in matched:
+            pk, field, _, normalized = self.names[name_id]
+            quality = EXACT if normalized == query else PREFIX if normalized.startswith(query) else WORDS
+            if best.get(pk, (FRAGMENT + 1,))[:2] > (quality, field):
+                best[pk] = (quality, field, name_id)
+        if len(query) >= 3:
+            for name_id in self._fragment(query) - matched:
+                pk, field = self.names[name_id][:2]
+                if best.get(pk, (FRAGMENT + 1,))[:2] > (FRAGMENT, field):
+                    best[pk] = (FRAGMENT, field, name_id)
+
+        return self._top(best, limit)
+
+    def fuzzy(self, query, limit=DEFAULT_LIMIT):
+        """Names within edit distance 2 (1 for queries under 5 letters) of `query`."""
+        query = normalize(query)
+        if len(query) < FUZZY_MIN_LENGTH:
+            return []
+        k = MAX_DISTANCE if len(query) > 4 else 1
+        grams = trigrams(query)
+        needed = len(grams) - 4 * k
+        if needed > 0:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.grams.get(gram, ()))
+            candidates = [name_id for name_id, count in shared.items() if count >= needed]
+        else:
+            keys = np.array([hash(key) for key in deletes(query, k)], dtype=np.int64)
+            starts = np.searchsorted(self.short_keys, keys, side="left")
+            ends = np.searchsorted(self.short_keys, keys, side="right")
+            # Hash collisions only add candidates; the distance check drops them
+            candidates = np.unique(np.concatenate(
+                [self.short_names[start:end] for start, end in zip(starts, ends)]
+            )).tolist()
+
+        best = {}   # drug id -> (distance, field, name id)
+        for name_id in candidates:
+            pk, field, _, normalized = self.names[name_id]
+            distance = edit_distance(query, normalized, k)
+            if distance <= k and best.get(pk, (k + 1,))[:2] > (distance, field):
+                best[pk] = (distance, field, name_id)
+        return self._top(best, limit, "distance")
+
+    def _top(self, best, limit, score_name=None):
+        """The `limit` best drugs of `best` (drug id -> (score, field, name id))."""
+        def rank(pk):
+            score, field, _ = best[pk]
+            drug_name, _, rating, reviews = self.drugs[pk]
+            return score, field, -rating, -reviews, drug_name.lower(), pk
+
+        results = []
+        for pk in heapq.nsmallest(limit, best, key=rank):
+            score, field, name_id = best[pk]
+            drug_name, generic_name, rating, reviews = self.drugs[pk]
+            result = {
+                "id": pk,
+                "drug_name": drug_name,
+                "generic_name": generic_name,
+                "matched": self.names[name_id][2],
+                "matched_field": FIELDS[field],
+                "rating": rating,
+                "no_of_reviews": reviews,
+            }
+            if score_name:
+                result[score_name] = score
+            results.append(result)
+        return results
+
+
+index = CatalogCache(DrugIndex.from_catalog)
+
+
+def autocomplete(query, limit=DEFAULT_LIMIT):
+    return index.get().search(query, limit)
+
+
+def fuzzy(query, limit=DEFAULT_LIMIT):
+    return index.get().fuzzy(query, limit)
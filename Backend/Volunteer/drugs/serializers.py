@@ -1,7 +1,17 @@
 from rest_framework import serializers
 from .models import Drug
 
+SUMMARY_FIELDS = ["id", "drug_name", "generic_name", "medical_condition", "rx_otc", "rating", "no_of_reviews"]
+
+
 class DrugSerializer(serializers.ModelSerializer):
     class Meta:
         model = Drug
         fields = '__all__'
+
+
+class DrugSummarySerializer(serializers.ModelSerializer):
+    """List rows: no long description texts."""
+    class Meta:
+        model = Drug
+        fields = SUMMARY_FIELDS
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .catalog import bump
+from .models import Drug
+
+
+def catalog_changed(sender, raw=False, **kwargs):
+    # import_drugs writes in bulk (no signals) and bumps once itself
+    if raw:
+        return
+    transaction.on_commit(bump)
+
+
+post_save.connect(catalog_changed, sender=Drug, dispatch_uid="drugs_catalog_saved")
+post_delete.connect(catalog_changed, sender=Drug, dispatch_uid="drugs_catalog_deleted")
@@ -0,0 +1,71 @@
+"""
+Compact catalog snapshot for client-side drug search.
+
+One gzipped JSON document with the catalog laid out by column instead of
+by row, and drug classes dictionary-encoded:
+
+    {"columns": ["id", "drug_name", "generic_name", "classes_of"],
+     "classes": ["Aminopenicillins", ...],
+     "id": [...], "drug_name": [...], "generic_name": [...],
+     "classes_of": [[0, 3], ...]}
+
+import_drugs rebuilds it once the catalog changes and stores it in
+CatalogSnapshot, so requests only serve stored bytes. The ETag is a hash
+of the content, so a device downloads it again only when these columns
+really changed, not on every catalog version.
+"""
+import gzip
+import hashlib
+import json
+
+from .catalog import CATALOG, CatalogCache, current_version
+from .models import CatalogSnapshot, Drug, DrugClassMembership
+
+COLUMNS = ("id", "drug_name", "generic_name", "classes_of")
+
+
+def build_content():
+    rows = list(Drug.objects.order_by("id").values_list("id", "drug_name", "generic_name"))
+    class_names, class_index, classes_of = [], {}, {}
+    links = DrugClassMembership.objects.order_by("drug_id", "drug_class__name").values_list(
+        "drug_id", "drug_class__name",
+    )
+    for drug_id, name in links.iterator(chunk_size=5000):
+        if name not in class_index:
+            class_index[name] = len(class_names)
+            class_names.append(name)
+        classes_of.setdefault(drug_id, []).append(class_index[name])
+    document = {
+        "columns": list(COLUMNS),
+        "classes": class_names,
+        "id": [pk for pk, _, _ in rows],
+        "drug_name": [name for _, name, _ in rows],
+        "generic_name": [generic for _, _, generic in rows],
+        "classes_of": [classes_of.get(pk, []) for pk, _, _ in rows],
+    }
+    return json.dumps(document, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def publish():
+    """Rebuild and store the snapshot for the current catalog version."""
+    version = current_version()
+    content = build_content()
+    snapshot, _ = CatalogSnapshot.objects.update_or_create(name=CATALOG, defaults={
+        "version": version,
+        "etag": hashlib.sha256(content).hexdigest(),
+        # mtime=0 keeps the gzip bytes identical for identical content
+        "content": gzip.compress(content, compresslevel=9, mtime=0),
+    })
+    return snapshot
+
+
+def load():
+    """The stored snapshot, rebuilt here if the catalog changed without one (e.g. admin edits)."""
+    snapshot = CatalogSnapshot.objects.filter(name=CATALOG).first()
+    if snapshot is None or snapshot.version != current_version():
+        snapshot = publish()
+    snapshot.content = bytes(snapshot.content)
+    return snapshot
+
+
+latest = CatalogCache(load)
@@ -1,3 +1,250 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .importer import COLUMNS, import_catalog
+from .models import CatalogSnapshot, Drug, DrugClassMembership, DrugCondition, DrugRelation
+from .search import SHORT_NAME, DrugIndex, edit_distance, index
+from .views import etag_matches
+
+
+def make_drug(drug_name, medical_condition="Acne", **fields):
+    values = {
+        "side_effects": "", "generic_name": "", "drug_classes": "", "brand_names": "", "activity": "",
+        "rx_otc": "Rx", "pregnancy_category": "", "csa": "N", "alcohol": "", "related_drugs": "",
+        "medical_condition_description": "", "rating": 5.0, "no_of_reviews": 10,
+        "drug_link": "https://www.drugs.com/", **fields,
+    }
+    return Drug.objects.create(drug_name=drug_name, medical_condition=medical_condition, **values)
+
+
+class DrugTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=False,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def names(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row["drug_name"] for row in response.data["results"]]
+
+
+class EtagMatchTests(SimpleTestCase):
+    etag = 'W/"abc123"'
+
+    def test_weak_and_strong_forms_match(self):
+        self.assertTrue(etag_matches('W/"abc123"', self.etag))
+        self.assertTrue(etag_matches('"abc123"', self.etag))
+        self.assertTrue(etag_matches('"zzz", W/"abc123"', self.etag))
+
+    def test_star_matches_anything(self):
+        self.assertTrue(etag_matches("*", self.etag))
+
+    def test_other_or_partial_tags_do_not_match(self):
+        self.assertFalse(etag_matches("", self.etag))
+        self.assertFalse(etag_matches('W/"abc12"', self.etag))
+        self.assertFalse(etag_matches('W/"abc1234"', self.etag))
+
+
+class DrugGraphTests(DrugTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # As left by an import from before the link tables existed
+        make_drug(
+            "doxycycline", drug_classes="Tetracyclines, Miscellaneous antimalarials", rating=6.5,
+            related_drugs="minocycline: https://www.drugs.com/minocycline.html | tretinoin: https://www.drugs.com/t.html",
+        )
+        make_drug("doxycycline", "Malaria", drug_classes="Tetracyclines")
+        make_drug("minocycline", drug_classes="tetracyclines", rating=7.0)
+        make_drug("tretinoin", drug_classes="Topical acne agents", rating=8.0)
+        make_drug("artemether", "Malaria", drug_classes="Miscellaneous antimalarials")
+
+    def test_link_drugs_backfills_the_graph_from_existing_rows(self):
+        self.assertEqual(self.names("/api/drugs/by-condition/", name="Acne"), [])
+        out = StringIO()
+        call_command("link_drugs", chunk_size=2, stdout=out, stderr=StringIO())
+        self.assertIn("Linked 5 drugs: 5 condition, 6 class and 2 related-drug links.", out.getvalue())
+
+        self.assertEqual(
+            self.names("/api/drugs/by-condition/", name="Acne"), ["tretinoin", "minocycline", "doxycycline"],
+        )
+        self.assertEqual(
+            self.names("/api/drugs/by-class/", name="Tetracyclines"), ["minocycline", "doxycycline", "doxycycline"],
+        )
+        self.assertEqual(
+            sorted(self.names("/api/drugs/by-class/", name="Miscellaneous antimalarials")),
+            ["artemether", "doxycycline"],
+        )
+        # Listed by doxycycline, and listing it
+        self.assertEqual(sorted(self.names("/api/drugs/related/", name="minocycline")), ["doxycycline", "doxycycline"])
+        self.assertEqual(self.names("/api/drugs/related/", name="doxycycline"), ["tretinoin", "minocycline"])
+
+    def test_running_it_again_replaces_links_instead_of_adding(self):
+        call_command("link_drugs", stdout=StringIO(), stderr=StringIO())
+        Drug.objects.filter(drug_name="tretinoin").update(drug_classes="Retinoids")
+        call_command("link_drugs", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(DrugCondition.objects.count(), 5)
+        self.assertEqual(DrugClassMembership.objects.count(), 6)
+        self.assertEqual(DrugRelation.objects.count(), 2)
+        self.assertEqual(self.names("/api/drugs/by-class/", name="Retinoids"), ["tretinoin"])
+        self.assertEqual(self.names("/api/drugs/by-class/", name="Topical acne agents"), [])
+
+    def test_graph_lookups_need_a_name(self):
+        self.assertEqual(self.client.get("/api/drugs/by-condition/").status_code, 400)
+        self.assertEqual(self.client.get("/api/drugs/related/", {"name": "x", "limit": "many"}).status_code, 400)
+
+
+class AutocompleteTests(DrugTestCase):
+    # (id, drug_name, generic_name, brand_names, rating, no_of_reviews)
+    ROWS = [
+        (1, "Cillin", "", "", 1.0, 1),
+        (2, "Cillin Forte", "", "", 2.0, 1),
+        (3, "Super Cillin", "", "", 3.0, 1),
+        (4, "Amoxicillin", "", "", 9.0, 500),
+        (5, "Zeta", "", "", 1.0, 1),
+        (6, "Other", "zeta", "", 9.0, 1),
+        (7, "Third", "", "Alpha, ZETA", 10.0, 1),
+        (8, "Zeta", "", "", 2.0, 1),
+    ]
+
+    def ranked(self, query, limit=10):
+        return [row["id"] for row in DrugIndex(self.ROWS).search(query, limit)]
+
+    def test_match_quality_outranks_rating(self):
+        # Exact name, name prefix, word prefix, then a fragment inside a word
+        self.assertEqual(self.ranked("cillin"), [1, 2, 3, 4])
+        self.assertEqual(self.ranked("super cil"), [3])
+        self.assertEqual(self.ranked("cillin", limit=2), [1, 2])
+
+    def test_drug_name_before_generic_before_brand_then_rating(self):
+        self.assertEqual(self.ranked("zeta"), [8, 5, 6, 7])
+        results = DrugIndex(self.ROWS).search("zet")
+        self.assertEqual([(r["id"], r["matched"], r["matched_field"]) for r in results], [
+            (8, "Zeta", "drug_name"), (5, "Zeta", "drug_name"), (6, "zeta", "generic_name"), (7, "ZETA", "brand_name"),
+        ])
+
+    def test_endpoint_searches_the_catalog(self):
+        index.reset()
+        self.addCleanup(index.reset)
+        make_drug("Amoxicillin", generic_name="amoxicillin", brand_names="Amoxil, Moxatag", rating=8.0)
+        make_drug("Ampicillin", generic_name="ampicillin", rating=9.0)
+        self.assertEqual(self.names("/api/drugs/autocomplete/", q="amox"), ["Amoxicillin"])
+        self.assertEqual(self.names("/api/drugs/autocomplete/", q="moxa"), ["Amoxicillin"])
+        self.assertEqual(self.names("/api/drugs/autocomplete/", q="cillin"), ["Ampicillin", "Amoxicillin"])
+        self.assertEqual(self.client.get("/api/drugs/autocomplete/").status_code, 400)
+
+
+class FuzzyTests(DrugTestCase):
+    ROWS = [
+        (1, "Paracetamol", "acetaminophen", "Panadol", 7.0, 100),
+        (2, "Ibuprofen", "ibuprofen", "Advil, Motrin", 8.0, 100),
+        (3, "Zinc", "zinc sulfate", "", 6.0, 10),
+        (4, "Amoxicillin", "amoxicillin", "Amoxil", 8.5, 100),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.index = DrugIndex(self.ROWS)
+
+    def matches(self, query):
+        return [(row["matched"], row["distance"]) for row in self.index.fuzzy(query)]
+
+    def test_long_names_within_two_edits(self):
+        self.assertEqual(self.matches("paracetmol"), [("Paracetamol", 1)])
+        self.assertEqual(self.matches("parasetmol"), [("Paracetamol", 2)])
+        self.assertEqual(self.matches("amoxcilin"), [("Amoxicillin", 2)])
+        self.assertEqual(self.matches("parsetmal"), [])
+
+    def test_short_names_come_from_the_symmetric_delete_table(self):
+        self.assertLessEqual(len("ibuprofen"), SHORT_NAME)
+        # Too short for the trigram bound to rule anything out
+        with mock.patch.object(self.index, "grams", {}):
+            self.assertEqual(self.matches("ibuprfen"), [("Ibuprofen", 1)])
+            self.assertEqual(self.matches("ibuporfn"), [("Ibuprofen", 2)])
+            self.assertEqual(self.matches("advl"), [("Advil", 1)])
+            self.assertEqual(self.matches("zinx"), [("Zinc", 1)])
+        # Under five letters only one edit is allowed
+        self.assertEqual(self.matches("zxnx"), [])
+        self.assertEqual(self.matches("zi"), [])
+
+    def test_swapped_letters_are_one_edit(self):
+        self.assertEqual(edit_distance("ibuporfen", "ibuprofen", 2), 1)
+        self.assertEqual(edit_distance("abcdef", "ghijkl", 2), 3)
+        self.assertEqual(self.matches("ibuporfen"), [("Ibuprofen", 1)])
+
+    def test_suggestions_when_search_finds_nothing(self):
+        index.reset()
+        self.addCleanup(index.reset)
+        make_drug("Paracetamol", generic_name="acetaminophen", brand_names="Panadol")
+        self.assertEqual(self.names("/api/drugs/fuzzy/", q="panadl"), ["Paracetamol"])
+        response = self.client.get("/api/drugs/search/", {"name": "paracetmol"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual([row["drug_name"] for row in response.data["suggestions"]], ["Paracetamol"])
+
+
+class CatalogImportTests(DrugTestCase):
+    def write_csv(self, rows):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({"drug_classes": "Tetracyclines", "rating": "5", "no_of_reviews": "3", **row})
+        return path
+
+    def test_chunks_upsert_on_drug_and_condition(self):
+        path = self.write_csv([
+            {"drug_name": "doxycycline", "medical_condition": "Acne"},
+            {"drug_name": "doxycycline", "medical_condition": "Malaria"},
+            # Same key twice in one chunk: the last row wins
+            {"drug_name": "tretinoin", "medical_condition": "Acne", "rating": "6"},
+            {"drug_name": "tretinoin", "medical_condition": "Acne", "rating": "8"},
+            {"drug_name": "minocycline", "medical_condition": "Acne", "rating": "not rated"},
+            {"drug_name": "", "medical_condition": "Acne"},
+        ])
+        summary = import_catalog(path, chunk_size=2)
+        self.assertEqual(
+            {k: summary[k] for k in ("rows", "imported", "created", "updated", "skipped")},
+            {"rows": 6, "imported": 4, "created": 4, "updated": 0, "skipped": 2},
+        )
+        self.assertEqual(Drug.objects.get(drug_name="tretinoin").rating, 8.0)
+        self.assertEqual(Drug.objects.get(drug_name="minocycline").rating, 0.0)
+        self.assertTrue(CatalogSnapshot.objects.exists())
+
+        # Re-importing updates in place, across chunk boundaries too
+        path = self.write_csv([
+            {"drug_name": "minocycline", "medical_condition": "Acne", "rating": "7", "drug_classes": "Antibiotics"},
+            {"drug_name": "doxycycline", "medical_condition": "Acne", "rating": "9"},
+            {"drug_name": "artemether", "medical_condition": "Malaria"},
+        ])
+        summary = import_catalog(path, chunk_size=2)
+        self.assertEqual((summary["created"], summary["updated"]), (1, 2))
+        self.assertEqual(Drug.objects.count(), 5)
+        self.assertEqual(Drug.objects.filter(drug_name="doxycycline").count(), 2)
+        self.assertEqual(Drug.objects.get(drug_name="doxycycline", medical_condition="Acne").rating, 9.0)
+        self.assertEqual(summary["catalog_version"], 2)
+        # Links follow the upserted rows
+        self.assertEqual(self.names("/api/drugs/by-class/", name="Antibiotics"), ["minocycline"])
+        self.assertEqual(DrugClassMembership.objects.filter(drug__drug_name="minocycline").count(), 1)
+
+    def test_import_drugs_command_reports_the_summary(self):
+        path = self.write_csv([{"drug_name": "doxycycline", "medical_condition": "Acne"}])
+        out = StringIO()
+        call_command("import_drugs", path, stdout=out, stderr=StringIO())
+        self.assertIn("Imported 1 drugs from 1 rows (1 new, 0 updated, 0 skipped)", out.getvalue())
@@ -1,6 +1,16 @@
 from django.urls import path
-from .views import search_drug
+from .views import (
+    autocomplete_drug, catalog_snapshot, drug_detail, drugs_by_class, drugs_by_condition, drugs_related,
+    fuzzy_drug, search_drug,
+)
 
 urlpatterns = [
     path('search/', search_drug, name='search_drug'),  # ✅ Remove "api/drugs/"
+    path('<int:pk>/', drug_detail, name='drug_detail'),
+    path('autocomplete/', autocomplete_drug, name='autocomplete_drug'),
+    path('fuzzy/', fuzzy_drug, name='fuzzy_drug'),
+    path('by-condition/', drugs_by_condition, name='drugs_by_condition'),
+    path('by-class/', drugs_by_class, name='drugs_by_class'),
+    path('related/', drugs_related, name='drugs_related'),
+    path('snapshot/', catalog_snapshot, name='catalog_snapshot'),
 ]
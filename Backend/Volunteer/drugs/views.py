@@ -1,22 +1,161 @@
+import gzip
+
+from django.http import HttpResponse
+from django.utils.http import parse_etags
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import Drug
-from .serializers import DrugSerializer
+from .graph import drugs_for_condition, drugs_in_class, related_drugs
+from .pagination import DrugSearchPagination
+from .serializers import SUMMARY_FIELDS, DrugSerializer, DrugSummarySerializer
+from .search import DEFAULT_LIMIT, MAX_LIMIT, autocomplete, fuzzy
+from .snapshot import latest as latest_snapshot
 from rest_framework.permissions import BasePermission
 
 class IsDoctor(BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'doctor'
 
+# Query params that switch search_drug into the paginated summary shape
+SEARCH_PAGE_PARAMS = ("page", "limit")
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated, IsDoctor])
 def search_drug(request):
-    name = request.GET.get("name", "")
-    drugs = Drug.objects.filter(drug_name__icontains=name)
-    
-    if not drugs.exists():
+    """
+    GET ?name=<text>&page=<n>&limit=<n>: paginated summary rows (no long
+    description texts); the full record is at drugs/<id>/.
+
+    Without page/limit the old shape is kept for existing screens: a plain
+    list of full rows.
+    """
+    name = request.GET.get("name", "").strip()
+    if not name:
+        return Response({"message": "name is required"}, status=400)
+    drugs = Drug.objects.filter(drug_name__icontains=name).order_by("drug_name", "id")
+
+    if not any(param in request.GET for param in SEARCH_PAGE_PARAMS):
+        # Legacy shape: full, unpaginated rows
+        data = DrugSerializer(drugs, many=True).data
+        if not data:
+            return Response({"message": "Drug not found", "suggestions": fuzzy(name, 5)}, status=404)
+        return Response(data)
+
+    drugs = drugs.only(*SUMMARY_FIELDS)
+    paginator = DrugSearchPagination()
+    page = paginator.paginate_queryset(drugs, request)
+    if not page and paginator.page.number == 1:
+        # Most misses are typos; offer the closest names instead of nothing
+        return Response({"message": "Drug not found", "suggestions": fuzzy(name, 5)}, status=404)
+
+    return paginator.get_paginated_response(DrugSummarySerializer(page, many=True).data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def drug_detail(request, pk):
+    try:
+        drug = Drug.objects.get(pk=pk)
+    except Drug.DoesNotExist:
         return Response({"message": "Drug not found"}, status=404)
+    return Response(DrugSerializer(drug).data)
+
+
+def _query_and_limit(request, param="q", default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    query = request.GET.get(param, "").strip()
+    if not query:
+        return None, Response({"message": f"{param} is required"}, status=400)
+    try:
+        return (query, min(max(int(request.GET.get("limit", default)), 1), maximum)), None
+    except ValueError:
+        return None, Response({"message": "limit must be a number"}, status=400)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def autocomplete_drug(request):
+    """GET ?q=<prefix>&limit=<n>: best-ranked drugs whose drug, generic or brand name matches."""
+    params, error = _query_and_limit(request)
+    if error:
+        return error
+    return Response({"results": autocomplete(*params)})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def fuzzy_drug(request):
+    """GET ?q=<name>&limit=<n>: drugs whose names are within edit distance 2 of q, closest first."""
+    params, error = _query_and_limit(request)
+    if error:
+        return error
+    return Response({"results": fuzzy(*params)})
+
+
+# Graph lookups: indexed joins over the links import_drugs builds (drugs/graph.py)
+GRAPH_LIMIT = 100
+
+
+def _graph_response(request, lookup):
+    params, error = _query_and_limit(request, "name", GRAPH_LIMIT, GRAPH_LIMIT)
+    if error:
+        return error
+    name, limit = params
+    drugs = lookup(name).only(*SUMMARY_FIELDS).order_by("-rating", "-no_of_reviews", "id")[:limit]
+    return Response({"name": name, "results": DrugSummarySerializer(drugs, many=True).data})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def drugs_by_condition(request):
+    """GET ?name=<condition>: drugs listed for that condition, best rated first."""
+    return _graph_response(request, drugs_for_condition)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def drugs_by_class(request):
+    """GET ?name=<drug class>: drugs in that class, best rated first."""
+    return _graph_response(request, drugs_in_class)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def drugs_related(request):
+    """GET ?name=<drug name>: catalog drugs it lists as related, or that list it."""
+    return _graph_response(request, related_drugs)
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison (RFC 9110 13.1.2) of `etag` against an If-None-Match header."""
+    tags = parse_etags(if_none_match)
+    if tags == ["*"]:
+        return True
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def catalog_snapshot(request):
+    """
+    Compact columnar catalog (ids, names, generic names, classes) for
+    searching on the device. Send the last ETag as If-None-Match: the
+    answer is 304 until the catalog content actually changes.
+    """
+    snapshot = latest_snapshot.get()
+    # Weak: the gzip and plain bodies are the same content
+    etag = f'W/"{snapshot.etag}"'
+    headers = {
+        "ETag": etag, "Cache-Control": "private, no-cache", "X-Catalog-Version": str(snapshot.version),
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("If-None-Match", ""), etag):
+        return HttpResponse(status=304, headers=headers)
 
-    serializer = DrugSerializer(drugs, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = snapshot.content
+    else:
+        body = gzip.decompress(snapshot.content)
+    return HttpResponse(body, content_type="application/json", headers=headers)
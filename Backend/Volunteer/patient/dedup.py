@@ -0,0 +1,250 @@
+# patients/dedup.py
+"""
+Find and merge patients registered more than once.
+
+Comparing every patient with every other one is O(n²). Instead each
+patient is put into a few small "blocks" (same phonetic name, gender and
+age band, or same contact number) and pairs are only scored inside a
+block, so the work grows with the number of patients, not its square.
+
+Even so it reads every patient, so it is not run per request:
+`manage.py dedupe_patients` stores the suggestions (`store_report`) and
+the admin API serves the stored copy, which `merge_patients` keeps free
+of patients merged away since.
+"""
+import re
+from difflib import SequenceMatcher
+
+from django.db import transaction
+
+from sync.changelog import record_many
+from .exports import iter_rows
+from .models import DuplicateReport, Patient, Visit
+
+DEFAULT_THRESHOLD = 0.75
+
+REPORT = "patients"
+
+# Blocks bigger than this (e.g. a very common name) are skipped rather
+# than letting one block turn the pass back into O(n²).
+MAX_BLOCK_SIZE = 500
+
+AGE_BAND = 5
+AGE_SLACK = 2   # ages this close may straddle a band edge, so use both bands
+
+# Patients whose names are less alike than this are never suggested
+MIN_NAME_SIMILARITY = 0.7
+
+WEIGHTS = {"name": 0.6, "contact": 0.25, "age": 0.15}
+
+DEDUP_COLUMNS = {
+    "id": "id",
+    "name": "name",
+    "contact": "contact",
+    "age": "age",
+    "gender": "gender",
+    "cnic": "cnic_normalized",
+}
+
+_LETTERS = re.compile(r"[^a-z ]")
+_NON_DIGITS = re.compile(r"\D")
+_SOUNDEX = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556")
+
+
+class MergeConflict(Exception):
+    pass
+
+
+def normalize_name(name):
+    return " ".join(_LETTERS.sub(" ", (name or "").lower()).split())
+
+
+def normalize_contact(contact):
+    """Last 10 digits, so "+92 300 1234567" and "0300-1234567" agree."""
+    digits = _NON_DIGITS.sub("", contact or "")
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def soundex(word):
+    if not word:
+        return ""
+    codes = word.translate(_SOUNDEX)
+    out, last = word[0], codes[0]
+    for char, code in zip(word[1:], codes[1:]):
+        if code.isdigit() and code != last:
+            out += code
+        if char not in "hw":
+            last = code
+    return (out + "000")[:4]
+
+
+def phonetic_key(name):
+    """Soundex of the first and last name, order-insensitive."""
+    tokens = name.split()
+    if not tokens:
+        return None
+    return "".join(sorted({soundex(tokens[0]), soundex(tokens[-1])}))
+
+
+def blocking_keys(record):
+    keys = []
+    phonetic = phonetic_key(record["name"])
+    if phonetic and record["age"] is not None:
+        bands = {(record["age"] + d) // AGE_BAND for d in (-AGE_SLACK, AGE_SLACK)}
+        keys.extend(("name", phonetic, record["gender"], band) for band in bands)
+    if record["contact"]:
+        keys.append(("contact", record["contact"]))
+    return keys
+
+
+def score_pair(a, b):
+    """Return `(score, detail)`, or None if the two cannot be the same person."""
+    if a["gender"] != b["gender"]:
+        return None
+    if a["cnic"] and b["cnic"] and a["cnic"] != b["cnic"]:
+        return None
+    name = SequenceMatcher(None, a["name"], b["name"]).ratio()
+    if name < MIN_NAME_SIMILARITY:
+        return None
+
+    if a["contact"] and a["contact"] == b["contact"]:
+        contact = 1.0
+    elif a["contact"] and b["contact"] and a["contact"][-7:] == b["contact"][-7:]:
+        contact = 0.5
+    else:
+        contact = 0.0
+    age_gap = abs(a["age"] - b["age"])
+    age = 1.0 if age_gap <= 1 else 0.5 if age_gap <= 3 else 0.0
+
+    score = WEIGHTS["name"] * name + WEIGHTS["contact"] * contact + WEIGHTS["age"] * age
+    return score, {"name": round(name, 3), "contact": contact, "age": age}
+
+
+def _records(queryset):
+    names = list(DEDUP_COLUMNS)
+    for row in iter_rows(queryset, DEDUP_COLUMNS):
+        record = dict(zip(names, row))
+        record["name"] = normalize_name(record["name"])
+        record["contact"] = normalize_contact(record["contact"])
+        record["gender"] = (record["gender"] or "").strip().lower()[:1]
+        yield record
+
+
+def find_duplicates(queryset=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Return `(suggestions, stats)`. Each suggestion names the patient to keep
+    (one with a CNIC, else the oldest) and the likely duplicate, best first.
+    """
+    if queryset is None:
+        queryset = Patient.objects.all()
+
+    records = {}
+    blocks = {}
+    for record in _records(queryset):
+        records[record["id"]] = record
+        for key in blocking_keys(record):
+            blocks.setdefault(key, []).append(record["id"])
+
+    stats = {"patients": len(records), "blocks": len(blocks), "oversized_blocks": 0, "pairs_scored": 0}
+    seen = set()
+    suggestions = []
+    for ids in blocks.values():
+        if len(ids) < 2:
+            continue
+        if len(ids) > MAX_BLOCK_SIZE:
+            stats["oversized_blocks"] += 1
+            continue
+        for i, first in enumerate(ids):
+            for second in ids[i + 1:]:
+                pair = (first, second) if first < second else (second, first)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                stats["pairs_scored"] += 1
+                a, b = records[pair[0]], records[pair[1]]
+                result = score_pair(a, b)
+                if result is None or result[0] < threshold:
+                    continue
+                keep, duplicate = (b, a) if b["cnic"] and not a["cnic"] else (a, b)
+                suggestions.append({
+                    "keep": keep["id"],
+                    "duplicate": duplicate["id"],
+                    "score": round(result[0], 3),
+                    "match": result[1],
+                })
+
+    suggestions.sort(key=lambda s: (-s["score"], s["keep"], s["duplicate"]))
+    return suggestions, stats
+
+
+def store_report(threshold=DEFAULT_THRESHOLD):
+    """Run `find_duplicates` and store the result for the API; returns the report."""
+    suggestions, stats = find_duplicates(threshold=threshold)
+    report, _ = DuplicateReport.objects.update_or_create(name=REPORT, defaults={
+        "threshold": threshold,
+        "suggestions": suggestions,
+        "stats": stats,
+    })
+    return report
+
+
+def stored_report():
+    return DuplicateReport.objects.filter(name=REPORT).first()
+
+
+def _prune_report(merged_ids):
+    """Drop stored suggestions naming a patient that was merged away."""
+    report = DuplicateReport.objects.select_for_update().filter(name=REPORT).first()
+    if report is None:
+        return
+    kept = [s for s in report.suggestions if s["keep"] not in merged_ids and s["duplicate"] not in merged_ids]
+    if len(kept) != len(report.suggestions):
+        report.suggestions = kept
+        report.save(update_fields=["suggestions"])
+
+
+def merge_patients(keep_id, duplicate_ids):
+    """
+    Move every visit of `duplicate_ids` onto `keep_id` with one UPDATE,
+    copy over details the kept patient is missing, then delete the
+    duplicates. Returns a summary dict.
+    """
+    duplicate_ids = set(duplicate_ids) - {keep_id}
+    if not duplicate_ids:
+        raise MergeConflict("Nothing to merge.")
+
+    with transaction.atomic():
+        patients = Patient.objects.select_for_update().in_bulk([keep_id, *duplicate_ids])
+        missing = sorted({keep_id, *duplicate_ids} - set(patients))
+        if missing:
+            raise MergeConflict(f"Unknown patient ids: {missing}")
+        keep = patients.pop(keep_id)
+
+        cnics = {p.cnic_normalized for p in patients.values() if p.cnic_normalized}
+        if keep.cnic_normalized:
+            cnics.add(keep.cnic_normalized)
+        if len(cnics) > 1:
+            raise MergeConflict("Patients have different CNICs.")
+
+        visits = Visit.objects.filter(patient_id__in=duplicate_ids)
+        moved = list(visits.values_list("id", "doctor_id"))
+        visits.update(patient_id=keep_id)
+        # update() bypasses post_save, so tell delta sync about the moved visits
+        record_many(Visit(pk=pk, doctor_id=doctor_id) for pk, doctor_id in moved)
+
+        # Oldest duplicate first fills any blanks on the kept record
+        fill = {}
+        for duplicate in sorted(patients.values(), key=lambda p: p.pk):
+            for field in ("cnic", "address"):
+                if not getattr(keep, field) and field not in fill and getattr(duplicate, field):
+                    fill[field] = getattr(duplicate, field)
+
+        # Delete before saving so a CNIC moved onto `keep` is no longer taken
+        Patient.objects.filter(id__in=duplicate_ids).delete()
+        if fill:
+            for field, value in fill.items():
+                setattr(keep, field, value)
+            keep.save()
+        _prune_report(duplicate_ids)
+
+    return {"kept": keep_id, "merged": sorted(duplicate_ids), "visits_moved": len(moved)}
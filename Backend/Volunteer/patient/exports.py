@@ -0,0 +1,149 @@
+# patients/exports.py
+"""
+Streaming CSV / NDJSON extracts of visits (joined with patient and doctor)
+and of patients.
+
+Rows are pulled in primary-key keyset batches rather than one big
+`.iterator()`: Django's MySQL backend buffers an entire result set
+client-side, whereas `id > last_id LIMIT n` keeps memory flat on every
+backend no matter how many rows are exported.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Patient, Visit
+
+EXPORT_CHUNK_SIZE = 2000
+
+VISIT_COLUMNS = {
+    "visit_id": "id",
+    "date": "date",
+    "doctor_id": "doctor_id",
+    "doctor_name": "doctor__full_name",
+    "hospital": "doctor__hospital_name",
+    "patient_id": "patient_id",
+    "patient_name": "patient__name",
+    "cnic": "patient__cnic",
+    "age": "patient__age",
+    "gender": "patient__gender",
+    "bp": "bp",
+    "systolic": "systolic",
+    "diastolic": "diastolic",
+    "hr": "hr",
+    "temp": "temp",
+    "spo2": "spo2",
+    "bs": "bs",
+    "risk_level": "risk_level",
+    "history": "history",
+    "examination": "examination",
+    "investigation": "investigation",
+    "diagnosis": "diagnosis",
+    "treatment": "treatment",
+}
+
+PATIENT_COLUMNS = {
+    "patient_id": "id",
+    "name": "name",
+    "cnic": "cnic",
+    "age": "age",
+    "gender": "gender",
+    "contact": "contact",
+    "address": "address",
+}
+
+DATASETS = {
+    "visits": (Visit, VISIT_COLUMNS),
+    "patients": (Patient, PATIENT_COLUMNS),
+}
+
+
+def filter_visits(queryset, date_from=None, date_to=None, doctor_id=None, diagnosis=None):
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lt=date_to)
+    if doctor_id:
+        queryset = queryset.filter(doctor_id=doctor_id)
+    if diagnosis:
+        queryset = queryset.filter(diagnosis__icontains=diagnosis)
+    return queryset
+
+
+def iter_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield value tuples in `columns` order, one keyset batch at a time."""
+    fields = list(columns.values())
+    queryset = queryset.order_by("id").values_list(*fields)
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1][0]
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back."""
+    def write(self, value):
+        return value
+
+
+def render_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(list(columns))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(rows, columns):
+    names = list(columns)
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+RENDERERS = {
+    "csv": (render_csv, "text/csv"),
+    "ndjson": (render_ndjson, "application/x-ndjson"),
+}
+
+
+def gzip_stream(chunks, flush_bytes=64 * 1024):
+    """Incrementally gzip an iterable of str, emitting roughly every `flush_bytes`."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        pending += len(data)
+        out = compressor.compress(data)
+        if pending >= flush_bytes:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def buffer_stream(chunks, flush_bytes=64 * 1024):
+    """Join many small row strings into fewer, larger writes."""
+    buffer, size = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= flush_bytes:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def export_stream(dataset, fmt, queryset=None, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return an iterator of str (or bytes if `compress`) for the export."""
+    model, columns = DATASETS[dataset]
+    render, _ = RENDERERS[fmt]
+    if queryset is None:
+        queryset = model.objects.all()
+    chunks = render(iter_rows(queryset, columns, chunk_size), columns)
+    return gzip_stream(chunks) if compress else buffer_stream(chunks)
@@ -0,0 +1,229 @@
+# patients/importer.py
+"""
+Bulk import of offline-camp visits from CSV or NDJSON.
+
+Rows are read lazily and handled a chunk at a time: each chunk is
+validated, its CNICs are resolved with one IN query, unknown patients are
+bulk-created, and the visits are bulk-inserted in a single transaction.
+Only the current chunk is held in memory, so file size does not matter.
+"""
+import codecs
+import csv
+import json
+import uuid
+
+from django.db import transaction
+from rest_framework import serializers
+
+from prediction.scoring import schedule_scoring
+from sync.changelog import record_many
+from .models import Patient, Visit
+from .utils import normalize_cnic, parse_bp
+
+IMPORT_CHUNK_SIZE = 500
+
+# Errors kept in the returned summary; the rest are only counted (and
+# still passed to `on_error`) so a bad file cannot blow up memory.
+MAX_REPORTED_ERRORS = 1000
+
+PATIENT_FIELDS = ("name", "age", "gender", "contact", "address")
+VISIT_FIELDS = (
+    "bp", "hr", "temp", "spo2", "bs", "introduction", "history",
+    "examination", "investigation", "diagnosis", "treatment",
+)
+
+
+class ImportVisitRowSerializer(serializers.Serializer):
+    cnic = serializers.CharField(max_length=15)
+    date = serializers.DateTimeField(required=False, allow_null=True)
+
+    # Only needed when the CNIC is not registered yet
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    age = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    gender = serializers.CharField(max_length=10, required=False, allow_blank=True)
+    contact = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    address = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+    bp = serializers.CharField(max_length=10, required=False, allow_blank=True)
+    hr = serializers.IntegerField(required=False, allow_null=True)
+    temp = serializers.FloatField(required=False, allow_null=True)
+    spo2 = serializers.IntegerField(required=False, allow_null=True)
+    bs = serializers.FloatField(required=False, allow_null=True)
+    introduction = serializers.CharField(required=False, allow_blank=True)
+    history = serializers.CharField(required=False, allow_blank=True)
+    examination = serializers.CharField(required=False, allow_blank=True)
+    investigation = serializers.CharField(required=False, allow_blank=True)
+    diagnosis = serializers.CharField(required=False, allow_blank=True)
+    treatment = serializers.CharField(required=False, allow_blank=True)
+
+    def to_internal_value(self, data):
+        # CSV cells are always strings; treat empty cells as missing
+        data = {k: v for k, v in data.items() if k and v not in ("", None)}
+        return super().to_internal_value(data)
+
+    def validate_cnic(self, value):
+        if normalize_cnic(value) is None:
+            raise serializers.ValidationError("CNIC must contain digits.")
+        return value
+
+
+def read_rows(lines, fmt):
+    """
+    Yield `(line_number, row_dict)` from an iterable of text lines.
+    A line that cannot be parsed is yielded as `(line_number, None)`.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                # e.g. a field over csv.field_size_limit(); the reader goes
+                # on with the next line, so only this row is lost
+                yield reader.line_num + 1, None
+                continue
+            yield reader.line_num, row
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def decode_lines(binary_lines, encoding="utf-8-sig"):
+    return codecs.iterdecode(binary_lines, encoding)
+
+
+def guess_format(filename):
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+class VisitImporter:
+    def __init__(self, doctor, chunk_size=IMPORT_CHUNK_SIZE, on_error=None):
+        self.doctor = doctor
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+        self.summary = {
+            "rows": 0,
+            "visits_created": 0,
+            "patients_created": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+
+    def run(self, rows):
+        """
+        `rows` is an iterable of `(line_number, row_dict)`. Bytes that do not
+        decode end the import there: the rows before them are still imported
+        and the rest of the file is reported as one error.
+        """
+        chunk = []
+        line = 0
+        try:
+            for item in rows:
+                line = item[0]
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk)
+                    chunk = []
+        except UnicodeDecodeError as e:
+            self._error(line + 1, {"file": [f"Could not decode the rest of the file: {e}"]})
+        if chunk:
+            self._import_chunk(chunk)
+        # The in-process search index picks the visits up from the change log
+        return self.summary
+
+    def _error(self, line, errors):
+        self.summary["error_count"] += 1
+        report = {"line": line, "errors": errors}
+        if len(self.summary["errors"]) < MAX_REPORTED_ERRORS:
+            self.summary["errors"].append(report)
+        if self.on_error:
+            self.on_error(report)
+
+    def _import_chunk(self, chunk):
+        self.summary["rows"] += len(chunk)
+
+        valid = []
+        for line, raw in chunk:
+            if raw is None:
+                self._error(line, {"row": ["Could not parse row."]})
+                continue
+            serializer = ImportVisitRowSerializer(data=raw)
+            if serializer.is_valid():
+                data = serializer.validated_data
+                valid.append((line, normalize_cnic(data["cnic"]), data))
+            else:
+                self._error(line, serializer.errors)
+        if not valid:
+            return
+
+        with transaction.atomic():
+            patient_ids = self._resolve_patients(valid)
+            batch = uuid.uuid4()
+            visits = []
+            for line, key, data in valid:
+                patient_id = patient_ids.get(key)
+                if patient_id is None:
+                    self._error(line, {"cnic": ["Unknown CNIC and no patient details to register."]})
+                    continue
+                visit = Visit(
+                    doctor=self.doctor,
+                    patient_id=patient_id,
+                    import_batch=batch,
+                    **{f: data[f] for f in VISIT_FIELDS if f in data},
+                )
+                if data.get("date"):
+                    visit.date = data["date"]
+                # bulk_create skips Visit.save(), which normally derives these
+                visit.systolic, visit.diastolic = parse_bp(visit.bp)
+                visits.append(visit)
+            Visit.objects.bulk_create(visits)
+            self.summary["visits_created"] += len(visits)
+            if visits and visits[0].pk is None:
+                # Backends without RETURNING (MySQL) leave pks unset; re-read them for the change log
+                visits = Visit.objects.filter(import_batch=batch).only("id", "doctor")
+            record_many(visits)
+            # bulk_create skips the post_save hook that scores new visits
+            schedule_scoring([visit.pk for visit in visits])
+
+    def _resolve_patients(self, valid):
+        """Map normalized CNIC -> patient id, registering unknown CNICs."""
+        keys = {key for _, key, _ in valid}
+        found = dict(
+            Patient.objects.filter(cnic_normalized__in=keys)
+            .values_list("cnic_normalized", "id")
+        )
+
+        new = {}
+        for _, key, data in valid:
+            if key in found or key in new:
+                continue
+            if not all(data.get(f) not in (None, "") for f in ("name", "age", "gender", "contact")):
+                continue
+            new[key] = Patient(
+                cnic=data["cnic"],
+                cnic_normalized=key,
+                **{f: data[f] for f in PATIENT_FIELDS if f in data},
+            )
+        if new:
+            Patient.objects.bulk_create(new.values(), ignore_conflicts=True)
+            created = dict(
+                Patient.objects.filter(cnic_normalized__in=new.keys())
+                .values_list("cnic_normalized", "id")
+            )
+            self.summary["patients_created"] += len(created)
+            record_many(Patient(pk=pk) for pk in created.values())
+            found.update(created)
+        return found
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from patient.dedup import DEFAULT_THRESHOLD, MergeConflict, merge_patients, store_report
+
+
+class Command(BaseCommand):
+    help = "Find likely duplicate patients and store them for the admin API, optionally merging them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+        parser.add_argument(
+            "--merge", action="store_true",
+            help="Merge every suggested pair (review the list without this flag first)",
+        )
+
+    def handle(self, *args, **options):
+        report = store_report(threshold=options["threshold"])
+        suggestions, stats = report.suggestions, report.stats
+        for s in suggestions:
+            self.stdout.write(f"{s['score']:.3f}  keep {s['keep']}  duplicate {s['duplicate']}  {s['match']}")
+        self.stderr.write(
+            f"{stats['patients']} patients, {stats['blocks']} blocks "
+            f"({stats['oversized_blocks']} oversized skipped), {stats['pairs_scored']} pairs scored, "
+            f"{len(suggestions)} suggestions"
+        )
+        if not options["merge"]:
+            return
+
+        merged = set()
+        for s in suggestions:
+            # A patient merged away earlier in this run no longer exists
+            if s["keep"] in merged or s["duplicate"] in merged:
+                continue
+            try:
+                result = merge_patients(s["keep"], [s["duplicate"]])
+            except MergeConflict as e:
+                self.stderr.write(self.style.WARNING(f"Skipped {s['keep']} <- {s['duplicate']}: {e}"))
+                continue
+            merged.add(s["duplicate"])
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {s['duplicate']} into {s['keep']} ({result['visits_moved']} visits moved)"
+            ))
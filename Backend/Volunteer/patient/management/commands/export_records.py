@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from patient.exports import DATASETS, RENDERERS, export_stream, filter_visits
+from patient.models import Visit
+from patient.pagination import InvalidParam, parse_day
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or NDJSON extract of visits or patients"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(DATASETS))
+        parser.add_argument("--format", choices=list(RENDERERS), default="csv")
+        parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+        parser.add_argument("--date-from", help="YYYY-MM-DD (visits only)")
+        parser.add_argument("--date-to", help="YYYY-MM-DD, inclusive (visits only)")
+        parser.add_argument("--doctor-id", type=int, help="Visits only")
+        parser.add_argument("--diagnosis", help="Substring of the diagnosis (visits only)")
+
+    def handle(self, *args, **options):
+        queryset = None
+        if options["dataset"] == "visits":
+            try:
+                queryset = filter_visits(
+                    Visit.objects.all(),
+                    date_from=parse_day(options["date_from"]),
+                    date_to=parse_day(options["date_to"], end=True),
+                    doctor_id=options["doctor_id"],
+                    diagnosis=options["diagnosis"],
+                )
+            except InvalidParam as e:
+                raise CommandError(str(e))
+
+        chunks = export_stream(
+            options["dataset"], options["format"], queryset=queryset, compress=options["gzip"]
+        )
+        if options["output"]:
+            mode = "wb" if options["gzip"] else "w"
+            encoding = None if options["gzip"] else "utf-8"
+            with open(options["output"], mode, encoding=encoding, newline="" if encoding else None) as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Export written to {options['output']}"))
+        else:
+            out = sys.stdout.buffer if options["gzip"] else sys.stdout
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import User
+from patient.importer import IMPORT_CHUNK_SIZE, VisitImporter, decode_lines, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import offline-camp visits from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import")
+        parser.add_argument("--doctor", required=True, help="Email of the doctor the visits belong to")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument("--errors", help="Write the per-row error report (NDJSON) to this file")
+
+    def handle(self, *args, **options):
+        try:
+            doctor = User.objects.get(email=options["doctor"], role="doctor")
+        except User.DoesNotExist:
+            raise CommandError(f"No doctor with email {options['doctor']}")
+
+        fmt = options["format"] or guess_format(options["path"])
+        error_file = open(options["errors"], "w", encoding="utf-8") if options["errors"] else None
+
+        def on_error(report):
+            line = json.dumps(report)
+            if error_file:
+                error_file.write(line + "\n")
+            else:
+                self.stderr.write(line)
+
+        try:
+            with open(options["path"], "rb") as fh:
+                importer = VisitImporter(doctor, chunk_size=options["chunk_size"], on_error=on_error)
+                summary = importer.run(read_rows(decode_lines(fh), fmt))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Error during import: {e}")
+        finally:
+            if error_file:
+                error_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['visits_created']} visits from {summary['rows']} rows "
+            f"({summary['patients_created']} new patients, {summary['error_count']} errors)."
+        ))
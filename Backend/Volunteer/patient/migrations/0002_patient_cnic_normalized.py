@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:00
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_cnic_normalized(apps, schema_editor):
+    Patient = apps.get_model("patient", "Patient")
+    seen = set()
+    batch = []
+    patients = (
+        Patient.objects.exclude(cnic__isnull=True)
+        .exclude(cnic="")
+        .order_by("id")
+        .only("id", "cnic")
+    )
+    for patient in patients.iterator(chunk_size=2000):
+        normalized = re.sub(r"\D", "", patient.cnic) or None
+        # Older rows may already hold the same CNIC in two spellings; the
+        # oldest keeps the normalized value so the unique index can be built.
+        # Patient.save() leaves the others NULL until their CNIC is edited.
+        if normalized is None or normalized in seen:
+            continue
+        seen.add(normalized)
+        patient.cnic_normalized = normalized
+        batch.append(patient)
+        if len(batch) >= 1000:
+            Patient.objects.bulk_update(batch, ["cnic_normalized"])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ["cnic_normalized"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='cnic_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=15, null=True),
+        ),
+        migrations.RunPython(backfill_cnic_normalized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patient',
+            name='cnic_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=15, null=True, unique=True),
+        ),
+    ]
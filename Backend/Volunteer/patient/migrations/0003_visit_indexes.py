@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0002_patient_cnic_normalized'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['doctor', 'date', 'id'], name='visit_doctor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['doctor', 'patient', 'date'], name='visit_doctor_patient_idx'),
+        ),
+    ]
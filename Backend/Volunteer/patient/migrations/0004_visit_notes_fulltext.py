@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:00
+
+from django.db import migrations
+
+INDEX_NAME = "visit_notes_ft"
+
+
+def create_fulltext_index(apps, schema_editor):
+    # FULLTEXT is MySQL-only; other backends fall back to patient.search.InvertedIndex
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(
+        f"CREATE FULLTEXT INDEX {INDEX_NAME} ON patients_visit "
+        "(diagnosis, treatment, history, examination)"
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(f"DROP INDEX {INDEX_NAME} ON patients_visit")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0003_visit_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0004_visit_notes_fulltext'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visit',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:30
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_bp(apps, schema_editor):
+    Visit = apps.get_model("patient", "Visit")
+    bp_re = re.compile(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})")
+    batch = []
+    visits = Visit.objects.exclude(bp__isnull=True).exclude(bp="").only("id", "bp").order_by("id")
+    for visit in visits.iterator(chunk_size=2000):
+        match = bp_re.match(visit.bp)
+        if not match:
+            continue
+        visit.systolic, visit.diastolic = int(match.group(1)), int(match.group(2))
+        batch.append(visit)
+        if len(batch) >= 1000:
+            Visit.objects.bulk_update(batch, ["systolic", "diastolic"])
+            batch = []
+    if batch:
+        Visit.objects.bulk_update(batch, ["systolic", "diastolic"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0005_alter_visit_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='systolic',
+            field=models.SmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='diastolic',
+            field=models.SmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_bp, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='visit',
+            name='visit_doctor_patient_idx',
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['doctor', 'patient', 'date', 'systolic', 'diastolic', 'hr', 'temp', 'spo2'], name='visit_vitals_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0006_visit_systolic_diastolic'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='bs',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='risk_level',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='risk_rank',
+            field=models.SmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='risk_scored_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['doctor', 'risk_rank', 'date', 'id'], name='visit_doctor_risk_idx'),
+        ),
+    ]
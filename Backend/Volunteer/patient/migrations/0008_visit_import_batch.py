@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0007_visit_risk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='import_batch',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0008_visit_import_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateReport',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('threshold', models.FloatField()),
+                ('suggestions', models.JSONField(default=list)),
+                ('stats', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'patients_duplicatereport',
+            },
+        ),
+    ]
@@ -1,11 +1,15 @@
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.conf import settings  # Import settings to reference AUTH_USER_MODEL
+from .utils import normalize_cnic, parse_bp
 
 class Patient(models.Model):
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=255)
     cnic = models.CharField(max_length=15, unique=True, null=True, blank=True)
+    # Digits-only copy of `cnic`, kept in sync on save; all lookups go through this
+    cnic_normalized = models.CharField(max_length=15, unique=True, null=True, blank=True, editable=False)
     address = models.CharField(max_length=255, null=True, blank=True)
     age = models.IntegerField(validators=[MinValueValidator(0)])
     contact = models.CharField(max_length=20)
@@ -14,12 +18,38 @@ class Patient(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_cnic = instance.__dict__.get("cnic", models.DEFERRED)
+        return instance
+
+    def _cnic_changed(self):
+        if self._state.adding:
+            return True
+        if "cnic" in self.get_deferred_fields():
+            return False
+        loaded = getattr(self, "_loaded_cnic", models.DEFERRED)
+        return loaded is models.DEFERRED or self.cnic != loaded
+
+    def save(self, *args, **kwargs):
+        # Only recomputed when the CNIC is new or edited: legacy duplicates
+        # were left NULL by migration 0002 and must stay so on other edits
+        if self._cnic_changed():
+            self.cnic_normalized = normalize_cnic(self.cnic)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "cnic" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "cnic_normalized"}
+        super().save(*args, **kwargs)
+        self._loaded_cnic = self.cnic
+
     class Meta:
         db_table = "patients_patient"
         
 class Visit(models.Model):
     id = models.BigAutoField(primary_key=True)
-    date = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add so bulk imports can keep the camp's original visit date
+    date = models.DateTimeField(default=timezone.now, editable=False)
     doctor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -29,9 +59,14 @@ class Visit(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='visits')
 
     bp = models.CharField(max_length=10, null=True, blank=True)
+    # Parsed from `bp` on save so trends and range queries can use integers
+    systolic = models.SmallIntegerField(null=True, blank=True, editable=False)
+    diastolic = models.SmallIntegerField(null=True, blank=True, editable=False)
     hr = models.IntegerField(null=True, blank=True)
     temp = models.FloatField(null=True, blank=True)
     spo2 = models.IntegerField(null=True, blank=True)
+    # Blood sugar (mmol/L); the last input the risk model needs
+    bs = models.FloatField(null=True, blank=True)
     introduction = models.TextField(null=True, blank=True)
     history = models.TextField(null=True, blank=True)
     examination = models.TextField(null=True, blank=True)
@@ -39,8 +74,51 @@ class Visit(models.Model):
     diagnosis = models.TextField(null=True, blank=True)
     treatment = models.TextField(null=True, blank=True)
 
+    # Filled in after save by prediction.scoring, never at read time
+    risk_level = models.CharField(max_length=20, null=True, blank=True, editable=False)
+    risk_rank = models.SmallIntegerField(null=True, blank=True, editable=False)  # 0 low .. 2 high
+    risk_scored_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Set by patient.importer so a chunk's rows can be found again on
+    # backends where bulk_create does not return primary keys
+    import_batch = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
+
     def __str__(self):
         return f"Visit for {self.patient.name} by {self.doctor.full_name}"
 
+    def save(self, *args, **kwargs):
+        self.systolic, self.diastolic = parse_bp(self.bp)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "bp" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "systolic", "diastolic"}
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = "patients_visit"
+        indexes = [
+            # Keyset pagination in PatientRecordsView walks (doctor, date, id)
+            models.Index(fields=["doctor", "date", "id"], name="visit_doctor_date_idx"),
+            # Also covers the vitals columns so trends are read from the index alone
+            models.Index(
+                fields=["doctor", "patient", "date", "systolic", "diastolic", "hr", "temp", "spo2"],
+                name="visit_vitals_idx",
+            ),
+            # Risk filter / "highest risk first" listing
+            models.Index(fields=["doctor", "risk_rank", "date", "id"], name="visit_doctor_risk_idx"),
+        ]
+
+
+class DuplicateReport(models.Model):
+    """Duplicate-patient suggestions stored by `manage.py dedupe_patients` (patient/dedup.py)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    # Lowest score kept; the API can only narrow this down
+    threshold = models.FloatField()
+    suggestions = models.JSONField(default=list)
+    stats = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "patients_duplicatereport"
+
+    def __str__(self):
+        return f"{self.name}: {len(self.suggestions)} suggestions at {self.threshold}"
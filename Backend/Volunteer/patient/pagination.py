@@ -0,0 +1,104 @@
+import base64
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidParam(ValueError):
+    pass
+
+
+def encode_cursor(date, pk, rank=None):
+    raw = f"{date.isoformat()}|{pk}"
+    if rank is not None:
+        raw = f"{rank}|{raw}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, ranked=False):
+    """`(date, pk)`, or `(rank, date, pk)` for cursors of a ranked page."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        parts = raw.split("|")
+        rank = int(parts.pop(0)) if ranked and len(parts) == 3 else None
+        date, pk = parts
+        date = parse_datetime(date)
+        if date is None or (ranked and rank is None):
+            raise ValueError
+        return (rank, date, int(pk)) if ranked else (date, int(pk))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidParam("Invalid cursor.")
+
+
+def parse_limit(value):
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidParam("limit must be an integer.")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_day(value, end=False):
+    """
+    Turn a `YYYY-MM-DD` (or full ISO datetime) query param into an aware
+    datetime bound. With `end=True` a bare date becomes the start of the
+    following day so the range stays inclusive and index friendly.
+    """
+    if not value:
+        return None
+    try:
+        # parse_datetime also accepts a bare date, so try the date form first
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        raise InvalidParam(f"Invalid date: {value}")
+    if day:
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    elif moment is None:
+        raise InvalidParam(f"Invalid date: {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def keyset_page(queryset, cursor, limit, date_field="date", rank_field=None):
+    """
+    Newest-first page over `(date_field, id)`, or over `(rank_field,
+    date_field, id)` highest rank first when `rank_field` is given (rows
+    with a null rank are left out). Returns `(rows, next_cursor)`;
+    `next_cursor` is None on the last page.
+    """
+    order = [f"-{date_field}", "-id"]
+    if rank_field:
+        queryset = queryset.filter(**{f"{rank_field}__isnull": False})
+        order.insert(0, f"-{rank_field}")
+    if cursor:
+        if rank_field:
+            rank, date, pk = decode_cursor(cursor, ranked=True)
+            queryset = queryset.filter(
+                Q(**{f"{rank_field}__lt": rank})
+                | Q(**{rank_field: rank, f"{date_field}__lt": date})
+                | Q(**{rank_field: rank, date_field: date, "id__lt": pk})
+            )
+        else:
+            date, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{date_field}__lt": date}) | Q(**{date_field: date, "id__lt": pk})
+            )
+    rows = list(queryset.order_by(*order)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        rank = getattr(last, rank_field) if rank_field else None
+        next_cursor = encode_cursor(getattr(last, date_field), last.pk, rank=rank)
+    return rows, next_cursor
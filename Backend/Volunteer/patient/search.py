@@ -0,0 +1,208 @@
+# patients/search.py
+"""
+Keyword search over a doctor's visit notes.
+
+On MySQL the query runs against the FULLTEXT index created in migration
+0004. Other backends (SQLite in tests / local dev) use an in-process
+inverted index that is built on first use. Before each query it replays
+the visit entries the sync ChangeLog gained (in commit order) since it
+last looked, so
+bulk imports, queryset updates and writes made by other processes are
+picked up too; the Visit signals in this app only make local saves
+visible without waiting for that.
+"""
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from sync.changelog import sequence
+from sync.models import ChangeLog
+from .models import Visit
+
+SEARCH_FIELDS = ("diagnosis", "treatment", "history", "examination")
+
+MATCH_SQL = (
+    "MATCH (patients_visit.diagnosis, patients_visit.treatment, "
+    "patients_visit.history, patients_visit.examination) "
+    "AGAINST (%s IN NATURAL LANGUAGE MODE)"
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has he in is it its of on or "
+    "that the to was were will with no not".split()
+)
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class InvertedIndex:
+    """
+    Per-doctor postings (`token -> {visit_id: term frequency}`) ranked with
+    BM25. A query touches only the postings of its own terms, so cost
+    depends on how many visits match, not on how many visits exist.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    # More visit changes than this since the last query: rebuild instead
+    REBUILD_AFTER = 5000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._postings = defaultdict(lambda: defaultdict(dict))  # doctor -> token -> {visit: tf}
+        self._lengths = defaultdict(dict)                         # doctor -> {visit: doc length}
+        self._docs = {}                                           # visit -> (doctor, terms)
+        self._total_length = defaultdict(int)                     # doctor -> sum of lengths
+        self._log_mark = 0                                        # ChangeLog seq replayed up to
+
+    @property
+    def built(self):
+        return self._built
+
+    def build(self):
+        with self._lock:
+            self.clear()
+            # Taken first: whatever commits during the scan is replayed later
+            self._log_mark = sequence()
+            rows = Visit.objects.only("id", "doctor", *SEARCH_FIELDS).order_by()
+            for visit in rows.iterator(chunk_size=2000):
+                self._add(visit)
+            self._built = True
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._docs.clear()
+            self._total_length.clear()
+            self._log_mark = 0
+            self._built = False
+
+    def add(self, visit):
+        with self._lock:
+            if self._built:
+                self._remove(visit.pk)
+                self._add(visit)
+
+    def remove(self, visit_id):
+        with self._lock:
+            if self._built:
+                self._remove(visit_id)
+
+    def search(self, doctor_id, query):
+        """Return `[(visit_id, score), ...]` best first."""
+        with self._lock:
+            if not self._built:
+                self.build()
+            else:
+                self._catch_up()
+            lengths = self._lengths.get(doctor_id)
+            if not lengths:
+                return []
+            postings = self._postings[doctor_id]
+            n_docs = len(lengths)
+            avg_len = self._total_length[doctor_id] / n_docs or 1.0
+
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                docs = postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for visit_id, tf in docs.items():
+                    norm = self.K1 * (1 - self.B + self.B * lengths[visit_id] / avg_len)
+                    scores[visit_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    # -- internals (caller holds the lock) --
+
+    def _catch_up(self):
+        """Re-read the visits logged since the last query."""
+        mark = sequence()
+        if mark == self._log_mark:
+            return
+        changed = ChangeLog.objects.filter(model="visit", seq__gt=self._log_mark, seq__lte=mark)
+        entries = list(changed.values_list("object_id", flat=True)[:self.REBUILD_AFTER + 1])
+        if len(entries) > self.REBUILD_AFTER:
+            self.build()
+            return
+        ids = set(entries)
+        visits = Visit.objects.only("id", "doctor", *SEARCH_FIELDS).in_bulk(ids)
+        for visit_id in ids:
+            self._remove(visit_id)
+            if visit_id in visits:
+                self._add(visits[visit_id])
+        self._log_mark = mark
+
+    def _add(self, visit):
+        tokens = []
+        for field in SEARCH_FIELDS:
+            tokens.extend(tokenize(getattr(visit, field)))
+        doctor_id = visit.doctor_id
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        postings = self._postings[doctor_id]
+        for token, tf in counts.items():
+            postings[token][visit.pk] = tf
+        self._lengths[doctor_id][visit.pk] = len(tokens)
+        self._total_length[doctor_id] += len(tokens)
+        self._docs[visit.pk] = (doctor_id, tuple(counts))
+
+    def _remove(self, visit_id):
+        entry = self._docs.pop(visit_id, None)
+        if entry is None:
+            return
+        doctor_id, terms = entry
+        self._total_length[doctor_id] -= self._lengths[doctor_id].pop(visit_id, 0)
+        postings = self._postings[doctor_id]
+        for token in terms:
+            docs = postings.get(token)
+            if docs is not None:
+                docs.pop(visit_id, None)
+                if not docs:
+                    del postings[token]
+
+
+visit_index = InvertedIndex()
+
+
+def use_fulltext():
+    return connection.vendor == "mysql"
+
+
+def search_visits(queryset, doctor_id, query, offset, limit):
+    """
+    Rank `queryset` (already scoped to the doctor) against `query`.
+    Returns `(total, visits)` where each visit carries a `score` attribute.
+    """
+    if use_fulltext():
+        ranked = (
+            queryset.annotate(score=RawSQL(MATCH_SQL, (query,), output_field=FloatField()))
+            .filter(score__gt=0)
+            .order_by("-score", "-id")
+        )
+        return ranked.count(), list(ranked[offset:offset + limit])
+
+    hits = visit_index.search(doctor_id, query)
+    page = hits[offset:offset + limit]
+    rows = queryset.in_bulk([visit_id for visit_id, _ in page])
+    visits = []
+    for visit_id, score in page:
+        visit = rows.get(visit_id)
+        if visit is not None:
+            visit.score = score
+            visits.append(visit)
+    return len(hits), visits
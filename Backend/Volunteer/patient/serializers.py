@@ -1,6 +1,7 @@
 # patients/serializers.py
 from rest_framework import serializers
 from .models import Patient, Visit
+from .utils import normalize_cnic
 from accounts.models import User  # ✅ Import your custom User model (the one with role field)
 
 
@@ -13,9 +14,22 @@ class PatientSerializer(serializers.ModelSerializer):
         fields = ["id", "cnic", "name", "age", "gender", "contact", "address"]
 
 
+# Upper bound on rows per batch request, keeps the IN (...) list reasonable
+BATCH_CNIC_LIMIT = 1000
+
+
+def validate_cnic_digits(value):
+    if normalize_cnic(value) is None:
+        raise serializers.ValidationError("CNIC must contain digits.")
+    return value
+
+
 class CheckCnicSerializer(serializers.Serializer):
     cnic = serializers.CharField(max_length=15)
 
+    def validate_cnic(self, value):
+        return validate_cnic_digits(value)
+
 
 class RegisterPatientSerializer(serializers.Serializer):
     cnic = serializers.CharField(max_length=15, required=False, allow_blank=True)
@@ -26,6 +40,37 @@ class RegisterPatientSerializer(serializers.Serializer):
     address = serializers.CharField(max_length=255, required=False, allow_blank=True)
 
 
+class BatchRegisterPatientSerializer(RegisterPatientSerializer):
+    # Batch rows are matched on CNIC, so it cannot be left out here
+    cnic = serializers.CharField(max_length=15)
+
+    def validate_cnic(self, value):
+        return validate_cnic_digits(value)
+
+
+class BatchCnicSerializer(serializers.Serializer):
+    """Either `cnics` (check only) or `patients` (check and register missing)."""
+    cnics = serializers.ListField(
+        child=serializers.CharField(max_length=15, validators=[validate_cnic_digits]),
+        required=False,
+        allow_empty=False,
+    )
+    patients = BatchRegisterPatientSerializer(many=True, required=False, allow_empty=False)
+
+    def validate(self, data):
+        if ("cnics" in data) == ("patients" in data):
+            raise serializers.ValidationError("Send exactly one of 'cnics' or 'patients'.")
+        rows = data.get("cnics") or data.get("patients")
+        if len(rows) > BATCH_CNIC_LIMIT:
+            raise serializers.ValidationError(f"At most {BATCH_CNIC_LIMIT} rows per request.")
+        return data
+
+
+class MergePatientsSerializer(serializers.Serializer):
+    keep = serializers.IntegerField()
+    duplicates = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+
+
 # -------------------------------
 # 🩺 VISIT SERIALIZERS
 # -------------------------------
@@ -40,9 +85,13 @@ class VisitSerializer(serializers.ModelSerializer):
             "patient_id",
             "name",
             "bp",
+            "systolic",
+            "diastolic",
             "hr",
             "temp",
             "spo2",
+            "bs",
+            "risk_level",
             "introduction",
             "history",
             "examination",
@@ -53,12 +102,41 @@ class VisitSerializer(serializers.ModelSerializer):
         ]
 
 
+class VisitSummarySerializer(serializers.ModelSerializer):
+    """Vitals-only row for list screens; clinical notes are fetched per visit."""
+    # Columns loaded with .only() so the large TextFields never leave the DB
+    ONLY_FIELDS = (
+        "id", "date", "patient", "patient__name",
+        "bp", "systolic", "diastolic", "hr", "temp", "spo2", "bs", "risk_level", "risk_rank",
+    )
+
+    name = serializers.CharField(source="patient.name", read_only=True)
+    patient_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Visit
+        fields = [
+            "id", "patient_id", "name", "bp", "systolic", "diastolic",
+            "hr", "temp", "spo2", "bs", "risk_level", "date",
+        ]
+
+
+class VisitSearchResultSerializer(VisitSummarySerializer):
+    ONLY_FIELDS = VisitSummarySerializer.ONLY_FIELDS + ("diagnosis", "treatment")
+
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(VisitSummarySerializer.Meta):
+        fields = VisitSummarySerializer.Meta.fields + ["diagnosis", "treatment", "score"]
+
+
 class CreateVisitSerializer(serializers.Serializer):
     patient_id = serializers.IntegerField()
     bp = serializers.CharField(max_length=10, required=False, allow_blank=True)
     hr = serializers.IntegerField(required=False, allow_null=True)
     temp = serializers.FloatField(required=False, allow_null=True)
     spo2 = serializers.IntegerField(required=False, allow_null=True)
+    bs = serializers.FloatField(required=False, allow_null=True)
     introduction = serializers.CharField(required=False, allow_blank=True)
     history = serializers.CharField(required=False, allow_blank=True)
     examination = serializers.CharField(required=False, allow_blank=True)
@@ -0,0 +1,16 @@
+# patients/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Visit
+from .search import visit_index
+
+
+@receiver(post_save, sender=Visit)
+def index_visit(sender, instance, **kwargs):
+    visit_index.add(instance)
+
+
+@receiver(post_delete, sender=Visit)
+def unindex_visit(sender, instance, **kwargs):
+    visit_index.remove(instance.pk)
@@ -1,3 +1,226 @@
+import csv
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from sync.changelog import record_many
+from sync.models import ChangeLog
+from .importer import VisitImporter, decode_lines, read_rows
+from .models import Patient, Visit
+from .search import visit_index
+
+
+class VisitImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+        cls.patient = Patient.objects.create(
+            name="Ayesha", age=28, gender="female", contact="03110000000", cnic="35202-1234567-1",
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def upload(self, content, name, **params):
+        upload = SimpleUploadedFile(name, content.encode())
+        query = "&".join(f"{key}={value}" for key, value in params.items())
+        return self.client.post(f"/api/patient-records/import/?{query}", {"file": upload})
+
+    def test_as_overrides_the_format_guessed_from_the_name(self):
+        content = (
+            '{"cnic": "3520212345671", "bp": "120/80", "diagnosis": "Anaemia"}\n'
+            '{"cnic": "35202-1234567-1", "hr": 80}\n'
+        )
+        response = self.upload(content, "visits.txt", **{"as": "ndjson"})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["visits_created"], 2)
+        self.assertEqual(response.data["error_count"], 0)
+        self.assertEqual(Visit.objects.get(diagnosis="Anaemia").systolic, 120)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.upload("cnic\n3520212345671\n", "visits.csv", **{"as": "xml"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Visit.objects.exists())
+
+    def test_malformed_csv_rows_are_row_errors(self):
+        oversized = "x" * (csv.field_size_limit() + 1)
+        content = f"cnic,diagnosis\n3520212345671,Anaemia\n3520212345671,{oversized}\n3520212345671,Malaria\n"
+        response = self.upload(content, "visits.csv")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["visits_created"], 2)
+        self.assertEqual(response.data["errors"], [{"line": 3, "errors": {"row": ["Could not parse row."]}}])
+
+    def test_undecodable_bytes_end_the_import_with_the_partial_summary(self):
+        lines = [b"cnic,diagnosis\n", b"3520212345671,Anaemia\n", b"3520212345671,Malaria\n", b"\xff\xfe,x\n"]
+        summary = VisitImporter(self.doctor, chunk_size=1).run(read_rows(decode_lines(lines), "csv"))
+        self.assertEqual(summary["visits_created"], 2)
+        self.assertEqual(summary["error_count"], 1)
+        self.assertEqual(summary["errors"][0]["line"], 4)
+        self.assertIn("file", summary["errors"][0]["errors"])
+
+    def test_change_log_covers_exactly_the_imported_visits_without_returned_pks(self):
+        bulk_create = Visit.objects.bulk_create
+        concurrent = []
+
+        def insert_alongside(visits, **kwargs):
+            # Another request of the same doctor commits a visit in the meantime
+            concurrent.append(Visit.objects.create(doctor=self.doctor, patient=self.patient, hr=70).pk)
+            return bulk_create(visits, **kwargs)
+
+        rows = [(line, {"cnic": "3520212345671", "hr": str(60 + line)}) for line in range(2, 7)]
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False), \
+                mock.patch.object(Visit.objects, "bulk_create", insert_alongside):
+            summary = VisitImporter(self.doctor, chunk_size=2).run(rows)
+
+        self.assertEqual(summary["visits_created"], 5)
+        imported = set(Visit.objects.exclude(pk__in=concurrent).values_list("id", flat=True))
+        logged = list(ChangeLog.objects.filter(model="visit").values_list("object_id", flat=True))
+        self.assertEqual(len(imported), 5)
+        # Once each: the concurrent visits only by their own save
+        self.assertCountEqual(logged, [*imported, *concurrent])
+
+
+class PatientCnicTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def row(self, cnic, name="Ayesha"):
+        return {"cnic": cnic, "name": name, "age": 28, "gender": "female", "contact": "03110000000"}
+
+    def test_legacy_duplicate_keeps_null_normalized_cnic_on_other_edits(self):
+        Patient.objects.create(**self.row("35202-1234567-1"))
+        # As left by migration 0002 for a second spelling of the same CNIC
+        duplicate = Patient.objects.create(**self.row("3520212345672", name="Ayesha B."))
+        Patient.objects.filter(pk=duplicate.pk).update(cnic="3520212345671", cnic_normalized=None)
+
+        duplicate = Patient.objects.get(pk=duplicate.pk)
+        duplicate.age = 29
+        duplicate.save()
+        duplicate.refresh_from_db()
+        self.assertIsNone(duplicate.cnic_normalized)
+
+        duplicate.cnic = "35202-7654321-1"
+        duplicate.save(update_fields=["cnic"])
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.cnic_normalized, "3520276543211")
+
+    def test_batch_reports_only_rows_it_inserted_as_created(self):
+        # Not found by normalized CNIC, yet its raw CNIC makes the insert
+        # conflict, as a concurrent registration of the same CNIC would
+        legacy = Patient.objects.create(**self.row("3520211111111", name="Other"))
+        Patient.objects.filter(pk=legacy.pk).update(cnic_normalized=None)
+
+        rows = [self.row("3520211111111"), self.row("3520222222222")]
+        response = self.client.post("/api/check-cnic/batch/", {"patients": rows}, format="json")
+
+        self.assertEqual(response.status_code, 200, response.data)
+        first, second = response.data["results"]
+        self.assertEqual((first["created"], first["exists"]), (False, True))
+        self.assertEqual((second["created"], second["exists"]), (True, False))
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(Patient.objects.count(), 2)
+
+    def test_batch_created_patients_reach_the_change_log(self):
+        rows = [self.row("3520211111111"), self.row("3520222222222")]
+        response = self.client.post("/api/check-cnic/batch/", {"patients": rows}, format="json")
+        self.assertEqual(response.data["created"], 2)
+        logged = ChangeLog.objects.filter(model="patient").values_list("object_id", flat=True)
+        self.assertCountEqual(logged, Patient.objects.values_list("id", flat=True))
+
+
+class DuplicateReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email="admin@example.com", password="pass", full_name="Admin",
+            phone_number="03000000001", role="doctor", is_staff=True,
+        )
+        cls.first = Patient.objects.create(name="Muhammad Ali", age=40, gender="male", contact="0300-1234567")
+        cls.second = Patient.objects.create(name="Muhammad Aly", age=41, gender="male", contact="+92 300 1234567")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_listing_serves_the_stored_report(self):
+        self.assertEqual(self.client.get("/api/patients/duplicates/").status_code, 404)
+
+        call_command("dedupe_patients", stdout=StringIO(), stderr=StringIO())
+        with mock.patch("patient.dedup.find_duplicates") as find:
+            response = self.client.get("/api/patients/duplicates/")
+        find.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["duplicate"], self.second.pk)
+        self.assertEqual(self.client.get("/api/patients/duplicates/", {"threshold": 0.5}).status_code, 400)
+        self.assertEqual(self.client.get("/api/patients/duplicates/", {"threshold": 0.99}).data["count"], 0)
+
+    def test_merging_drops_the_pair_from_the_report(self):
+        call_command("dedupe_patients", stdout=StringIO(), stderr=StringIO())
+        merge = self.client.post(
+            "/api/patients/merge/", {"keep": self.first.pk, "duplicates": [self.second.pk]}, format="json",
+        )
+        self.assertEqual(merge.status_code, 200, merge.data)
+        self.assertEqual(self.client.get("/api/patients/duplicates/").data["count"], 0)
+
+
+class VisitSearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+        cls.patient = Patient.objects.create(
+            name="Ayesha", age=28, gender="female", contact="03110000000", cnic="35202-1234567-1",
+        )
+
+    def setUp(self):
+        visit_index.clear()
+        self.addCleanup(visit_index.clear)
+
+    def hits(self, query):
+        return [visit_id for visit_id, _ in visit_index.search(self.doctor.pk, query)]
+
+    def test_queryset_updates_and_imports_reach_a_built_index(self):
+        visit = Visit.objects.create(doctor=self.doctor, patient=self.patient, diagnosis="Typhoid fever")
+        self.assertEqual(self.hits("typhoid"), [visit.pk])
+
+        # update() sends no signal; bulk paths log the change instead
+        Visit.objects.filter(pk=visit.pk).update(diagnosis="Malaria")
+        record_many([visit])
+        VisitImporter(self.doctor).run([(2, {"cnic": "3520212345671", "diagnosis": "Dengue"})])
+
+        self.assertEqual(self.hits("typhoid"), [])
+        self.assertEqual(self.hits("malaria"), [visit.pk])
+        self.assertEqual(len(self.hits("dengue")), 1)
+
+    def test_a_late_commit_below_the_replayed_entries_is_picked_up(self):
+        visit = Visit.objects.create(doctor=self.doctor, patient=self.patient, diagnosis="Typhoid fever")
+        self.assertEqual(self.hits("typhoid"), [visit.pk])
+
+        # Its id was taken before the entries already replayed, its commit came after
+        Visit.objects.filter(pk=visit.pk).update(diagnosis="Malaria")
+        lowest = ChangeLog.objects.order_by("id").values_list("id", flat=True).first()
+        ChangeLog.objects.create(id=lowest - 1, model="visit", object_id=visit.pk,
+                                 action=ChangeLog.UPSERT, doctor_id=self.doctor.pk)
 
-# Create your tests here.
+        self.assertEqual(self.hits("malaria"), [visit.pk])
@@ -1,9 +1,27 @@
 from django.urls import path
-from .views import CheckCnicView, RegisterPatientView, PatientRecordsView
+from .views import (
+    CheckCnicView,
+    RegisterPatientView,
+    BatchCnicView,
+    PatientRecordsView,
+    VisitSearchView,
+    VisitImportView,
+    VitalsTrendView,
+    ExportView,
+    PatientDuplicatesView,
+    MergePatientsView,
+)
 
 urlpatterns = [
     path("check-cnic/", CheckCnicView.as_view(), name="check-cnic"),
+    path("check-cnic/batch/", BatchCnicView.as_view(), name="check-cnic-batch"),
     path("register-patient/", RegisterPatientView.as_view(), name="register-patient"),
     path("patient-records/", PatientRecordsView.as_view(), name="patient-records"),
+    path("patient-records/search/", VisitSearchView.as_view(), name="patient-records-search"),
+    path("patient-records/import/", VisitImportView.as_view(), name="patient-records-import"),
+    path("patient-records/trends/", VitalsTrendView.as_view(), name="patient-records-trends"),
     path("patient-records/<int:pk>/", PatientRecordsView.as_view(), name="patient-record-detail"),
+    path("patients/duplicates/", PatientDuplicatesView.as_view(), name="patient-duplicates"),
+    path("patients/merge/", MergePatientsView.as_view(), name="patient-merge"),
+    path("exports/<str:dataset>/", ExportView.as_view(), name="export"),
 ]
\ No newline at end of file
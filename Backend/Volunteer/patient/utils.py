@@ -0,0 +1,19 @@
+import re
+
+_NON_DIGITS = re.compile(r"\D")
+_BP_RE = re.compile(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})")
+
+
+def normalize_cnic(cnic):
+    """Reduce a CNIC to its digits so "35202-1234567-1" and "3520212345671" match."""
+    if not cnic:
+        return None
+    return _NON_DIGITS.sub("", cnic) or None
+
+
+def parse_bp(bp):
+    """Parse "120/80" or "120 / 80 mmHg" into (120, 80); (None, None) otherwise."""
+    match = _BP_RE.match(bp or "")
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
@@ -1,17 +1,36 @@
 # patients/views.py
+import math
+from datetime import datetime, timezone as dt_timezone
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.parsers import MultiPartParser
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from .models import Patient, Visit
+from .utils import normalize_cnic
+from .pagination import InvalidParam, keyset_page, parse_day, parse_limit
+from .search import search_visits
+from .importer import VisitImporter, decode_lines, guess_format, read_rows
+from .vitals import SERIES, downsample
+from .exports import DATASETS, RENDERERS, export_stream, filter_visits
+from .dedup import DEFAULT_THRESHOLD, MergeConflict, merge_patients, stored_report
 
 from accounts.models import User  # ✅ use your custom user model
+from sync.changelog import record_many
 from .serializers import (
     CheckCnicSerializer,
     RegisterPatientSerializer,
+    BatchCnicSerializer,
+    MergePatientsSerializer,
     PatientSerializer,
     VisitSerializer,
+    VisitSummarySerializer,
+    VisitSearchResultSerializer,
     CreateVisitSerializer,
 )
 
@@ -26,9 +45,9 @@ class CheckCnicView(APIView):
     def post(self, request):
         serializer = CheckCnicSerializer(data=request.data)
         if serializer.is_valid():
-            cnic = serializer.validated_data["cnic"]
+            cnic = normalize_cnic(serializer.validated_data["cnic"])
             try:
-                patient = Patient.objects.get(cnic=cnic)
+                patient = Patient.objects.get(cnic_normalized=cnic)
                 return Response({
                     "exists": True,
                     "patient": PatientSerializer(patient).data
@@ -48,8 +67,8 @@ class RegisterPatientView(APIView):
     def post(self, request):
         serializer = RegisterPatientSerializer(data=request.data)
         if serializer.is_valid():
-            cnic = serializer.validated_data.get("cnic")
-            if cnic and Patient.objects.filter(cnic=cnic).exists():
+            cnic = normalize_cnic(serializer.validated_data.get("cnic"))
+            if cnic and Patient.objects.filter(cnic_normalized=cnic).exists():
                 return Response(
                     {"detail": "Patient with this CNIC already exists"},
                     status=status.HTTP_400_BAD_REQUEST
@@ -61,6 +80,92 @@ class RegisterPatientView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ------------------------------------
+# 📋 Batch CNIC Check / Register
+# ------------------------------------
+class BatchCnicView(APIView):
+    """
+    Check (`cnics`) or check-and-register (`patients`) many CNICs at once.
+    Existing patients are found with a single IN query on the normalized
+    CNIC and missing ones are inserted with one bulk_create. Results come
+    back in request order.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchCnicSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if "cnics" in serializer.validated_data:
+            keys = [normalize_cnic(c) for c in serializer.validated_data["cnics"]]
+            found = Patient.objects.in_bulk(set(keys), field_name="cnic_normalized")
+            results = [
+                {
+                    "cnic": key,
+                    "exists": key in found,
+                    "patient": PatientSerializer(found[key]).data if key in found else None,
+                }
+                for key in keys
+            ]
+            return Response({"results": results}, status=status.HTTP_200_OK)
+
+        rows = serializer.validated_data["patients"]
+        keys = [normalize_cnic(row["cnic"]) for row in rows]
+        existing = set(
+            Patient.objects.filter(cnic_normalized__in=set(keys))
+            .values_list("cnic_normalized", flat=True)
+        )
+
+        # First occurrence wins if the same CNIC appears twice in one list
+        to_create = {}
+        for key, row in zip(keys, rows):
+            if key not in existing and key not in to_create:
+                to_create[key] = Patient(cnic_normalized=key, **row)
+        created = self.create_patients(to_create)
+
+        found = Patient.objects.in_bulk(set(keys), field_name="cnic_normalized")
+        results = []
+        for key in keys:
+            patient = found.get(key)
+            results.append({
+                "cnic": key,
+                "exists": key in existing or (key in to_create and key not in created),
+                "created": key in created,
+                "patient": PatientSerializer(patient).data if patient else None,
+            })
+        return Response({"results": results, "created": len(created)}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def create_patients(to_create):
+        """Insert `to_create` (normalized CNIC -> Patient); returns the CNICs really inserted."""
+        try:
+            # bulk_create skips save(), so cnic_normalized is set explicitly above
+            with transaction.atomic():
+                Patient.objects.bulk_create(to_create.values())
+                # ...and post_save, so tell delta sync directly (pks re-read for MySQL)
+                record_many(
+                    Patient(pk=pk)
+                    for pk in Patient.objects.filter(cnic_normalized__in=to_create.keys())
+                    .values_list("id", flat=True)
+                )
+            return set(to_create)
+        except IntegrityError:
+            pass
+        # A concurrent request registered some of these CNICs meanwhile;
+        # insert one at a time to learn which rows are ours
+        created = set()
+        for key, patient in to_create.items():
+            try:
+                with transaction.atomic():
+                    patient.save(force_insert=True)
+                created.add(key)
+            except IntegrityError:
+                continue
+        return created
+
+
 # ------------------------------------
 # 🩺 Handle Visit Records
 # ------------------------------------
@@ -68,8 +173,16 @@ class PatientRecordsView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
-    # 🔹 GET — all visits for logged-in doctor
-    def get(self, request):
+    # Query params that switch GET into the paginated response shape
+    LIST_PARAMS = (
+        "cursor", "limit", "fields", "patient_id", "date_from", "date_to", "risk_level", "ordering",
+    )
+
+    # ?risk_level=high,mid -> Visit.risk_rank values
+    RISK_RANKS = {"low": 0, "mid": 1, "high": 2}
+
+    # 🔹 GET — visits for logged-in doctor (or one full visit by pk)
+    def get(self, request, pk=None):
         if request.user.role != "doctor":
             return Response(
                 {"detail": "Only doctors can view visit records."},
@@ -77,8 +190,62 @@ class PatientRecordsView(APIView):
             )
 
         visits = Visit.objects.filter(doctor=request.user).select_related("patient")
-        serializer = VisitSerializer(visits, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        if pk is not None:
+            try:
+                visit = visits.get(pk=pk)
+            except Visit.DoesNotExist:
+                return Response({"detail": "Record not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(VisitSerializer(visit).data, status=status.HTTP_200_OK)
+
+        params = request.query_params
+        if not any(name in params for name in self.LIST_PARAMS):
+            # Legacy shape: full, unpaginated list for existing clients
+            serializer = VisitSerializer(visits, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        try:
+            patient_id = params.get("patient_id")
+            if patient_id:
+                if not patient_id.isdigit():
+                    raise InvalidParam("patient_id must be an integer.")
+                visits = visits.filter(patient_id=patient_id)
+            date_from = parse_day(params.get("date_from"))
+            if date_from:
+                visits = visits.filter(date__gte=date_from)
+            date_to = parse_day(params.get("date_to"), end=True)
+            if date_to:
+                visits = visits.filter(date__lt=date_to)
+            risk_level = params.get("risk_level")
+            if risk_level:
+                levels = [level.strip().replace(" risk", "") for level in risk_level.split(",")]
+                if not all(level in self.RISK_RANKS for level in levels):
+                    raise InvalidParam("risk_level must be low, mid and/or high.")
+                visits = visits.filter(risk_rank__in=[self.RISK_RANKS[level] for level in levels])
+            ordering = params.get("ordering", "date")
+            if ordering not in ("date", "risk"):
+                raise InvalidParam("ordering must be 'date' or 'risk'.")
+
+            fields = params.get("fields", "full")
+            if fields == "summary":
+                visits = visits.only(*VisitSummarySerializer.ONLY_FIELDS)
+                serializer_class = VisitSummarySerializer
+            elif fields == "full":
+                serializer_class = VisitSerializer
+            else:
+                raise InvalidParam("fields must be 'summary' or 'full'.")
+
+            rows, next_cursor = keyset_page(
+                visits, params.get("cursor"), parse_limit(params.get("limit")),
+                rank_field="risk_rank" if ordering == "risk" else None,
+            )
+        except InvalidParam as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "results": serializer_class(rows, many=True).data,
+            "next_cursor": next_cursor,
+        }, status=status.HTTP_200_OK)
 
     # 🔹 POST — create new visit
     def post(self, request):
@@ -129,3 +296,260 @@ class PatientRecordsView(APIView):
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Visit.DoesNotExist:
             return Response({"detail": "Record not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+# ------------------------------------
+# 🔎 Search Visit Notes
+# ------------------------------------
+class VisitSearchView(APIView):
+    """
+    Ranked keyword search over the doctor's own visit notes
+    (diagnosis, treatment, history, examination).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != "doctor":
+            return Response(
+                {"detail": "Only doctors can search visit records."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"detail": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = parse_limit(request.query_params.get("limit"))
+            page = int(request.query_params.get("page", 1))
+        except (InvalidParam, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        page = max(page, 1)
+
+        visits = (
+            Visit.objects.filter(doctor=request.user)
+            .select_related("patient")
+            .only(*VisitSearchResultSerializer.ONLY_FIELDS)
+        )
+        total, rows = search_visits(visits, request.user.id, query, (page - 1) * limit, limit)
+
+        return Response({
+            "count": total,
+            "page": page,
+            "results": VisitSearchResultSerializer(rows, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+# ------------------------------------
+# 📥 Bulk Import Offline Visits
+# ------------------------------------
+class VisitImportView(APIView):
+    """
+    Upload a CSV / NDJSON file (`file`) of camp visits. Patients are matched
+    or registered by CNIC; the response carries a per-row error report.
+
+    ?as=csv|ndjson overrides the format guessed from the file name
+    (`format` is DRF's renderer override).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        if request.user.role != "doctor":
+            return Response(
+                {"detail": "Only doctors can import visit records."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.query_params.get("as") or guess_format(upload.name)
+        try:
+            rows = read_rows(decode_lines(upload), fmt)
+            summary = VisitImporter(request.user).run(rows)
+        except ValueError as e:
+            # Unsupported format, raised before any row is read
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+# ------------------------------------
+# 📈 Vitals Trends
+# ------------------------------------
+class VitalsTrendView(APIView):
+    """
+    GET ?patient_id=&date_from=&date_to=&points=
+
+    Columnar vitals series for one patient, bucketed down to at most
+    `points` samples (default 200) for charting. Missing readings are null.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_POINTS = 200
+    MAX_POINTS = 2000
+
+    def get(self, request):
+        if request.user.role != "doctor":
+            return Response(
+                {"detail": "Only doctors can view visit records."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        params = request.query_params
+        patient_id = params.get("patient_id", "")
+        if not patient_id.isdigit():
+            return Response({"detail": "patient_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        visits = Visit.objects.filter(doctor=request.user, patient_id=patient_id)
+        try:
+            points = int(params.get("points", self.DEFAULT_POINTS))
+            date_from = parse_day(params.get("date_from"))
+            date_to = parse_day(params.get("date_to"), end=True)
+        except (InvalidParam, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        points = max(1, min(points, self.MAX_POINTS))
+        if date_from:
+            visits = visits.filter(date__gte=date_from)
+        if date_to:
+            visits = visits.filter(date__lt=date_to)
+
+        rows = list(visits.order_by("date").values_list("date", *SERIES))
+        timestamps, series = downsample(rows, points)
+
+        payload = {
+            "patient_id": int(patient_id),
+            "visits": len(rows),
+            "date": [
+                datetime.fromtimestamp(ts, tz=dt_timezone.utc).isoformat()
+                for ts in timestamps.tolist()
+            ],
+        }
+        for name, values in series.items():
+            payload[name] = [None if math.isnan(v) else round(v, 1) for v in values.tolist()]
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+# ------------------------------------
+# 📤 Streaming Exports (staff only)
+# ------------------------------------
+class ExportView(APIView):
+    """
+    GET exports/<dataset>/?as=csv|ndjson&gzip=1
+        &date_from=&date_to=&doctor_id=&diagnosis=   (visits only)
+
+    Streams the extract row by row so memory stays flat for any size.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            return Response({"detail": "Unknown dataset."}, status=status.HTTP_404_NOT_FOUND)
+
+        params = request.query_params
+        # `format` is taken by DRF's content negotiation, hence `as`
+        fmt = params.get("as", "csv")
+        if fmt not in RENDERERS:
+            return Response({"detail": "as must be 'csv' or 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+        compress = params.get("gzip") in ("1", "true")
+
+        queryset = None
+        if dataset == "visits":
+            doctor_id = params.get("doctor_id")
+            if doctor_id and not doctor_id.isdigit():
+                return Response({"detail": "doctor_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                queryset = filter_visits(
+                    Visit.objects.all(),
+                    date_from=parse_day(params.get("date_from")),
+                    date_to=parse_day(params.get("date_to"), end=True),
+                    doctor_id=doctor_id,
+                    diagnosis=params.get("diagnosis"),
+                )
+            except InvalidParam as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = f"{dataset}-{timezone.now():%Y%m%d}.{fmt}"
+        content_type = RENDERERS[fmt][1]
+        if compress:
+            filename += ".gz"
+            content_type = "application/gzip"
+
+        response = StreamingHttpResponse(
+            export_stream(dataset, fmt, queryset=queryset, compress=compress),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+# ------------------------------------
+# 👥 Duplicate Patients (staff only)
+# ------------------------------------
+class PatientDuplicatesView(APIView):
+    """
+    GET ?threshold=0.75&limit=50
+
+    Likely duplicate registrations, best match first, as last stored by
+    `manage.py dedupe_patients` (scanning every patient is too slow for a
+    request). `threshold` can only be raised above the stored one.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            threshold = float(request.query_params.get("threshold", DEFAULT_THRESHOLD))
+            limit = parse_limit(request.query_params.get("limit"))
+        except (InvalidParam, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = stored_report()
+        if report is None:
+            return Response(
+                {"detail": "No duplicate report yet; run manage.py dedupe_patients."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if threshold < report.threshold:
+            return Response(
+                {"detail": f"The stored report only goes down to threshold {report.threshold}; "
+                           f"run manage.py dedupe_patients --threshold {threshold}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        suggestions = [s for s in report.suggestions if s["score"] >= threshold]
+        return Response(
+            {
+                "results": suggestions[:limit],
+                "count": len(suggestions),
+                "stats": report.stats,
+                "threshold": report.threshold,
+                "computed_at": report.created_at,
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class MergePatientsView(APIView):
+    """POST {"keep": id, "duplicates": [ids]} - fold duplicates into `keep`."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        serializer = MergePatientsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = merge_patients(
+                serializer.validated_data["keep"], serializer.validated_data["duplicates"]
+            )
+        except MergeConflict as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
@@ -0,0 +1,38 @@
+# patients/vitals.py
+import numpy as np
+
+# Column order of the series returned by `downsample`
+SERIES = ("systolic", "diastolic", "hr", "temp", "spo2")
+
+
+def downsample(rows, points):
+    """
+    Reduce `(date, systolic, diastolic, hr, temp, spo2)` rows (sorted by
+    date) to at most `points` buckets of equal time width. Each bucket
+    holds the mean timestamp and the mean of every series, ignoring
+    missing readings. Returns `(timestamps, {series: values})`.
+    """
+    if not rows:
+        return np.empty(0), {name: np.empty(0) for name in SERIES}
+
+    ts = np.fromiter((row[0].timestamp() for row in rows), dtype=float, count=len(rows))
+    values = np.array([row[1:] for row in rows], dtype=float)  # None -> nan
+
+    if len(rows) <= points:
+        return ts, {name: values[:, i] for i, name in enumerate(SERIES)}
+
+    edges = np.linspace(ts[0], ts[-1], points + 1)
+    bucket = np.clip(np.searchsorted(edges, ts, side="right") - 1, 0, points - 1)
+
+    per_bucket = np.bincount(bucket, minlength=points)
+    occupied = per_bucket > 0
+    bucket_ts = np.bincount(bucket, weights=ts, minlength=points)[occupied] / per_bucket[occupied]
+
+    present = ~np.isnan(values)
+    sums = np.zeros((points, values.shape[1]))
+    counts = np.zeros((points, values.shape[1]))
+    np.add.at(sums, bucket, np.where(present, values, 0.0))
+    np.add.at(counts, bucket, present)
+    means = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)[occupied]
+
+    return bucket_ts, {name: means[:, i] for i, name in enumerate(SERIES)}
@@ -0,0 +1,91 @@
+"""
+Micro-batching for single-record predictions.
+
+Concurrent `await batcher.predict(row)` calls on the same event loop are
+collected for up to `max_wait` seconds or `max_batch` rows, then scored
+as one matrix in a small thread pool, so inference never blocks the loop
+and many devices posting at once share one vectorized model call.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .registry import registry
+
+MAX_BATCH = 64
+MAX_WAIT = 0.005   # seconds
+WORKERS = 2
+
+
+class _LoopState:
+    def __init__(self, workers):
+        self.pending = []
+        self.timer = None
+        # Batches waiting here keep growing instead of queueing in the pool
+        self.slots = asyncio.Semaphore(workers)
+
+
+class MicroBatcher:
+    def __init__(self, max_batch=MAX_BATCH, max_wait=MAX_WAIT, workers=WORKERS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self._states = weakref.WeakKeyDictionary()   # event loop -> _LoopState
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, row):
+        """`(label, model_version)` for one feature row (FEATURES order)."""
+        loop = asyncio.get_running_loop()
+        state = self._state(loop)
+        future = loop.create_future()
+        state.pending.append((row, future))
+        if len(state.pending) >= self.max_batch:
+            self._flush(loop, state)
+        elif state.timer is None:
+            state.timer = loop.call_later(self.max_wait, self._flush, loop, state)
+        return await future
+
+    def _state(self, loop):
+        with self._lock:
+            state = self._states.get(loop)
+            if state is None:
+                state = self._states[loop] = _LoopState(self.workers)
+            return state
+
+    def _flush(self, loop, state):
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        batch, state.pending = state.pending, []
+        if batch:
+            loop.create_task(self._run(loop, state, batch))
+
+    async def _run(self, loop, state, batch):
+        matrix = np.array([row for row, _ in batch], dtype=np.float64)
+        async with state.slots:
+            try:
+                version, labels = await loop.run_in_executor(self._executor, self._infer, matrix)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), label in zip(batch, labels):
+            if not future.done():
+                future.set_result((label, version))
+
+    @staticmethod
+    def _infer(matrix):
+        predictor = registry.get()
+        return predictor.version, predictor.labels(matrix)
+
+
+batcher = MicroBatcher()
@@ -0,0 +1,107 @@
+"""
+Bounded LRU cache of risk labels in front of the predictor.
+
+Only rows already at the precision they are measured at (whole years,
+mmHg and bpm, one decimal for blood sugar and temperature) are cached,
+keyed on their exact values; anything finer is scored directly. A cached
+label is therefore always the label of the exact input, and the answer
+never depends on the cache size. Camp screening repeats the same few
+combinations at that precision constantly, which is what makes this
+worthwhile.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Clinical precision per feature, in FEATURES order
+# (Age, SystolicBP, DiastolicBP, BS, BodyTemp, HeartRate)
+PRECISION = np.array([1.0, 1.0, 1.0, 0.1, 0.1, 1.0])
+
+
+def quantize(matrix):
+    return np.round(np.asarray(matrix, dtype=np.float64) / PRECISION) * PRECISION
+
+
+def at_precision(matrix):
+    """Rows of `matrix` with no digits beyond PRECISION (the cacheable ones)."""
+    return np.isclose(matrix, quantize(matrix), rtol=0.0, atol=1e-9).all(axis=1)
+
+
+class PredictionCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def labels(self, predictor, matrix):
+        """Labels for `matrix`, computing only the uncached rows (in one call)."""
+        if not len(matrix) or self.maxsize <= 0:
+            return predictor.labels(matrix)
+        matrix = np.asarray(matrix, dtype=np.float64)
+        cacheable = at_precision(matrix).tolist()
+        keys = [tuple(row) for row in matrix.tolist()]
+        labels = [None] * len(keys)
+        missing = {}
+        uncached = [i for i, ok in enumerate(cacheable) if not ok]
+        with self._lock:
+            for i, key in enumerate(keys):
+                if not cacheable[i]:
+                    continue
+                label = self._entries.get(key)
+                if label is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    labels[i] = label
+            misses = sum(len(rows) for rows in missing.values())
+            self.hits += len(keys) - misses - len(uncached)
+            self.misses += misses
+            self.bypassed += len(uncached)
+        if not missing and not uncached:
+            return labels
+
+        # Scored from the raw rows, exactly as without the cache
+        todo = [rows[0] for rows in missing.values()] + uncached
+        computed = predictor.labels(matrix[todo])
+        for i, label in zip(uncached, computed[len(missing):]):
+            labels[i] = label
+        with self._lock:
+            for (key, rows), label in zip(missing.items(), computed):
+                for i in rows:
+                    labels[i] = label
+                self._entries[key] = label
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return labels
+
+
+class CachedPredictor:
+    """Wraps a loaded predictor so every `labels()` call goes through the cache."""
+
+    def __init__(self, predictor, cache, version):
+        self.predictor = predictor
+        self.cache = cache
+        self.version = version
+
+    def labels(self, matrix):
+        return self.cache.labels(self.predictor, matrix)
+
+    def feature_stats(self):
+        return self.predictor.feature_stats()
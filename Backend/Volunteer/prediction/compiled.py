@@ -0,0 +1,265 @@
+"""
+NumPy-only version of the scaler + voting ensemble.
+
+`compile_pipeline()` flattens the fitted scikit-learn objects into plain
+arrays (tree node tables, linear weights, class labels) that are saved as
+one .npz file. `CompiledPredictor` evaluates them with vectorized NumPy:
+every tree of every estimator is walked at once, one level per step, so
+a prediction costs a few array operations instead of the sklearn call
+stack, and workers never have to import sklearn.
+
+Only estimator types whose maths is reproduced here can be compiled;
+anything else raises `UnsupportedModel` and the sklearn objects are used.
+
+The file records a digest of the artifacts it was compiled from, so a
+compiled model left next to retrained .pkl files is detected as stale.
+"""
+import hashlib
+
+import numpy as np
+
+COMPILED_FILE = "compiled_model.npz"
+
+FOREST, BOOST, LINEAR = "forest", "boost", "linear"
+
+FOREST_TYPES = {"DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier"}
+BOOST_TYPES = {"GradientBoostingClassifier"}
+LINEAR_TYPES = {"LogisticRegression"}
+
+
+class UnsupportedModel(Exception):
+    pass
+
+
+# -- export ---------------------------------------------------------------
+
+def _forest_trees(estimator, n_classes):
+    trees = [estimator] if hasattr(estimator, "tree_") else list(estimator.estimators_)
+    tables = []
+    for tree in trees:
+        t = tree.tree_
+        if t.n_outputs != 1:
+            raise UnsupportedModel("Multi-output trees are not supported.")
+        value = np.array(t.value[:, 0, :n_classes], dtype=np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        tables.append((t, value / normalizer))
+    return tables
+
+
+def _boost_trees(estimator, n_classes):
+    if getattr(estimator, "init_", None) is None or estimator.init_ == "zero":
+        init = np.zeros(estimator.estimators_.shape[1])
+    else:
+        init = np.asarray(estimator._raw_predict_init(np.zeros((1, estimator.n_features_in_))))[0]
+    # A binary model has one raw column; it is stored as class 1 against a
+    # constant 0 for class 0, so softmax reproduces the sigmoid.
+    columns = [1] if n_classes == 2 else list(range(n_classes))
+    init_row = np.zeros(n_classes)
+    init_row[columns] = init
+    tables = []
+    for stage in estimator.estimators_:
+        for column, tree in zip(columns, stage):
+            t = tree.tree_
+            value = np.zeros((t.node_count, n_classes))
+            value[:, column] = t.value[:, 0, 0]
+            tables.append((t, value))
+    return tables, init_row
+
+
+def _linear(estimator, n_classes):
+    coef = np.asarray(estimator.coef_, dtype=np.float64)
+    intercept = np.asarray(estimator.intercept_, dtype=np.float64)
+    if coef.shape[0] == 1:
+        coef = np.vstack([np.zeros_like(coef), coef])
+        intercept = np.concatenate([[0.0], intercept])
+    ovr = getattr(estimator, "multi_class", "auto") == "ovr" or estimator.solver == "liblinear"
+    return coef, intercept, ovr and n_classes > 2
+
+
+def compile_pipeline(model, scaler, encoder):
+    """Flatten fitted sklearn objects into a dict of arrays (see module doc)."""
+    classes = np.asarray(model.classes_)
+    n_classes = len(classes)
+    if hasattr(model, "estimators_") and type(model).__name__ == "VotingClassifier":
+        estimators = list(model.estimators_)
+        voting = model.voting
+        if model.weights is None:
+            weights = np.ones(len(estimators))
+        else:
+            weights = np.array([
+                w for (_, est), w in zip(model.estimators, model.weights) if est != "drop"
+            ], dtype=np.float64)
+    else:
+        estimators, voting, weights = [model], "hard", np.ones(1)
+
+    kinds, tree_ranges, inits, scales, coefs, intercepts, ovrs = [], [], [], [], [], [], []
+    tables = []
+    for estimator in estimators:
+        name = type(estimator).__name__
+        if not np.array_equal(np.asarray(estimator.classes_), np.arange(n_classes)):
+            raise UnsupportedModel(f"{name} was not fitted on every class.")
+        start = len(tables)
+        init, scale = np.zeros(n_classes), 1.0
+        coef, intercept, ovr = np.zeros((n_classes, len(scaler.mean_))), np.zeros(n_classes), False
+        if name in FOREST_TYPES:
+            kind = FOREST
+            tables.extend(_forest_trees(estimator, n_classes))
+        elif name in BOOST_TYPES:
+            kind = BOOST
+            boost_tables, init = _boost_trees(estimator, n_classes)
+            tables.extend(boost_tables)
+            scale = estimator.learning_rate
+        elif name in LINEAR_TYPES:
+            kind = LINEAR
+            coef, intercept, ovr = _linear(estimator, n_classes)
+        else:
+            raise UnsupportedModel(f"{name} cannot be compiled.")
+        kinds.append(kind)
+        tree_ranges.append((start, len(tables)))
+        inits.append(init)
+        scales.append(scale)
+        coefs.append(coef)
+        intercepts.append(intercept)
+        ovrs.append(ovr)
+
+    # Concatenate every tree's node table, shifting child indices to global ones
+    left, right, feature, threshold, values, roots, depth = [], [], [], [], [], [], 0
+    offset = 0
+    for t, value in tables:
+        roots.append(offset)
+        l, r = t.children_left.astype(np.int64), t.children_right.astype(np.int64)
+        left.append(np.where(l == -1, -1, l + offset))
+        right.append(np.where(r == -1, -1, r + offset))
+        feature.append(np.maximum(t.feature, 0).astype(np.int64))
+        threshold.append(t.threshold.astype(np.float64))
+        values.append(value)
+        depth = max(depth, t.max_depth)
+        offset += t.node_count
+
+    def cat(parts, shape, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.zeros(shape, dtype=dtype)
+
+    labels = np.asarray(encoder.categories_[0])[classes.astype(np.int64)].astype(str)
+    return {
+        "mean": np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_), np.float64),
+        "scale": np.asarray(scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_), np.float64),
+        "labels": labels,
+        "soft": np.array(voting == "soft"),
+        "weights": weights,
+        "kinds": np.array(kinds),
+        "tree_ranges": np.array(tree_ranges, dtype=np.int64).reshape(-1, 2),
+        "inits": np.array(inits, dtype=np.float64),
+        "scales": np.array(scales, dtype=np.float64),
+        "coefs": np.array(coefs, dtype=np.float64),
+        "intercepts": np.array(intercepts, dtype=np.float64),
+        "ovr": np.array(ovrs, dtype=bool),
+        "left": cat(left, (0,), np.int64),
+        "right": cat(right, (0,), np.int64),
+        "feature": cat(feature, (0,), np.int64),
+        "threshold": cat(threshold, (0,), np.float64),
+        "values": cat(values, (0, n_classes), np.float64),
+        "roots": np.array(roots, dtype=np.int64),
+        "depth": np.array(depth),
+    }
+
+
+def source_digest(paths):
+    """SHA-256 over the artifact files `paths`, in the order given."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def save(arrays, path, digest):
+    np.savez(path, source_digest=np.array(digest), **arrays)
+
+
+# -- evaluation -----------------------------------------------------------
+
+def _softmax(raw):
+    shifted = np.exp(raw - raw.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+class CompiledPredictor:
+    """Drop-in for the sklearn pipeline: `labels(matrix)` -> list of labels."""
+
+    def __init__(self, arrays):
+        self.a = {name: np.asarray(arrays[name]) for name in arrays}
+        self.soft = bool(self.a["soft"])
+        self.depth = int(self.a["depth"])
+        self.labels_ = self.a["labels"]
+        # Files compiled before the digest was recorded never match
+        self.source_digest = str(self.a["source_digest"]) if "source_digest" in self.a else None
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def feature_stats(self):
+        return self.a["mean"], self.a["scale"]
+
+    def _leaves(self, scaled):
+        """Leaf node reached in every tree, shape (n_samples, n_trees)."""
+        a = self.a
+        # Trees compare float32 features against float64 thresholds, as sklearn does
+        x = scaled.astype(np.float32)
+        rows = np.arange(len(x))[:, None]
+        nodes = np.broadcast_to(a["roots"], (len(x), len(a["roots"]))).copy()
+        for _ in range(self.depth):
+            left = a["left"][nodes]
+            go_left = x[rows, a["feature"][nodes]] <= a["threshold"][nodes]
+            nodes = np.where(left == -1, nodes, np.where(go_left, left, a["right"][nodes]))
+        return nodes
+
+    def _scores(self, scaled, leaves, i):
+        """(raw scores used for argmax, class probabilities) of estimator `i`."""
+        a = self.a
+        start, end = a["tree_ranges"][i]
+        kind = a["kinds"][i]
+        if kind == FOREST:
+            proba = np.zeros((len(scaled), len(self.labels_)))
+            for t in range(start, end):
+                proba += a["values"][leaves[:, t]]
+            proba /= end - start
+            return proba, proba
+        if kind == BOOST:
+            raw = np.tile(a["inits"][i], (len(scaled), 1))
+            for t in range(start, end):
+                raw += a["scales"][i] * a["values"][leaves[:, t]]
+            return raw, _softmax(raw)
+        raw = scaled @ a["coefs"][i].T + a["intercepts"][i]
+        if a["ovr"][i]:
+            proba = 1.0 / (1.0 + np.exp(-raw))
+            return raw, proba / proba.sum(axis=1, keepdims=True)
+        return raw, _softmax(raw)
+
+    def labels(self, matrix):
+        if not len(matrix):
+            return []
+        a = self.a
+        scaled = (np.asarray(matrix, dtype=np.float64) - a["mean"]) / a["scale"]
+        leaves = self._leaves(scaled) if len(a["roots"]) else None
+        scores = [self._scores(scaled, leaves, i) for i in range(len(a["kinds"]))]
+        if self.soft:
+            proba = np.average([p for _, p in scores], axis=0, weights=a["weights"])
+            winner = proba.argmax(axis=1)
+        else:
+            votes = np.zeros((len(scaled), len(self.labels_)))
+            rows = np.arange(len(scaled))
+            for (raw, _), weight in zip(scores, a["weights"]):
+                votes[rows, raw.argmax(axis=1)] += weight
+            winner = votes.argmax(axis=1)
+        return self.labels_[winner].tolist()
+
+
+def parity_mismatches(reference, compiled, matrix):
+    """Row indices where the compiled predictor disagrees with `reference`."""
+    expected = np.asarray(reference.labels(matrix))
+    actual = np.asarray(compiled.labels(matrix))
+    return np.flatnonzero(expected != actual).tolist()
@@ -0,0 +1,94 @@
+"""
+Vectorized risk prediction. Records are validated column by column into
+one float matrix, and the whole matrix goes through a single
+`scaler.transform`, `model.predict` and `encoder.inverse_transform`
+(or the equivalent arrays in prediction.compiled).
+"""
+import math
+
+import numpy as np
+
+# Column order the scaler and model were trained on
+FEATURES = ("Age", "SystolicBP", "DiastolicBP", "BS", "BodyTemp", "HeartRate")
+
+MAX_BATCH = 10000
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        # OverflowError: a JSON integer too large for a float
+        return math.nan
+
+
+def build_matrix(records):
+    """
+    Validate `records` (a list of dicts) column-wise.
+
+    Returns `(matrix, rows, errors)`: `matrix` holds the valid records in
+    FEATURES order, `rows[i]` is the input index of matrix row `i`, and
+    `errors` maps input index -> message for the rejected ones.
+    """
+    n = len(records)
+    is_dict = np.fromiter((isinstance(r, dict) for r in records), dtype=bool, count=n)
+    columns = np.empty((n, len(FEATURES)), dtype=np.float64)
+    missing = np.zeros((n, len(FEATURES)), dtype=bool)
+    for j, name in enumerate(FEATURES):
+        raw = [r.get(name) if ok else None for r, ok in zip(records, is_dict)]
+        missing[:, j] = np.fromiter((v is None for v in raw), dtype=bool, count=n)
+        columns[:, j] = np.fromiter((_to_float(v) for v in raw), dtype=np.float64, count=n)
+    invalid = ~np.isfinite(columns) & ~missing
+
+    ok = is_dict & ~missing.any(axis=1) & ~invalid.any(axis=1)
+    errors = {}
+    for i in np.flatnonzero(~ok).tolist():
+        if not is_dict[i]:
+            errors[i] = "Record must be an object."
+        elif missing[i].any():
+            errors[i] = "Missing fields: " + ", ".join(f for f, m in zip(FEATURES, missing[i]) if m)
+        else:
+            errors[i] = "Invalid numbers: " + ", ".join(f for f, b in zip(FEATURES, invalid[i]) if b)
+    return columns[ok], np.flatnonzero(ok).tolist(), errors
+
+
+class SklearnPredictor:
+    """The fitted scikit-learn scaler, voting model and label encoder."""
+
+    def __init__(self, model, scaler, encoder):
+        self.model = model
+        self.scaler = scaler
+        self.encoder = encoder
+
+    def labels(self, matrix):
+        """Risk labels for every row of `matrix`, in order."""
+        if not len(matrix):
+            return []
+        scaled = self.scaler.transform(matrix)
+        pred = self.model.predict(scaled).reshape(-1, 1)
+        return self.encoder.inverse_transform(pred)[:, 0].tolist()
+
+    def feature_stats(self):
+        """Training mean and standard deviation of each feature."""
+        return self.scaler.mean_, self.scaler.scale_
+
+
+def sample_matrix(predictor, n, spread=1.0, seed=0):
+    """Synthetic feature rows around the training distribution (benchmarks, parity checks)."""
+    mean, scale = predictor.feature_stats()
+    rng = np.random.default_rng(seed)
+    return rng.normal(mean, np.asarray(scale) * spread, size=(n, len(FEATURES))).round(1)
+
+
+def predict_records(predictor, records):
+    """One result dict per record, in input order: `prediction` or `error`."""
+    matrix, rows, errors = build_matrix(records)
+    labels = predictor.labels(matrix)
+    results = [None] * len(records)
+    for i, label in zip(rows, labels):
+        results[i] = {"index": i, "prediction": label}
+    for i, message in errors.items():
+        results[i] = {"index": i, "error": message}
+    return results
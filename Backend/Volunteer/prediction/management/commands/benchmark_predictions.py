@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from prediction.inference import FEATURES, MAX_BATCH, predict_records, sample_matrix
+from prediction.registry import ArtifactsUnavailable, registry
+
+
+class Command(BaseCommand):
+    help = "Measure risk prediction throughput (rows/second) for a range of batch sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, MAX_BATCH])
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per size (best is reported)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--predictor", choices=["auto", "sklearn"], default="auto",
+            help="auto: whatever the API serves (compiled if exported); sklearn: the original model",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            predictor = registry.load_sklearn() if options["predictor"] == "sklearn" else registry.get()
+        except ArtifactsUnavailable as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Predictor: {type(predictor).__name__}")
+
+        def records(n):
+            rows = sample_matrix(predictor, n, seed=options["seed"])
+            return [dict(zip(FEATURES, row)) for row in rows.tolist()]
+
+        predict_records(predictor, records(10))  # warm up
+
+        self.stdout.write(f"{'batch':>8} {'batched rows/s':>16} {'one-by-one rows/s':>19} {'speedup':>8}")
+        for size in options["sizes"]:
+            size = max(1, min(size, MAX_BATCH))
+            batch = records(size)
+            batched = self._best(options["repeat"], lambda: predict_records(predictor, batch))
+            # The row-at-a-time loop is slow; time one pass over at most 1000 rows
+            sample = batch[:1000]
+            single = self._best(1, lambda: [predict_records(predictor, [r]) for r in sample])
+            batched_rate = size / batched
+            single_rate = len(sample) / single
+            self.stdout.write(
+                f"{size:>8} {batched_rate:>16,.0f} {single_rate:>19,.0f} {batched_rate / single_rate:>7.1f}x"
+            )
+
+    @staticmethod
+    def _best(repeat, fn):
+        best = float("inf")
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from prediction.registry import VERSIONS_DIR, ArtifactsUnavailable, registry
+
+
+class Command(BaseCommand):
+    help = "Publish model artifacts as a new version and/or switch the live version"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", nargs="?", help="Directory holding the artifact files to publish")
+        parser.add_argument("--name", help="Version name (default: a timestamp)")
+        parser.add_argument("--activate", metavar="VERSION", help="Switch to an already published version")
+        parser.add_argument("--list", action="store_true", help="List published versions")
+
+    def handle(self, *args, **options):
+        versions_root = os.path.join(registry.root, VERSIONS_DIR)
+        if options["list"]:
+            current = registry.current_version()
+            for name in sorted(os.listdir(versions_root)) if os.path.isdir(versions_root) else []:
+                self.stdout.write(f"{'*' if name == current else ' '} {name}")
+            return
+
+        if options["activate"]:
+            version = options["activate"]
+        elif options["source"]:
+            version = options["name"] or timezone.now().strftime("%Y%m%d-%H%M%S")
+            try:
+                registry.publish(options["source"], version)
+            except (FileExistsError, ArtifactsUnavailable) as e:
+                raise CommandError(str(e))
+        else:
+            raise CommandError("Give a source directory to publish, --activate or --list.")
+
+        try:
+            registry.activate(version)  # refuses artifacts that do not load
+        except ArtifactsUnavailable as e:
+            raise CommandError(f"Version {version} does not load: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Version {version} is live; workers pick it up within their reload check interval."
+        ))
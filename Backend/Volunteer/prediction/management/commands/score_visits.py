@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from patient.models import Visit
+from prediction.registry import ArtifactsUnavailable
+from prediction.scoring import SCORE_CHUNK_SIZE, score_queryset, skip_reasons
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill stored risk scores for visits, one vectorized model call per chunk. "
+        "Only visits of female patients with all six inputs, blood sugar (bs) included, are scored; "
+        "historical visits have no bs, so they are skipped and counted as such"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rescore visits that already have a score")
+        parser.add_argument("--chunk-size", type=int, default=SCORE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        visits = Visit.objects.all()
+        if not options["all"]:
+            visits = visits.filter(risk_scored_at__isnull=True)
+
+        def progress(total):
+            self.stderr.write(f"  {total} visits scored")
+
+        try:
+            total = score_queryset(visits, chunk_size=options["chunk_size"], on_chunk=progress)
+        except ArtifactsUnavailable as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Scored {total} visits."))
+
+        skipped = skip_reasons(visits)
+        if any(skipped.values()):
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {sum(skipped.values())} visits: {skipped['not_female']} not of a female patient, "
+                f"{skipped['no_blood_sugar']} without blood sugar (bs), "
+                f"{skipped['missing_other_inputs']} missing another input (age, BP, temperature or heart rate)."
+            ))
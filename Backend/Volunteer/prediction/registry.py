@@ -0,0 +1,227 @@
+"""
+Lazily loaded prediction artifacts (voting model, scaler, label encoder,
+or the NumPy-only compiled_model.npz exported from them, which is
+preferred when present so workers never import sklearn).
+
+Nothing is read from disk at import time, so management commands and test
+runs that never predict do not pay for it, and a missing artifact only
+disables prediction instead of breaking URL loading for the whole site.
+Arrays are memory-mapped where joblib allows it, so workers forked after
+`warm_up()` share the same pages.
+
+Artifacts can be versioned: `versions/<name>/` under PREDICTION_MODEL_DIR,
+with the file CURRENT naming the live one (see `manage.py publish_model`).
+Workers stat CURRENT at most every PREDICTION_RELOAD_CHECK_SECONDS and
+load a new version alongside the old one; requests already holding the
+old predictor finish with it. Without CURRENT the directory itself is used.
+A compiled model whose recorded source digest does not match the .pkl
+files next to it is ignored (with a warning) in favour of those files.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import joblib
+from django.conf import settings
+
+from .cache import CachedPredictor, PredictionCache
+from .compiled import COMPILED_FILE, CompiledPredictor, source_digest
+from .inference import SklearnPredictor
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+UNVERSIONED = "unversioned"
+
+ARTIFACT_FILES = {
+    "model": "voting_model.pkl",
+    "scaler": "scaler.pkl",
+    "encoder": "risklevel_encoder.pkl",
+}
+
+
+class ArtifactsUnavailable(Exception):
+    pass
+
+
+class ModelRegistry:
+    def __init__(self, root=None):
+        self._root = root
+        self._lock = threading.Lock()
+        self._predictor = None
+        self._pointer = None      # (inode, mtime) of CURRENT when last loaded
+        self._checked_at = 0.0
+        self.cache = None
+        self.loads = 0
+
+    @property
+    def root(self):
+        return str(self._root or settings.PREDICTION_MODEL_DIR)
+
+    @property
+    def directory(self):
+        """Artifact directory of the live version."""
+        return self.version_dir(self.current_version())
+
+    @property
+    def loaded(self):
+        return self._predictor is not None
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as fh:
+                return fh.read().strip() or UNVERSIONED
+        except FileNotFoundError:
+            return UNVERSIONED
+
+    def version_dir(self, version):
+        if version == UNVERSIONED:
+            return self.root
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def get(self):
+        """Return the live predictor (`labels(matrix)`, `version`), loading it on first use."""
+        predictor = self._predictor
+        if predictor is not None and not self._pointer_moved():
+            return predictor
+        with self._lock:
+            if self._predictor is None or self._predictor.version != self.current_version():
+                self._swap()
+            return self._predictor
+
+    def _read_pointer(self):
+        try:
+            stat = os.stat(os.path.join(self.root, CURRENT_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _pointer_moved(self):
+        """Cheap check, at most once per PREDICTION_RELOAD_CHECK_SECONDS."""
+        now = time.monotonic()
+        if now - self._checked_at < settings.PREDICTION_RELOAD_CHECK_SECONDS:
+            return False
+        self._checked_at = now
+        return self._read_pointer() != self._pointer
+
+    def _swap(self):
+        # Read the pointer first so a switch during the load is seen next time
+        self._pointer = self._read_pointer()
+        version = self.current_version()
+        try:
+            predictor = self.load_from(self.version_dir(version))
+        except ArtifactsUnavailable as e:
+            if self._predictor is None:
+                raise
+            logger.error("Keeping model %s, version %s failed to load: %s", self._predictor.version, version, e)
+            return
+        # A fresh cache per load: labels from older artifacts never leak through
+        self.cache = PredictionCache(settings.PREDICTION_CACHE_SIZE)
+        self._predictor = CachedPredictor(predictor, self.cache, version)
+        self.loads += 1
+        logger.info("Prediction model version %s loaded", version)
+
+    def warm_up(self):
+        """Load now (e.g. before workers fork). Returns False if unavailable."""
+        try:
+            self.get()
+        except ArtifactsUnavailable as e:
+            logger.warning("Prediction disabled: %s", e)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._predictor = None
+
+    def load_from(self, directory):
+        compiled = os.path.join(directory, COMPILED_FILE)
+        if settings.PREDICTION_USE_COMPILED and os.path.exists(compiled):
+            try:
+                predictor = CompiledPredictor.load(compiled)
+            except Exception:
+                logger.exception("Loading %s failed, using the sklearn artifacts", compiled)
+            else:
+                paths = artifact_paths(directory)
+                # With no sklearn artifacts beside it there is nothing it can be behind
+                if not all(os.path.exists(p) for p in paths.values()):
+                    return predictor
+                if predictor.source_digest == source_digest(paths.values()):
+                    return predictor
+                logger.warning(
+                    "%s was not compiled from the artifacts next to it, using them instead; "
+                    "run manage.py compile_model", compiled,
+                )
+        return self.load_sklearn(directory)
+
+    def load_sklearn(self, directory=None):
+        directory = directory or self.directory
+        paths = artifact_paths(directory)
+        missing = [os.path.basename(p) for p in paths.values() if not os.path.exists(p)]
+        if missing:
+            # Checked again on the next call, so dropping the file in later works
+            raise ArtifactsUnavailable(f"Missing model artifacts: {', '.join(missing)}")
+        try:
+            # mmap_mode only applies to uncompressed dumps; others load normally
+            loaded = {name: joblib.load(path, mmap_mode="r") for name, path in paths.items()}
+        except Exception as e:
+            logger.exception("Loading prediction artifacts from %s failed", directory)
+            raise ArtifactsUnavailable(f"Could not load model artifacts: {e}") from e
+        return SklearnPredictor(**loaded)
+
+
+    def publish(self, source, version, replace=None):
+        """
+        Copy the artifacts in `source` to a new version directory (not yet
+        live). `replace` maps file names to paths used instead of the ones
+        in `source`.
+        """
+        replace = replace or {}
+        target = os.path.join(self.root, VERSIONS_DIR, version)
+        if os.path.exists(target):
+            raise FileExistsError(f"Version directory already exists: {target}")
+        missing = [
+            f for f in ARTIFACT_FILES.values()
+            if f not in replace and not os.path.exists(os.path.join(source, f))
+        ]
+        if missing:
+            raise ArtifactsUnavailable(f"Missing in {source}: {', '.join(missing)}")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy into a staging dir and rename it, so a version dir is never half written
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(target))
+        for name in [*ARTIFACT_FILES.values(), COMPILED_FILE]:
+            path = replace.get(name, os.path.join(source, name))
+            if os.path.exists(path):
+                shutil.copy2(path, os.path.join(staging, name))
+        os.rename(staging, target)
+        return target
+
+    def activate(self, version):
+        """Point CURRENT at `version`, refusing one whose artifacts do not load."""
+        target = self.version_dir(version)
+        if not os.path.isdir(target):
+            raise ArtifactsUnavailable(f"Unknown version: {version}")
+        self.load_from(target)
+        # Write then rename: readers see the old name or the new one, never half a file
+        fd, tmp = tempfile.mkstemp(prefix=".current-", dir=self.root)
+        with os.fdopen(fd, "w") as fh:
+            fh.write(version + "\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
+
+
+def artifact_paths(directory):
+    return {name: os.path.join(directory, filename) for name, filename in ARTIFACT_FILES.items()}
+
+
+registry = ModelRegistry()
+
+
+def warm_up_if_configured():
+    """Entry-point hook (asgi/wsgi): load artifacts up front when PREDICTION_WARM_UP is set."""
+    if settings.PREDICTION_WARM_UP:
+        registry.warm_up()
@@ -0,0 +1,137 @@
+"""
+Risk scores stored on Visit.
+
+Visits are scored after they are saved (see signals.py), off the request
+thread, and historical visits are backfilled by `manage.py score_visits`.
+Either way visits are read in id-keyset chunks and each chunk is scored
+with one vectorized predictor call, so listing and filtering by risk
+never runs the model.
+
+The model is a maternal-risk model, so only visits of female patients
+that have all six inputs recorded are scored. Blood sugar (Visit.bs) was
+only added with scoring, so historical visits lack it and stay unscored
+until it is entered; `skip_reasons()` counts them for the backfill.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from patient.models import Visit
+from sync.changelog import record_many
+
+from .registry import ArtifactsUnavailable, registry
+
+logger = logging.getLogger(__name__)
+
+# Ordered low -> high; the index is stored as Visit.risk_rank
+RISK_LEVELS = ("low risk", "mid risk", "high risk")
+
+SCORE_CHUNK_SIZE = 1000
+
+# Visit columns feeding the model, in inference.FEATURES order
+FEATURE_SOURCES = ("patient__age", "systolic", "diastolic", "bs", "temp", "hr")
+
+# Visits whose risk must be recomputed when one of these fields is saved
+INPUT_FIELDS = {"bp", "systolic", "diastolic", "bs", "temp", "hr", "patient", "patient_id"}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="risk-score")
+
+
+def scorable(queryset):
+    queryset = queryset.filter(patient__gender__istartswith="f")
+    for field in FEATURE_SOURCES:
+        queryset = queryset.filter(**{f"{field}__isnull": False})
+    return queryset
+
+
+def skip_reasons(queryset):
+    """How many visits in `queryset` are not scorable, by reason (first one that applies)."""
+    skipped = queryset.exclude(id__in=scorable(queryset).values("id"))
+    female = skipped.filter(patient__gender__istartswith="f")
+    not_female = skipped.count() - female.count()
+    no_bs = female.filter(bs__isnull=True).count()
+    return {
+        "not_female": not_female,
+        "no_blood_sugar": no_bs,
+        "missing_other_inputs": female.count() - no_bs,
+    }
+
+
+def to_fahrenheit(temps):
+    """The model was trained on °F; readings under 50 are taken to be °C."""
+    return np.where(temps < 50, temps * 9 / 5 + 32, temps)
+
+
+def score_queryset(queryset, chunk_size=SCORE_CHUNK_SIZE, on_chunk=None):
+    """Score every scorable visit in `queryset`. Returns the number scored."""
+    predictor = registry.get()
+    rows = scorable(queryset).order_by("id").values_list("id", "doctor_id", *FEATURE_SOURCES)
+    last_id, total = 0, 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not batch:
+            return total
+        last_id = batch[-1][0]
+
+        matrix = np.array([row[2:] for row in batch], dtype=np.float64)
+        matrix[:, 4] = to_fahrenheit(matrix[:, 4])
+        labels = predictor.labels(matrix)
+
+        now = timezone.now()
+        visits = [
+            Visit(
+                id=row[0], doctor_id=row[1], risk_level=label, risk_scored_at=now,
+                risk_rank=RISK_LEVELS.index(label) if label in RISK_LEVELS else None,
+            )
+            for row, label in zip(batch, labels)
+        ]
+        with transaction.atomic():
+            Visit.objects.bulk_update(visits, ["risk_level", "risk_rank", "risk_scored_at"])
+            # bulk_update sends no post_save, so tell delta sync directly
+            record_many(visits)
+        total += len(visits)
+        if on_chunk:
+            on_chunk(total)
+
+
+def score_visits(visit_ids):
+    """(Re)score the given visits; clear stale scores on ones no longer scorable."""
+    visits = Visit.objects.filter(id__in=visit_ids)
+    score_queryset(visits)
+    stale = visits.exclude(id__in=scorable(visits).values("id")).filter(risk_level__isnull=False)
+    stale_rows = list(stale.values_list("id", "doctor_id"))
+    if stale_rows:
+        stale.update(risk_level=None, risk_rank=None, risk_scored_at=None)
+        record_many(Visit(id=pk, doctor_id=doctor_id) for pk, doctor_id in stale_rows)
+
+
+def _score_safely(visit_ids):
+    try:
+        score_visits(visit_ids)
+    except ArtifactsUnavailable as e:
+        logger.info("Visits %s left unscored: %s", visit_ids, e)
+    except Exception:
+        logger.exception("Scoring visits %s failed", visit_ids)
+
+
+def _score_in_background(visit_ids):
+    try:
+        _score_safely(visit_ids)
+    finally:
+        # The worker thread's connection is not closed by the request cycle
+        connection.close()
+
+
+def schedule_scoring(visit_ids):
+    """Score `visit_ids` once the current transaction commits."""
+    visit_ids = list(visit_ids)
+    if not visit_ids:
+        return
+    if settings.PREDICTION_SCORE_ASYNC:
+        transaction.on_commit(lambda: _executor.submit(_score_in_background, visit_ids))
+    else:
+        transaction.on_commit(lambda: _score_safely(visit_ids))
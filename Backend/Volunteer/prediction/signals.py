@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save
+
+from patient.models import Patient, Visit
+
+from .scoring import INPUT_FIELDS, schedule_scoring
+
+
+def score_saved_visit(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not INPUT_FIELDS & set(update_fields):
+        return
+    schedule_scoring([instance.pk])
+
+
+def rescore_patient_visits(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # Age and gender are model inputs too; a new patient has no visits yet
+    if raw or created:
+        return
+    if update_fields is not None and not {"age", "gender"} & set(update_fields):
+        return
+    schedule_scoring(instance.visits.values_list("id", flat=True))
+
+
+post_save.connect(score_saved_visit, sender=Visit, dispatch_uid="prediction_score_visit")
+post_save.connect(rescore_patient_visits, sender=Patient, dispatch_uid="prediction_rescore_patient")
@@ -1,3 +1,372 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+import joblib
+import numpy as np
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from patient.models import Patient, Visit
+from sync.models import ChangeLog
+from .batching import MicroBatcher
+from .cache import PredictionCache
+from .compiled import COMPILED_FILE, CompiledPredictor, compile_pipeline, parity_mismatches, save
+from .inference import FEATURES, SklearnPredictor, build_matrix, sample_matrix
+from .registry import ARTIFACT_FILES, CURRENT_FILE, registry
+from .scoring import RISK_LEVELS
+
+# Outlives the per-test PREDICTION_MODEL_DIR override
+SHIPPED = str(settings.PREDICTION_MODEL_DIR)
+
+RECORD = {"Age": 28, "SystolicBP": 120, "DiastolicBP": 80, "BS": 7.5, "BodyTemp": 98.0, "HeartRate": 76}
+
+
+def fit_model(scaler, seed=0):
+    """A small voting ensemble on the shipped scaler, for trees without voting_model.pkl."""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(seed)
+    scaled = scaler.transform(rng.normal(scaler.mean_, scaler.scale_, size=(600, len(FEATURES))))
+    # Encoded labels 0/1/2 (low/mid/high) rising with blood sugar and systolic BP
+    risk = scaled[:, 3] + 0.5 * scaled[:, 1] + rng.normal(0, 0.3, len(scaled))
+    labels = np.digitize(risk, [-0.3, 0.8]).astype(np.float64)
+    return VotingClassifier([
+        ("dt", DecisionTreeClassifier(max_depth=5, random_state=seed)),
+        ("rf", RandomForestClassifier(n_estimators=10, max_depth=5, random_state=seed)),
+        ("gb", GradientBoostingClassifier(n_estimators=10, max_depth=2, random_state=seed)),
+        ("lr", LogisticRegression(max_iter=500)),
+    ], voting="soft").fit(scaled, labels)
+
+
+def write_artifacts(directory, seed=None):
+    """
+    Copy the shipped artifacts to `directory`. The voting model is fitted
+    when it is not shipped, or always when `seed` asks for another one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for filename in ARTIFACT_FILES.values():
+        if os.path.exists(os.path.join(SHIPPED, filename)):
+            shutil.copy2(os.path.join(SHIPPED, filename), directory)
+    model = os.path.join(directory, ARTIFACT_FILES["model"])
+    if seed is not None or not os.path.exists(model):
+        scaler = joblib.load(os.path.join(directory, ARTIFACT_FILES["scaler"]))
+        joblib.dump(fit_model(scaler, seed or 0), model)
+    return directory
+
+
+class PredictionTestCase(TestCase):
+    """Runs against a copy of the artifacts in a temporary PREDICTION_MODEL_DIR."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = write_artifacts(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.source, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=False,
+        )
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(PREDICTION_MODEL_DIR=self.root, PREDICTION_RELOAD_CHECK_SECONDS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def install(self, directory=None):
+        """Put the artifacts straight into PREDICTION_MODEL_DIR (unversioned)."""
+        for filename in os.listdir(self.source):
+            shutil.copy2(os.path.join(self.source, filename), directory or self.root)
+
+    def batch(self, records):
+        return self.client.post("/api/predict/batch/", {"records": records}, format="json")
+
+
+class BuildMatrixTests(TestCase):
+    def test_unusable_values_are_per_row_errors(self):
+        records = [RECORD, {**RECORD, "Age": 10 ** 400}, {**RECORD, "BS": "high"}, {"Age": 28}, [1, 2]]
+        matrix, rows, errors = build_matrix(records)
+        self.assertEqual(rows, [0])
+        self.assertEqual(matrix.tolist(), [[RECORD[name] for name in FEATURES]])
+        self.assertEqual(errors[1], "Invalid numbers: Age")
+        self.assertEqual(errors[2], "Invalid numbers: BS")
+        self.assertTrue(errors[3].startswith("Missing fields: SystolicBP"))
+        self.assertEqual(errors[4], "Record must be an object.")
+
+    def test_single_prediction_rejects_an_overflowing_number(self):
+        body = json.dumps({**RECORD, "HeartRate": 10 ** 400})
+        response = self.client.post("/api/predict/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid numbers: HeartRate"})
+
+
+class BatchPredictionTests(PredictionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.install()
+
+    def test_bad_rows_fail_alone_and_results_keep_input_order(self):
+        records = [RECORD, {**RECORD, "BS": "high"}, {"Age": 40}, "row", {**RECORD, "Age": 45}]
+        response = self.batch(records)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(response.data["failed"], 3)
+        self.assertEqual(response.data["model_version"], "unversioned")
+        results = response.data["results"]
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[1]["error"], "Invalid numbers: BS")
+        self.assertTrue(results[2]["error"].startswith("Missing fields:"))
+        self.assertEqual(results[3]["error"], "Record must be an object.")
+        for result in (results[0], results[4]):
+            self.assertIn(result["prediction"], ("low risk", "mid risk", "high risk"))
+
+        # The same row scores the same alone and in a batch
+        single = self.client.post("/api/predict/", RECORD, format="json")
+        self.assertEqual(single.json()["prediction"], results[0]["prediction"])
+
+    def test_request_shape_is_checked_before_loading(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.client.post("/api/predict/batch/", {"rows": [RECORD]}, format="json").status_code, 400)
+        self.assertFalse(registry.loaded)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.batch([RECORD]).status_code, 401)
+
+
+class LazyLoadingTests(PredictionTestCase):
+    def test_missing_artifacts_disable_prediction_until_they_appear(self):
+        response = self.batch([RECORD])
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("voting_model.pkl", response.data["error"])
+        with self.assertLogs("prediction.registry", "WARNING"):
+            self.assertFalse(registry.warm_up())
+        self.assertFalse(registry.loaded)
+
+        loads = registry.loads
+        self.install()
+        self.assertEqual(self.batch([RECORD]).status_code, 200)
+        self.assertEqual(self.batch([RECORD]).status_code, 200)
+        self.assertTrue(registry.loaded)
+        self.assertEqual(registry.loads, loads + 1)
+
+
+class MicroBatchingTests(PredictionTestCase):
+    def test_concurrent_rows_share_one_model_call(self):
+        self.install()
+        matrix = np.array([[RECORD[name] + i for name in FEATURES] for i in range(5)], dtype=float)
+        batcher = MicroBatcher(max_wait=0.05)
+
+        async def predict_all():
+            return await asyncio.gather(*(batcher.predict(row) for row in matrix))
+
+        results = asyncio.run(predict_all())
+        self.assertEqual((batcher.batches, batcher.rows), (1, 5))
+        self.assertEqual([label for label, _ in results], registry.get().labels(matrix))
+        self.assertEqual({version for _, version in results}, {"unversioned"})
+
+
+class CompiledModelTests(PredictionTestCase):
+    def test_compiled_model_matches_sklearn_on_the_shipped_artifacts(self):
+        reference = registry.load_sklearn(self.source)
+        path = os.path.join(self.root, COMPILED_FILE)
+        save(compile_pipeline(reference.model, reference.scaler, reference.encoder), path, "digest")
+        compiled = CompiledPredictor.load(path)
+        for spread in (1.0, 3.0):
+            matrix = sample_matrix(reference, 5000, spread=spread)
+            self.assertEqual(parity_mismatches(reference, compiled, matrix), [])
+
+    def test_compile_model_publishes_a_version_that_loads_compiled(self):
+        self.install()
+        call_command("compile_model", samples=2000, name="v1", stdout=StringIO())
+        self.assertEqual(registry.current_version(), "v1")
+        self.assertIsInstance(registry.get().predictor, CompiledPredictor)
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v1")
+
+    def test_a_compiled_model_older_than_its_artifacts_is_ignored(self):
+        self.install()
+        call_command("compile_model", samples=2000, name="v1", stdout=StringIO())
+        # Retrained in place, without compiling again
+        write_artifacts(registry.directory, seed=1)
+        with self.assertLogs("prediction.registry", "WARNING") as logs:
+            predictor = registry.load_from(registry.directory)
+        self.assertIsInstance(predictor, SklearnPredictor)
+        self.assertIn("was not compiled from the artifacts next to it", logs.output[0])
+
+    @override_settings(PREDICTION_USE_COMPILED=False)
+    def test_compiled_models_can_be_switched_off(self):
+        self.install()
+        call_command("compile_model", samples=2000, name="v1", stdout=StringIO())
+        self.assertIsInstance(registry.get().predictor, SklearnPredictor)
+
+
+class VersionReloadTests(PredictionTestCase):
+    def publish(self, name, seed=None):
+        source = self.source if seed is None else write_artifacts(os.path.join(self.root, f"src-{name}"), seed)
+        call_command("publish_model", source, name=name, stdout=StringIO())
+
+    def test_switching_current_reloads_on_the_next_request(self):
+        self.publish("v1")
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v1")
+        first = registry.get()
+
+        self.publish("v2", seed=1)
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v2")
+        self.assertIsNot(registry.get(), first)
+        # Requests still holding the old predictor finish with it
+        self.assertEqual(first.version, "v1")
+        self.assertEqual(len(first.labels(np.array([[RECORD[name] for name in FEATURES]]))), 1)
+
+        call_command("publish_model", activate="v1", stdout=StringIO())
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v1")
+
+    def test_a_version_that_does_not_load_is_refused_and_never_served(self):
+        self.publish("v1")
+        self.publish("v2")
+        os.remove(os.path.join(registry.version_dir("v1"), ARTIFACT_FILES["model"]))
+        with self.assertRaises(CommandError):
+            call_command("publish_model", activate="v1", stdout=StringIO())
+        self.assertEqual(registry.current_version(), "v2")
+
+        # CURRENT pointed at it by hand: the loaded version keeps serving
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v2")
+        with open(os.path.join(self.root, CURRENT_FILE), "w") as fh:
+            fh.write("v1\n")
+        with self.assertLogs("prediction.registry", "ERROR"):
+            self.assertEqual(self.batch([RECORD]).data["model_version"], "v2")
+
+    @override_settings(PREDICTION_RELOAD_CHECK_SECONDS=3600)
+    def test_current_is_only_checked_once_per_interval(self):
+        self.publish("v1")
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v1")
+        self.publish("v2")
+        self.assertEqual(self.batch([RECORD]).data["model_version"], "v1")
+
+
+class ExactPredictor:
+    """Labels every row by its exact values, so any rounding would show."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def labels(self, matrix):
+        self.rows += len(matrix)
+        return [repr(row) for row in np.asarray(matrix).tolist()]
+
+
+class PredictionCacheTests(PredictionTestCase):
+    def test_answers_never_depend_on_the_cache_size(self):
+        reference = registry.load_sklearn(self.source)
+        # Readings at clinical precision, repeated, and finer ones near them
+        readings = sample_matrix(reference, 300, seed=1)
+        matrix = np.vstack([readings, readings, readings + 0.04])
+        expected = reference.labels(matrix)
+        for size in (0, 1, 50, 10000):
+            cache = PredictionCache(size)
+            self.assertEqual(cache.labels(reference, matrix), expected, size)
+            self.assertEqual(cache.labels(reference, matrix[::-1]), expected[::-1], size)
+
+    def test_only_readings_at_clinical_precision_are_cached(self):
+        predictor, cache = ExactPredictor(), PredictionCache(100)
+        rows = np.array([[28, 120, 80, 7.5, 98.0, 76], [28, 120, 80, 7.54, 98.0, 76]])
+        first = cache.labels(predictor, rows)
+        self.assertNotEqual(first[0], first[1])
+        self.assertEqual(cache.labels(predictor, rows), first)
+
+        self.assertEqual(predictor.rows, 3)
+        stats = cache.stats()
+        self.assertEqual((stats["size"], stats["hits"], stats["misses"], stats["bypassed"]), (1, 1, 1, 2))
+
+
+@override_settings(PREDICTION_SCORE_ASYNC=False)
+class VisitScoringTests(PredictionTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.mother = Patient.objects.create(name="Ayesha", age=28, gender="female", contact="03110000000")
+        cls.father = Patient.objects.create(name="Bilal", age=30, gender="male", contact="03110000001")
+
+    def setUp(self):
+        super().setUp()
+        self.install()
+
+    def visit(self, patient=None, **vitals):
+        vitals = {"bp": "120/80", "bs": 7.5, "temp": 98.0, "hr": 76, **vitals}
+        return Visit.objects.create(doctor=self.doctor, patient=patient or self.mother, **vitals)
+
+    def scored(self, visit):
+        visit.refresh_from_db()
+        return visit.risk_level
+
+    def test_saving_a_visit_scores_it_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            visit = self.visit()
+            skipped = [self.visit(self.father), self.visit(bs=None), self.visit(hr=None)]
+        self.assertIn(self.scored(visit), RISK_LEVELS)
+        self.assertEqual(visit.risk_rank, RISK_LEVELS.index(visit.risk_level))
+        self.assertEqual([self.scored(v) for v in skipped], [None, None, None])
+
+        # Edits to other fields schedule nothing; losing an input clears the score
+        with self.captureOnCommitCallbacks() as callbacks:
+            visit.diagnosis = "Anaemia"
+            visit.save(update_fields=["diagnosis"])
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            visit.bs = None
+            visit.save()
+        self.assertIsNone(self.scored(visit))
+        self.assertIsNone(visit.risk_rank)
+
+    def test_changing_the_patient_rescores_their_visits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            visit = self.visit()
+        self.assertIsNotNone(self.scored(visit))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mother.gender = "male"
+            self.mother.save()
+        self.assertIsNone(self.scored(visit))
+
+    def test_backfill_scores_what_it_can_and_reports_the_rest(self):
+        # Created outside captureOnCommitCallbacks: the hook never ran
+        scorable = [self.visit(), self.visit(bs=11.0)]
+        skipped = [self.visit(self.father), self.visit(bs=None), self.visit(bs=None), self.visit(temp=None)]
+        out = StringIO()
+        call_command("score_visits", chunk_size=1, stdout=out, stderr=StringIO())
+
+        self.assertEqual([self.scored(v) is not None for v in scorable + skipped], [True] * 2 + [False] * 4)
+        self.assertIn("Scored 2 visits.", out.getvalue())
+        self.assertIn(
+            "Skipped 4 visits: 1 not of a female patient, 2 without blood sugar (bs), 1 missing another input",
+            out.getvalue(),
+        )
+        logged = ChangeLog.objects.filter(model="visit", object_id__in=[v.pk for v in scorable])
+        self.assertEqual(logged.count(), 4)  # on create and on scoring
+
+        # Already scored visits are left alone unless --all is given
+        out = StringIO()
+        call_command("score_visits", stdout=out, stderr=StringIO())
+        self.assertIn("Scored 0 visits.", out.getvalue())
+        call_command("score_visits", all=True, stdout=out, stderr=StringIO())
+        self.assertIn("Scored 2 visits.", out.getvalue())
+
+    def test_backfill_without_artifacts_fails_cleanly(self):
+        for filename in os.listdir(self.root):
+            os.remove(os.path.join(self.root, filename))
+        with self.assertRaises(CommandError):
+            call_command("score_visits", stdout=StringIO(), stderr=StringIO())
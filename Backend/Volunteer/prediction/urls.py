@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import predict_risk
+from .views import predict_risk, predict_risk_batch, prediction_stats
 
 urlpatterns = [
     path("predict/", predict_risk),
+    path("predict/batch/", predict_risk_batch),
+    path("predict/stats/", prediction_stats),
 ]
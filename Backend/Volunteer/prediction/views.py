@@ -1,62 +1,96 @@
 from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-import joblib
-import numpy as np
-import os
-from django.conf import settings
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+import json
+import logging
+from .batching import batcher
+from .inference import MAX_BATCH, build_matrix, predict_records
+from .registry import ArtifactsUnavailable, registry
 
+logger = logging.getLogger(__name__)
 
-# Load model, scaler, encoder
-model_path = os.path.join(settings.BASE_DIR, 'prediction', 'ml_model', 'voting_model.pkl')
-scaler_path = os.path.join(settings.BASE_DIR, 'prediction', 'ml_model', 'scaler.pkl')
-encoder_path = os.path.join(settings.BASE_DIR, 'prediction', 'ml_model', 'risklevel_encoder.pkl')
 
-model = joblib.load(model_path)
-scaler = joblib.load(scaler_path)
-encoder = joblib.load(encoder_path)
+def unavailable(e):
+    return Response({"error": f"Prediction is unavailable: {e}"}, status=503)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-@parser_classes([JSONParser])
-def predict_risk(request):
-    data = request.data
-    print(f"Received data: {data}")  # Debug
-
-    # Required fields
-    required_fields = ["Age", "SystolicBP", "DiastolicBP", "BS", "BodyTemp", "HeartRate"]
-    missing_fields = [f for f in required_fields if f not in data]
+@csrf_exempt
+@require_POST
+async def predict_risk(request):
+    """
+    Single-record prediction. A plain async view (DRF views are sync-only)
+    so concurrent requests can be micro-batched into one model call.
+    Open to anyone, like before, so no authentication is needed here.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Request body must be JSON."}, status=400)
 
-    if missing_fields:
-        return Response({"error": f"Missing fields: {', '.join(missing_fields)}"}, status=400)
+    matrix, _, errors = build_matrix([data])
+    if errors:
+        return JsonResponse({"error": errors[0]}, status=400)
 
     try:
-        # Convert input to numpy array
-        features = np.array([[
-            float(data["Age"]),
-            float(data["SystolicBP"]),
-            float(data["DiastolicBP"]),
-            float(data["BS"]),
-            float(data["BodyTemp"]),
-            float(data["HeartRate"]),
-        ]])
+        label, version = await batcher.predict(matrix[0])
+        return JsonResponse({"prediction": label, "model_version": version})
 
-        # Scale features
-        scaled = scaler.transform(features)
+    except ArtifactsUnavailable as e:
+        return JsonResponse({"error": f"Prediction is unavailable: {e}"}, status=503)
+    except Exception as e:
+        logger.exception("Prediction failed")
+        return JsonResponse({"error": f"Prediction error: {str(e)}"}, status=500)
 
-        # Predict
-        pred = model.predict(scaled)
 
-        # FIX: reshape before decoding
-        pred = pred.reshape(-1, 1)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser])
+def predict_risk_batch(request):
+    """
+    POST {"records": [{Age, SystolicBP, DiastolicBP, BS, BodyTemp, HeartRate}, ...]}
 
-        # Decode label
-        label = encoder.inverse_transform(pred)
+    Scores the whole list in one pass. Results come back in input order,
+    each with either `prediction` or a per-row `error`.
+    """
+    records = request.data.get("records") if isinstance(request.data, dict) else None
+    if not isinstance(records, list) or not records:
+        return Response({"error": "records must be a non-empty list."}, status=400)
+    if len(records) > MAX_BATCH:
+        return Response({"error": f"At most {MAX_BATCH} records per request."}, status=400)
 
-        return Response({"prediction": label[0][0]})
+    try:
+        predictor = registry.get()
+    except ArtifactsUnavailable as e:
+        return unavailable(e)
 
+    try:
+        results = predict_records(predictor, records)
     except Exception as e:
-        print("Prediction error:", e)
+        logger.exception("Batch prediction with model %s failed", predictor.version)
         return Response({"error": f"Prediction error: {str(e)}"}, status=500)
+
+    failed = sum(1 for r in results if "error" in r)
+    return Response({
+        "results": results,
+        "count": len(results),
+        "failed": failed,
+        "model_version": predictor.version,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def prediction_stats(request):
+    """Cache hit rate and micro-batching counters of this worker process."""
+    return Response({
+        "loaded": registry.loaded,
+        "model_version": registry.get().version if registry.loaded else None,
+        "predictor": type(registry.get().predictor).__name__ if registry.loaded else None,
+        "loads": registry.loads,
+        "cache": registry.cache.stats() if registry.cache else None,
+        "batching": {"batches": batcher.batches, "rows": batcher.rows},
+    })
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prescription', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['doctor', 'room_id'], name='rx_doctor_room_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['patient', 'room_id'], name='rx_patient_room_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0005_catalog_snapshot'),
+        ('prescription', '0002_prescription_room_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrescriptionItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dose', models.CharField(max_length=100)),
+                ('frequency', models.CharField(max_length=100)),
+                ('duration', models.CharField(blank=True, max_length=100)),
+                ('drug', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='prescription_items', to='drugs.drug')),
+                ('prescription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='prescription.prescription')),
+            ],
+        ),
+    ]
@@ -16,5 +16,28 @@ class Prescription(models.Model):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Listing filters on the owner and, during a call, the room
+            models.Index(fields=["doctor", "room_id"], name="rx_doctor_room_idx"),
+            models.Index(fields=["patient", "room_id"], name="rx_patient_room_idx"),
+        ]
+
     def __str__(self):
         return f"Prescription by {self.doctor.email} for {self.patient.email}"
+
+
+class PrescriptionItem(models.Model):
+    """
+    One structured line of a prescription. `Prescription.text` is still
+    filled in for clients that only read the free text.
+    """
+    prescription = models.ForeignKey(Prescription, on_delete=models.CASCADE, related_name="items")
+    # PROTECT: a catalog entry cannot vanish from under issued prescriptions
+    drug = models.ForeignKey("drugs.Drug", on_delete=models.PROTECT, related_name="prescription_items")
+    dose = models.CharField(max_length=100)
+    frequency = models.CharField(max_length=100)
+    duration = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.drug_id} {self.dose} {self.frequency} {self.duration}".strip()
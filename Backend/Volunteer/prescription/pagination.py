@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PrescriptionCursorPagination(CursorPagination):
+    # Newest first; the cursor stays stable while new prescriptions arrive.
+    # id breaks ties between prescriptions created in the same instant
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 200
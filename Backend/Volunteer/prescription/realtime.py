@@ -0,0 +1,43 @@
+"""
+Push new prescriptions into the video call they were written in.
+
+The doctor and patient of a consultation share the `video_<room>` group
+of appointments.consumers.VideoCallConsumer, so the patient's socket gets
+a `{"type": "prescription", ...}` message as soon as the prescription is
+saved instead of polling `prescriptions/?room_id=`.
+"""
+import logging
+import re
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from appointments.consumers import room_group_name
+
+logger = logging.getLogger(__name__)
+
+# Rooms the websocket route (ws/video/<\w+>/) can join that are also valid
+# channel group names (ASCII, under 100 characters with the prefix)
+_ROOM_NAME = re.compile(r"^\w{1,90}$", re.ASCII)
+
+
+def _send(room_id, data):
+    try:
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        async_to_sync(layer.group_send)(
+            room_group_name(room_id), {"type": "prescription.created", "prescription": data},
+        )
+    except Exception:
+        # The prescription is saved either way; clients can still fetch it
+        logger.exception("Publishing prescription %s to room %s failed", data.get("id"), room_id)
+
+
+def publish_prescription(room_id, data):
+    """Send serialized prescription `data` to the call room once the transaction commits."""
+    if not _ROOM_NAME.match(room_id or ""):
+        return
+    data = dict(data)
+    transaction.on_commit(lambda: _send(room_id, data))
@@ -1,15 +1,42 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Prescription
+from drugs.models import Drug
+from .models import Prescription, PrescriptionItem
+
+MAX_ITEMS = 50
+
+
+def with_items(queryset):
+    """Load every listed prescription's items (and drug names) in one extra query."""
+    items = PrescriptionItem.objects.select_related("drug").only(
+        "id", "prescription_id", "dose", "frequency", "duration", "drug__id", "drug__drug_name",
+    ).order_by("id")
+    return queryset.prefetch_related(Prefetch("items", queryset=items))
+
+
+class PrescriptionItemSerializer(serializers.ModelSerializer):
+    # A plain integer: all ids of a prescription are checked in one query
+    # (PrescriptionSerializer.validate_items), not one lookup per line
+    drug = serializers.IntegerField(source="drug_id")
+    drug_name = serializers.CharField(source="drug.drug_name", read_only=True)
+
+    class Meta:
+        model = PrescriptionItem
+        fields = ["drug", "drug_name", "dose", "frequency", "duration"]
+
 
 class PrescriptionSerializer(serializers.ModelSerializer):
     doctor_name = serializers.CharField(source="doctor.full_name", read_only=True)
     patient_name = serializers.CharField(source="patient.full_name", read_only=True)
+    items = PrescriptionItemSerializer(many=True, required=False)
 
     class Meta:
         model = Prescription
         fields = [
             "id",
             "text",
+            "items",        # structured lines (drug, dose, frequency, duration)
             "doctor",       # doctor id
             "doctor_name",  # doctor ka naam
             "patient",      # patient id
@@ -18,3 +45,46 @@ class PrescriptionSerializer(serializers.ModelSerializer):
             "created_at"
         ]
         read_only_fields = ["id", "doctor", "created_at"]
+        # May be left out when items are given; it is then written from them
+        extra_kwargs = {"text": {"required": False, "allow_blank": True}}
+
+    def validate_items(self, items):
+        if len(items) > MAX_ITEMS:
+            raise serializers.ValidationError(f"At most {MAX_ITEMS} items per prescription.")
+        ids = {item["drug_id"] for item in items}
+        drugs = Drug.objects.only("id", "drug_name").in_bulk(ids)
+        unknown = sorted(ids - drugs.keys())
+        if unknown:
+            raise serializers.ValidationError(f"Unknown drug ids: {', '.join(map(str, unknown))}")
+        self._drugs = drugs
+        return items
+
+    def validate(self, attrs):
+        if not attrs.get("text", "").strip() and not attrs.get("items"):
+            raise serializers.ValidationError({"text": "Provide the prescription text or at least one item."})
+        return attrs
+
+    def create(self, validated_data):
+        items = validated_data.pop("items", [])
+        if not validated_data.get("text", "").strip():
+            validated_data["text"] = "\n".join(
+                " ".join(filter(None, [
+                    self._drugs[item["drug_id"]].drug_name, item["dose"], item["frequency"], item.get("duration"),
+                ]))
+                for item in items
+            )
+        with transaction.atomic():
+            prescription = super().create(validated_data)
+            lines = PrescriptionItem.objects.bulk_create([
+                PrescriptionItem(
+                    prescription=prescription,
+                    drug=self._drugs[item["drug_id"]],
+                    dose=item["dose"],
+                    frequency=item["frequency"],
+                    duration=item.get("duration", ""),
+                )
+                for item in items
+            ])
+        # The response lists the lines just written; no need to read them back
+        prescription._prefetched_objects_cache = {"items": lines}
+        return prescription
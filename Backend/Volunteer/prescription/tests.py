@@ -1,3 +1,252 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from appointments.routing import websocket_urlpatterns
+from drugs.models import Drug
+from .models import Prescription, PrescriptionItem
+
+
+class PrescriptionQueryCountTests(TestCase):
+    """
+    Listing must not issue a query per prescription for the doctor/patient
+    names or the items: one joined query plus one for all the items, two in
+    total whatever the number of rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+        cls.patients = [
+            User.objects.create_user(
+                email=f"patient{i}@example.com", password="pass", full_name=f"Patient {i}",
+                phone_number=f"0311000000{i}", role="patient",
+            )
+            for i in range(5)
+        ]
+        cls.drug = Drug.objects.create(
+            drug_name="amoxicillin", medical_condition="Infections", generic_name="amoxicillin",
+            drug_link="https://www.drugs.com/amoxicillin.html",
+        )
+
+    def add_prescriptions(self, count, room_id="room-1"):
+        prescriptions = Prescription.objects.bulk_create([
+            Prescription(doctor=self.doctor, patient=self.patients[i % len(self.patients)],
+                         room_id=room_id, text=f"Rx {i}")
+            for i in range(count)
+        ])
+        PrescriptionItem.objects.bulk_create([
+            PrescriptionItem(prescription=p, drug=self.drug, dose="500 mg", frequency="TDS")
+            for p in Prescription.objects.filter(room_id=room_id).exclude(items__isnull=False)
+        ])
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_doctor_list_query_count_is_constant(self):
+        client = self.client_for(self.doctor)
+        self.add_prescriptions(3)
+        with self.assertNumQueries(2):
+            response = client.get("/api/prescriptions/", {"limit": 50})
+        self.assertEqual(len(response.data["results"]), 3)
+
+        self.add_prescriptions(30)
+        with self.assertNumQueries(2):
+            response = client.get("/api/prescriptions/", {"limit": 50})
+        self.assertEqual(len(response.data["results"]), 33)
+        self.assertEqual(response.data["results"][0]["doctor_name"], "Dr. Ali")
+        self.assertEqual(response.data["results"][0]["items"][0]["drug_name"], "amoxicillin")
+
+    def test_patient_room_list_query_count_is_constant(self):
+        self.add_prescriptions(10, room_id="room-1")
+        self.add_prescriptions(10, room_id="room-2")
+        client = self.client_for(self.patients[0])
+        with self.assertNumQueries(2):
+            response = client.get("/api/prescriptions/", {"room_id": "room-2", "limit": 50})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["results"][0]["patient_name"], "Patient 0")
+
+    def test_pages_follow_created_at(self):
+        self.add_prescriptions(5)
+        start = timezone.now()
+        for minutes, pk in enumerate(Prescription.objects.values_list("id", flat=True)):
+            Prescription.objects.filter(pk=pk).update(created_at=start - timedelta(minutes=minutes))
+        client = self.client_for(self.doctor)
+        first = client.get("/api/prescriptions/", {"limit": 3})
+        with self.assertNumQueries(2):
+            second = client.get(first.data["next"])
+        ids = [p["id"] for p in first.data["results"] + second.data["results"]]
+        expected = list(Prescription.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+        self.assertIsNone(second.data["next"])
+
+    def test_pages_of_prescriptions_created_together_neither_skip_nor_repeat(self):
+        self.add_prescriptions(7)
+        Prescription.objects.update(created_at=timezone.now())
+        client = self.client_for(self.doctor)
+        ids, url = [], "/api/prescriptions/?limit=3"
+        while url:
+            response = client.get(url)
+            ids += [p["id"] for p in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(ids, sorted(Prescription.objects.values_list("id", flat=True), reverse=True))
+
+    def test_without_page_params_the_full_list_is_returned_oldest_first(self):
+        self.add_prescriptions(60)
+        start = timezone.now()
+        for minutes, pk in enumerate(Prescription.objects.values_list("id", flat=True)):
+            Prescription.objects.filter(pk=pk).update(created_at=start - timedelta(minutes=minutes))
+        client = self.client_for(self.doctor)
+        with self.assertNumQueries(2):
+            response = client.get("/api/prescriptions/")
+        self.assertIsInstance(response.data, list)
+        expected = list(Prescription.objects.order_by("created_at").values_list("id", flat=True))
+        self.assertEqual([p["id"] for p in response.data], expected)
+
+    def test_detail_query_count_is_constant(self):
+        self.add_prescriptions(1)
+        prescription = Prescription.objects.get()
+        client = self.client_for(self.doctor)
+        with self.assertNumQueries(2):
+            response = client.get(f"/api/prescriptions/{prescription.pk}/")
+        self.assertEqual(response.data["patient_name"], "Patient 0")
+
+
+class PrescriptionItemTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+        cls.patient = User.objects.create_user(
+            email="patient@example.com", password="pass", full_name="Patient",
+            phone_number="03110000000", role="patient",
+        )
+        cls.drugs = [
+            Drug.objects.create(drug_name=name, medical_condition="Infections", drug_link="https://www.drugs.com/")
+            for name in ("amoxicillin", "azithromycin", "doxycycline")
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def post(self, **data):
+        return self.client.post("/api/prescriptions/", {"patient": self.patient.id, "room_id": "room1", **data}, format="json")
+
+    def test_items_are_validated_in_one_query_and_text_is_filled_in(self):
+        items = [
+            {"drug": drug.id, "dose": "500 mg", "frequency": "TDS", "duration": "5 days"} for drug in self.drugs
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(items=items)
+        self.assertEqual(response.status_code, 201, response.data)
+        drug_queries = [q for q in queries if '"drugs_drug"' in q["sql"] or "`drugs_drug`" in q["sql"]]
+        self.assertEqual(len(drug_queries), 1)
+        self.assertEqual([i["drug_name"] for i in response.data["items"]], ["amoxicillin", "azithromycin", "doxycycline"])
+        self.assertEqual(response.data["text"].splitlines()[0], "amoxicillin 500 mg TDS 5 days")
+        self.assertEqual(PrescriptionItem.objects.filter(prescription_id=response.data["id"]).count(), 3)
+
+    def test_unknown_drug_ids_are_rejected(self):
+        response = self.post(items=[
+            {"drug": self.drugs[0].id, "dose": "1", "frequency": "OD"},
+            {"drug": 999999, "dose": "1", "frequency": "OD"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("999999", str(response.data["items"]))
+        self.assertFalse(Prescription.objects.exists())
+
+    def test_text_only_prescriptions_still_work(self):
+        response = self.post(text="Paracetamol 500mg when needed")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["items"], [])
+
+    def test_text_or_items_required(self):
+        self.assertEqual(self.post().status_code, 400)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class PrescriptionRealtimeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+        cls.patient = User.objects.create_user(
+            email="patient@example.com", password="pass", full_name="Ayesha",
+            phone_number="03110000000", role="patient",
+        )
+        cls.other = User.objects.create_user(
+            email="other@example.com", password="pass", full_name="Sana",
+            phone_number="03110000001", role="patient",
+        )
+
+    def post(self, room_id):
+        """Create a prescription; returns (response, on_commit callbacks not yet run)."""
+        client = APIClient()
+        client.force_authenticate(self.doctor)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post(
+                "/api/prescriptions/", {"patient": self.patient.pk, "room_id": room_id, "text": "Rx"}, format="json",
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response, callbacks
+
+    def test_only_the_doctor_and_patient_get_it_and_only_after_commit(self):
+        app = URLRouter(websocket_urlpatterns)
+
+        async def join(user):
+            communicator = WebsocketCommunicator(app, "/ws/video/room42/")
+            communicator.scope["user"] = user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            return communicator
+
+        async def received(communicator):
+            messages = []
+            while not await communicator.receive_nothing(timeout=0.1):
+                messages.append(await communicator.receive_json_from())
+            return messages
+
+        async def scenario():
+            sockets = [await join(user) for user in (self.doctor, self.patient, self.other)]
+            for socket in sockets:
+                await received(socket)   # "ready" / "patient-joined" signalling
+
+            response, callbacks = await sync_to_async(self.post)("room42")
+            # Nothing is sent before the transaction commits
+            self.assertEqual([await received(socket) for socket in sockets], [[], [], []])
+
+            for callback in callbacks:
+                await sync_to_async(callback)()
+            doctor, patient, other = [await received(socket) for socket in sockets]
+            expected = [{"type": "prescription", "prescription": response.json()}]
+            self.assertEqual(doctor, expected)
+            self.assertEqual(patient, expected)
+            self.assertEqual(other, [])
+            for socket in sockets:
+                await socket.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_rooms_the_socket_route_cannot_join_are_not_published(self):
+        for room_id in ("room-1", "room 42", "rööm", "r" * 91):
+            _, callbacks = self.post(room_id)
+            self.assertEqual(callbacks, [], room_id)
+        _, callbacks = self.post("r" * 90)
+        self.assertEqual(len(callbacks), 1)
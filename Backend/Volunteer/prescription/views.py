@@ -1,26 +1,49 @@
 from rest_framework import generics, permissions
 from .models import Prescription
-from .serializers import PrescriptionSerializer
+from .pagination import PrescriptionCursorPagination
+from .realtime import publish_prescription
+from .serializers import PrescriptionSerializer, with_items
 from rest_framework.response import Response
 
+# Columns PrescriptionSerializer reads, joined in the same query
+LIST_FIELDS = (
+    "id", "text", "room_id", "created_at",
+    "doctor__id", "doctor__full_name", "patient__id", "patient__full_name",
+)
+
+
+def visible_prescriptions(request):
+    user = request.user
+    room_id = request.query_params.get("room_id")
+
+    if user.is_staff:  # doctor → apne likhe huye
+        qs = Prescription.objects.filter(doctor=user)
+    else:  # patient → apne hi
+        qs = Prescription.objects.filter(patient_id=user.id)
+
+    if room_id:
+        qs = qs.filter(room_id=room_id)
+
+    return with_items(qs.select_related("doctor", "patient").only(*LIST_FIELDS))
+
 
 class PrescriptionListCreateView(generics.ListCreateAPIView):
     serializer_class = PrescriptionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PrescriptionCursorPagination
 
-    def get_queryset(self):
-        user = self.request.user
-        room_id = self.request.query_params.get("room_id")
-
-        if user.is_staff:  # doctor → apne likhe huye
-            qs = Prescription.objects.filter(doctor=user)
-        else:  # patient → apne hi
-            qs = Prescription.objects.filter(patient_id=user.id)
+    # Query params that switch the list into cursor pages
+    PAGE_PARAMS = ("cursor", "limit")
 
-        if room_id:
-            qs = qs.filter(room_id=room_id)
+    def get_queryset(self):
+        return visible_prescriptions(self.request)
 
-        return qs
+    def list(self, request, *args, **kwargs):
+        if not any(name in request.query_params for name in self.PAGE_PARAMS):
+            # Legacy shape: full, unpaginated list, oldest first, for existing clients
+            queryset = self.get_queryset().order_by("created_at", "id")
+            return Response(self.get_serializer(queryset, many=True).data)
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         doctor = self.request.user
@@ -28,23 +51,13 @@ class PrescriptionListCreateView(generics.ListCreateAPIView):
         if not patient_id:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({"patient": "Patient field is required."})
-        serializer.save(doctor=doctor, patient_id=patient_id)
+        prescription = serializer.save(doctor=doctor, patient_id=patient_id)
+        # Deliver it to the patient's call socket so they need not poll
+        publish_prescription(prescription.room_id, serializer.data)
 
 class PrescriptionDetailView(generics.RetrieveAPIView):
-    queryset = Prescription.objects.all()
     serializer_class = PrescriptionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        room_id = self.request.query_params.get("room_id")
-
-        if user.is_staff:
-            qs = Prescription.objects.filter(doctor=user)
-        else:
-            qs = Prescription.objects.filter(patient_id=user.id)
-
-        if room_id:
-            qs = qs.filter(room_id=room_id)
-
-        return qs
+        return visible_prescriptions(self.request)
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import ChangeLog
+
+
+@admin.register(ChangeLog)
+class ChangeLogAdmin(admin.ModelAdmin):
+    list_display = ("id", "seq", "model", "object_id", "action", "doctor_id", "created_at")
+    list_filter = ("model", "action")
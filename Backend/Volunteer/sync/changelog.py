@@ -0,0 +1,90 @@
+"""
+Which models are synced, how each row is scoped to users, and the helpers
+that append to the ChangeLog. Every write costs a single INSERT; bulk
+writes that bypass model signals call `record_many` instead.
+
+Readers call `sequence()` first and then follow `ChangeLog.seq`, which
+is in commit order, so a transaction that commits late is still read.
+"""
+from django.db import transaction
+
+from appointments.models import Appointment
+from patient.models import Patient, Visit
+from prescription.models import Prescription
+
+from .models import ChangeLog, ChangeSequence
+
+SEQUENCE = "changelog"
+SEQUENCE_BATCH = 5000
+
+
+def _shared(obj):
+    return None, None
+
+
+def _doctor_only(obj):
+    return obj.doctor_id, None
+
+
+def _doctor_and_patient(obj):
+    return obj.doctor_id, obj.patient_id
+
+
+# name -> (model, scope(obj) -> (doctor_id, patient_user_id))
+TRACKED = {
+    "patient": (Patient, _shared),
+    "visit": (Visit, _doctor_only),
+    "prescription": (Prescription, _doctor_and_patient),
+    "appointment": (Appointment, _doctor_and_patient),
+}
+
+MODEL_NAMES = {model: name for name, (model, _) in TRACKED.items()}
+
+
+def _entry(name, obj, action):
+    doctor_id, patient_user_id = TRACKED[name][1](obj)
+    return ChangeLog(
+        model=name,
+        object_id=obj.pk,
+        action=action,
+        doctor_id=doctor_id,
+        patient_user_id=patient_user_id,
+    )
+
+
+def record(obj, action):
+    name = MODEL_NAMES[type(obj)]
+    _entry(name, obj, action).save()
+
+
+def record_many(objs, action=ChangeLog.UPSERT, batch_size=1000):
+    """Log saved objects (with primary keys) of one tracked model at once."""
+    entries = [_entry(MODEL_NAMES[type(obj)], obj, action) for obj in objs]
+    ChangeLog.objects.bulk_create(entries, batch_size=batch_size)
+
+
+def sequence():
+    """
+    Number the committed entries that have no `seq` yet, in id order, and
+    return the highest seq given out. Entries still in an open transaction
+    are invisible here and get a larger seq once committed, so a reader
+    that calls this before reading never moves past them.
+    """
+    while True:
+        if not ChangeLog.objects.filter(seq__isnull=True).exists():
+            return ChangeSequence.objects.filter(name=SEQUENCE).values_list("last", flat=True).first() or 0
+        with transaction.atomic():
+            # One sequencer at a time; the lock comes before the read below
+            state, _ = ChangeSequence.objects.select_for_update().get_or_create(name=SEQUENCE)
+            pending = list(
+                ChangeLog.objects.filter(seq__isnull=True).order_by("id")
+                .values_list("id", flat=True)[:SEQUENCE_BATCH]
+            )
+            ChangeLog.objects.bulk_update(
+                [ChangeLog(id=pk, seq=state.last + n) for n, pk in enumerate(pending, start=1)],
+                ["seq"], batch_size=1000,
+            )
+            state.last += len(pending)
+            state.save(update_fields=["last"])
+        if len(pending) < SEQUENCE_BATCH:
+            return state.last
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('doctor_id', models.BigIntegerField(blank=True, null=True)),
+                ('patient_user_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['doctor_id', 'id'], name='changelog_doctor_idx'),
+                    models.Index(fields=['patient_user_id', 'id'], name='changelog_patient_idx'),
+                    models.Index(fields=['model', 'id'], name='changelog_model_idx'),
+                ],
+            },
+        ),
+    ]
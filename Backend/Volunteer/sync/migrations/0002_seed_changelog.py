@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:00
+
+from django.db import migrations
+
+# (app label, model, log name, doctor column, patient-user column)
+SEEDED = (
+    ("patient", "Patient", "patient", None, None),
+    ("patient", "Visit", "visit", "doctor_id", None),
+    ("prescription", "Prescription", "prescription", "doctor_id", "patient_id"),
+    ("appointments", "Appointment", "appointment", "doctor_id", "patient_id"),
+)
+
+
+def seed_changelog(apps, schema_editor):
+    """Log every existing row once so a device syncing from token 0 gets a full copy."""
+    ChangeLog = apps.get_model("sync", "ChangeLog")
+    for app_label, model_name, name, doctor_col, patient_col in SEEDED:
+        Model = apps.get_model(app_label, model_name)
+        columns = ["id"] + [c for c in (doctor_col, patient_col) if c]
+        batch = []
+        for row in Model.objects.order_by("id").values(*columns).iterator(chunk_size=2000):
+            batch.append(ChangeLog(
+                model=name,
+                object_id=row["id"],
+                action="upsert",
+                doctor_id=row[doctor_col] if doctor_col else None,
+                patient_user_id=row[patient_col] if patient_col else None,
+            ))
+            if len(batch) >= 1000:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            ChangeLog.objects.bulk_create(batch)
+
+
+def clear_changelog(apps, schema_editor):
+    apps.get_model("sync", "ChangeLog").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('patient', '0005_alter_visit_date'),
+        ('prescription', '0001_initial'),
+        ('appointments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_changelog, clear_changelog),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-19 22:10
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing(apps, schema_editor):
+    """Every row here is committed: seq = id keeps the tokens devices already hold valid."""
+    ChangeLog = apps.get_model("sync", "ChangeLog")
+    ChangeSequence = apps.get_model("sync", "ChangeSequence")
+    ChangeLog.objects.update(seq=F("id"))
+    last = ChangeLog.objects.aggregate(last=Max("id"))["last"] or 0
+    ChangeSequence.objects.update_or_create(name="changelog", defaults={"last": last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_seed_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='changelog_doctor_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='changelog_patient_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='changelog_model_idx',
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='changelog',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['doctor_id', 'seq'], name='changelog_doctor_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['patient_user_id', 'seq'], name='changelog_patient_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['model', 'seq'], name='changelog_model_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models
+
+
+class ChangeLog(models.Model):
+    """
+    Append-only log of writes to the synced models. Deletes are kept as
+    tombstones.
+
+    The token handed to devices is `seq`, not the id: ids are allocated at
+    INSERT but become visible at COMMIT, so a slow transaction can surface
+    a smaller id after a larger one was read. `seq` is given out by
+    `sync.changelog.sequence()` only to rows already committed, so
+    everything with a larger seq became visible after the device last
+    synced.
+    """
+    UPSERT = "upsert"
+    DELETE = "delete"
+    ACTION_CHOICES = (
+        (UPSERT, "Upsert"),
+        (DELETE, "Delete"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    # Who may see the change; both empty means it is shared with all doctors.
+    # Plain ids rather than FKs: tombstones must outlive the users they name.
+    doctor_id = models.BigIntegerField(null=True, blank=True)
+    patient_user_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Commit order; null until sequence() numbers the row
+    seq = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model}:{self.object_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["doctor_id", "seq"], name="changelog_doctor_seq_idx"),
+            models.Index(fields=["patient_user_id", "seq"], name="changelog_patient_seq_idx"),
+            models.Index(fields=["model", "seq"], name="changelog_model_seq_idx"),
+        ]
+
+
+class ChangeSequence(models.Model):
+    """Last `ChangeLog.seq` given out; its row lock serializes sequence()."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last}"
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+
+from .changelog import TRACKED, record
+from .models import ChangeLog
+
+
+def log_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record(instance, ChangeLog.UPSERT)
+
+
+def log_delete(sender, instance, **kwargs):
+    record(instance, ChangeLog.DELETE)
+
+
+for name, (model, _) in TRACKED.items():
+    post_save.connect(log_save, sender=model, dispatch_uid=f"sync_save_{name}")
+    post_delete.connect(log_delete, sender=model, dispatch_uid=f"sync_delete_{name}")
@@ -0,0 +1,95 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from patient.models import Patient, Visit
+from prescription.models import Prescription
+from .changelog import sequence
+from .models import ChangeLog
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user(
+            email="doctor@example.com", password="pass", full_name="Dr. Ali",
+            phone_number="03000000000", role="doctor", is_staff=True,
+        )
+        cls.other_doctor = User.objects.create_user(
+            email="other@example.com", password="pass", full_name="Dr. Sana",
+            phone_number="03000000001", role="doctor", is_staff=True,
+        )
+        cls.patient_user = User.objects.create_user(
+            email="patient@example.com", password="pass", full_name="Ayesha",
+            phone_number="03110000000", role="patient",
+        )
+        cls.patient = Patient.objects.create(name="Ayesha", age=28, gender="female", contact="03110000000")
+
+    def sync(self, user, token=0, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/api/sync/", {"token": token, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def upserted_ids(self, data, name):
+        return [row["id"] for row in data["changes"].get(name, {}).get("upserts", [])]
+
+    def test_a_late_commit_below_the_token_is_still_delivered(self):
+        visit = Visit.objects.create(doctor=self.doctor, patient=self.patient, diagnosis="Anaemia")
+        first = self.sync(self.doctor)
+        self.assertEqual(self.upserted_ids(first, "visit"), [visit.pk])
+
+        # A transaction that took its id before the entries above but
+        # committed after the device synced past them
+        late = Visit.objects.create(doctor=self.doctor, patient=self.patient, diagnosis="Malaria")
+        ChangeLog.objects.filter(model="visit", object_id=late.pk).delete()
+        lowest = ChangeLog.objects.order_by("id").values_list("id", flat=True).first()
+        ChangeLog.objects.create(id=lowest - 1, model="visit", object_id=late.pk,
+                                 action=ChangeLog.UPSERT, doctor_id=self.doctor.pk)
+
+        second = self.sync(self.doctor, first["token"])
+        self.assertEqual(self.upserted_ids(second, "visit"), [late.pk])
+        self.assertEqual(self.sync(self.doctor, second["token"])["changes"], {})
+
+    def test_changes_are_scoped_to_the_user(self):
+        Visit.objects.create(doctor=self.other_doctor, patient=self.patient)
+        mine = Prescription.objects.create(doctor=self.doctor, patient=self.patient_user, room_id="r1", text="Rx")
+
+        doctor = self.sync(self.doctor)
+        self.assertNotIn("visit", doctor["changes"])
+        self.assertEqual(self.upserted_ids(doctor, "patient"), [self.patient.pk])
+        self.assertEqual(self.upserted_ids(doctor, "prescription"), [mine.pk])
+
+        patient = self.sync(self.patient_user)
+        self.assertEqual(list(patient["changes"]), ["prescription"])
+
+    def test_pages_and_last_action_wins(self):
+        visits = [Visit.objects.create(doctor=self.doctor, patient=self.patient) for _ in range(3)]
+        visits[0].hr = 80
+        visits[0].save()
+        deleted = visits[1].pk
+        visits[1].delete()
+
+        first = self.sync(self.doctor, limit=2)
+        self.assertTrue(first["has_more"])
+        rest = self.sync(self.doctor, first["token"], limit=100)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(rest["changes"]["visit"]["deletes"], [deleted])
+        self.assertEqual(self.upserted_ids(rest, "visit"), [visits[2].pk, visits[0].pk])
+
+    def test_sequence_numbers_only_unnumbered_entries_once(self):
+        Visit.objects.create(doctor=self.doctor, patient=self.patient)
+        last = sequence()
+        self.assertEqual(sequence(), last)
+        self.assertFalse(ChangeLog.objects.filter(seq__isnull=True).exists())
+        self.assertEqual(
+            list(ChangeLog.objects.order_by("seq").values_list("id", flat=True)),
+            list(ChangeLog.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def test_invalid_tokens_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.doctor)
+        self.assertEqual(client.get("/api/sync/", {"token": "abc"}).status_code, 400)
+        self.assertEqual(client.get("/api/sync/", {"token": -1}).status_code, 400)
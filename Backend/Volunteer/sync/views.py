@@ -0,0 +1,96 @@
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from appointments.models import Appointment
+from appointments.serializers import AppointmentSerializer
+from patient.models import Patient, Visit
+from patient.serializers import PatientSerializer, VisitSerializer
+from prescription.models import Prescription
+from prescription.serializers import PrescriptionSerializer, with_items
+
+from .changelog import sequence
+from .models import ChangeLog
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+
+PAYLOAD = {
+    "patient": (lambda: Patient.objects.all(), PatientSerializer),
+    "visit": (lambda: Visit.objects.select_related("patient"), VisitSerializer),
+    "prescription": (lambda: with_items(Prescription.objects.select_related("doctor", "patient")), PrescriptionSerializer),
+    "appointment": (lambda: Appointment.objects.select_related("patient", "slot__doctor"), AppointmentSerializer),
+}
+
+
+class SyncView(APIView):
+    """
+    GET ?token=<last token>&limit=<n>
+
+    Returns the rows created, updated (`upserts`) or deleted (`deletes`,
+    ids only) since `token`, grouped by model, plus the token to send
+    next time. Start with token=0; keep calling while `has_more` is true.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            token = int(request.query_params.get("token", 0))
+            limit = int(request.query_params.get("limit", SYNC_PAGE_SIZE))
+        except ValueError:
+            return Response({"detail": "token and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if token < 0:
+            return Response({"detail": "Invalid token."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_SYNC_PAGE_SIZE))
+
+        user = request.user
+        scope = Q(doctor_id=user.id) | Q(patient_user_id=user.id)
+        if user.role == "doctor":
+            scope |= Q(model="patient")
+
+        # Number what has committed since, so late commits land after `token`
+        sequence()
+        entries = list(
+            ChangeLog.objects.filter(scope, seq__gt=token)
+            .order_by("seq")
+            .values_list("seq", "model", "object_id", "action")[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        # Collapse repeated writes to the same row; the last action wins
+        latest = {}
+        for _, name, object_id, action in entries:
+            latest.pop((name, object_id), None)
+            latest[(name, object_id)] = action
+
+        upserts = {}
+        changes = {}
+        for (name, object_id), action in latest.items():
+            bucket = changes.setdefault(name, {"upserts": [], "deletes": []})
+            if action == ChangeLog.DELETE:
+                bucket["deletes"].append(object_id)
+            else:
+                upserts.setdefault(name, []).append(object_id)
+
+        for name, ids in upserts.items():
+            queryset, serializer_class = PAYLOAD[name]
+            rows = queryset().in_bulk(ids)
+            bucket = changes[name]
+            for object_id in ids:
+                row = rows.get(object_id)
+                if row is None:
+                    # Deleted by a change beyond this page
+                    bucket["deletes"].append(object_id)
+                else:
+                    bucket["upserts"].append(serializer_class(row).data)
+
+        return Response({
+            "token": entries[-1][0] if entries else token,
+            "has_more": has_more,
+            "changes": changes,
+        }, status=status.HTTP_200_OK)